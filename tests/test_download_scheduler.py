@@ -0,0 +1,107 @@
+import multiprocessing
+import pytest
+
+from vp.crawling.download_scheduler import CookieScheduler, FakeClock
+
+BLOCK_ERROR = "ERROR: [youtube] Sign in to confirm you're not a bot."
+
+
+def make_scheduler(cookies=("a.txt",), **kwargs):
+    clock = FakeClock()
+    params = dict(initial_rate=0.1, min_rate=0.01, max_rate=0.2, increase_per_success=0.01, decrease_factor=0.5,
+                  burst=2.0, block_cooldown_sec=60.0, max_cooldown_sec=200.0)
+    params.update(kwargs)
+    return CookieScheduler(list(cookies), clock=clock, sleep=clock.sleep, **params), clock
+
+
+def cookie_stats(scheduler, cookie):
+    return next(s for s in scheduler.stats() if s["cookie"] == cookie)
+
+
+def test_success_increases_rate_up_to_max():
+    scheduler, _ = make_scheduler()
+    scheduler.report("a.txt", True)
+    assert cookie_stats(scheduler, "a.txt")["rate_per_sec"] == pytest.approx(0.11)
+    for _ in range(100):
+        scheduler.report("a.txt", True)
+    assert cookie_stats(scheduler, "a.txt")["rate_per_sec"] == pytest.approx(0.2)
+
+
+def test_block_decreases_rate_multiplicatively_down_to_min():
+    scheduler, _ = make_scheduler()
+    scheduler.report("a.txt", False, BLOCK_ERROR)
+    assert cookie_stats(scheduler, "a.txt")["rate_per_sec"] == pytest.approx(0.05)
+    scheduler.report("a.txt", False, BLOCK_ERROR)
+    assert cookie_stats(scheduler, "a.txt")["rate_per_sec"] == pytest.approx(0.025)
+    for _ in range(10):
+        scheduler.report("a.txt", False, BLOCK_ERROR)
+    assert cookie_stats(scheduler, "a.txt")["rate_per_sec"] == pytest.approx(0.01)
+
+
+def test_non_block_failure_keeps_rate():
+    scheduler, _ = make_scheduler()
+    scheduler.report("a.txt", False, "ERROR: [youtube] Video unavailable")
+    stats = cookie_stats(scheduler, "a.txt")
+    assert stats["rate_per_sec"] == pytest.approx(0.1)
+    assert stats["blocks"] == 0 and stats["blocked_for_sec"] == 0
+
+
+def test_cooldown_doubles_per_consecutive_block_and_resets_on_success():
+    scheduler, clock = make_scheduler()
+    cooldowns = []
+    for _ in range(4):
+        scheduler.report("a.txt", False, BLOCK_ERROR)
+        cooldowns.append(cookie_stats(scheduler, "a.txt")["blocked_for_sec"])
+    assert cooldowns == [60.0, 120.0, 200.0, 200.0]  # max_cooldown_sec에서 멈춤
+
+    scheduler.report("a.txt", True)
+    clock.now += 200.0
+    scheduler.report("a.txt", False, BLOCK_ERROR)
+    assert cookie_stats(scheduler, "a.txt")["blocked_for_sec"] == 60.0
+
+
+def test_blocked_cookie_is_skipped_until_cooldown_ends():
+    scheduler, clock = make_scheduler(cookies=("a.txt", "b.txt"))
+    scheduler.report("a.txt", False, BLOCK_ERROR)
+    assert scheduler.try_acquire()[0] == "b.txt"
+    cookie, wait_sec = scheduler.try_acquire()
+    assert cookie is None and wait_sec > 0
+
+    clock.now += 60.0
+    assert cookie_stats(scheduler, "a.txt")["blocked_for_sec"] == 0
+    assert sorted(scheduler.try_acquire()[0] for _ in range(2)) == ["a.txt", "b.txt"]
+
+
+def test_acquire_waits_for_the_next_token_on_the_fake_clock():
+    scheduler, clock = make_scheduler()
+    assert scheduler.acquire() == "a.txt"  # 시작 token
+    assert clock.now == 0.0
+    assert scheduler.acquire() == "a.txt"
+    assert 1.0 / 0.1 <= clock.now <= 1.1 / 0.1  # 다음 token까지 (jitter 포함)
+
+
+def _report_in_child(scheduler, n_success, n_block):
+    for _ in range(n_success):
+        scheduler.report("a.txt", True)
+    for _ in range(n_block):
+        scheduler.report("b.txt", False, BLOCK_ERROR)
+    for _ in range(3):
+        scheduler.try_acquire()
+
+
+def test_state_is_shared_with_forked_processes():
+    ctx = multiprocessing.get_context("fork")
+    scheduler, _ = make_scheduler(cookies=("a.txt", "b.txt"))
+    workers = [ctx.Process(target=_report_in_child, args=(scheduler, 2, 1)) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    a, b = cookie_stats(scheduler, "a.txt"), cookie_stats(scheduler, "b.txt")
+    assert a["rate_per_sec"] == pytest.approx(0.1 + 4 * 0.01)
+    assert b["rate_per_sec"] == pytest.approx(0.1 * 0.5 ** 2)
+    assert b["blocks"] == 2
+    # 두 프로세스가 같은 bucket을 써서 a의 시작 token 하나만 나감 (b는 차단으로 token이 0)
+    assert a["requests"] == 1 and b["requests"] == 0
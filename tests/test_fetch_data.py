@@ -0,0 +1,100 @@
+import os
+import pytest
+
+pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+import boto3
+from vp.utils.fetch_data import S3Uploader
+
+BUCKET = "test-bucket"
+
+
+class FlakyClient:
+    """처음 fail_times번의 upload_file은 실패하고 그 뒤로는 실제 client로 넘기는 S3 client."""
+
+    def __init__(self, client, fail_times):
+        self.client = client
+        self.fail_times = fail_times
+        self.calls = 0
+
+    def upload_file(self, *args, **kwargs):
+        self.calls += 1
+        if self.calls <= self.fail_times:
+            raise ConnectionError("temporary failure")
+        return self.client.upload_file(*args, **kwargs)
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def clip_dir(tmp_path):
+    clip_id = "abc123_0"
+    os.makedirs(tmp_path / clip_id)
+    for fname, size in [(f"{clip_id}_video.mp4", 2048), (f"{clip_id}_audio.mp3", 512), (f"{clip_id}_metadata.json", 16)]:
+        (tmp_path / clip_id / fname).write_bytes(b"x" * size)
+    return tmp_path, clip_id
+
+
+def bucket_keys(s3_client):
+    return {obj["Key"]: obj["Size"] for obj in s3_client.list_objects_v2(Bucket=BUCKET).get("Contents", [])}
+
+
+def test_upload_clip_folders(s3_client, clip_dir):
+    local_dir, clip_id = clip_dir
+    uploader = S3Uploader(s3_client=s3_client, s3_bucket=BUCKET, max_workers=2)
+
+    results = uploader.upload_clip_folders(str(local_dir), [clip_id], "clips")
+
+    assert results == {clip_id: True}
+    assert bucket_keys(s3_client) == {
+        f"clips/{clip_id}/{clip_id}_video.mp4": 2048,
+        f"clips/{clip_id}/{clip_id}_audio.mp3": 512,
+        f"clips/{clip_id}/{clip_id}_metadata.json": 16,
+    }
+    stats = uploader.stats()
+    assert stats["files_uploaded"] == 3 and stats["files_failed"] == 0
+    assert stats["bytes_uploaded"] == 2048 + 512 + 16
+    assert uploader.in_flight == 0
+
+
+def test_upload_file_retries_then_succeeds(s3_client, clip_dir):
+    local_dir, clip_id = clip_dir
+    client = FlakyClient(s3_client, fail_times=2)
+    uploader = S3Uploader(s3_client=client, s3_bucket=BUCKET, max_retries=2, backoff_base_sec=0)
+
+    assert uploader.upload_file(str(local_dir / clip_id / f"{clip_id}_audio.mp3"), "clips/a.mp3")
+    assert client.calls == 3
+    assert bucket_keys(s3_client) == {"clips/a.mp3": 512}
+    assert uploader.stats()["files_failed"] == 0
+
+
+def test_upload_file_gives_up_after_max_retries(s3_client, clip_dir):
+    local_dir, clip_id = clip_dir
+    client = FlakyClient(s3_client, fail_times=10)
+    uploader = S3Uploader(s3_client=client, s3_bucket=BUCKET, max_retries=2, backoff_base_sec=0)
+
+    assert not uploader.upload_file(str(local_dir / clip_id / f"{clip_id}_audio.mp3"), "clips/a.mp3")
+    assert client.calls == 3
+    assert bucket_keys(s3_client) == {}
+    stats = uploader.stats()
+    assert stats["files_failed"] == 1 and stats["files_uploaded"] == 0
+    assert uploader.in_flight == 0
+
+
+def test_missing_file_does_not_leak_in_flight(s3_client, tmp_path):
+    uploader = S3Uploader(s3_client=s3_client, s3_bucket=BUCKET)
+
+    with pytest.raises(FileNotFoundError):
+        uploader.upload_file(str(tmp_path / "missing.mp4"), "clips/missing.mp4")
+    assert uploader.in_flight == 0
+    assert uploader.stats()["bytes_per_sec"] == 0
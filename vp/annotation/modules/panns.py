@@ -9,6 +9,21 @@ AS_LABELS = [
 ]
 MUSIC_INDEX =137
 
+def label_indices(labels):
+    """AudioSet class indices of label names in AS_LABELS."""
+    unknown = [label for label in labels if label not in AS_LABELS]
+    if unknown:
+        raise ValueError(f'Unknown AudioSet labels: {unknown}')
+    return [AS_LABELS.index(label) for label in labels]
+
+
+def music_index(model):
+    """Column of Music in the clipwise_output of model (see Cnn14.restrict_labels)."""
+    labels = getattr(model, 'labels', None)
+    if labels is None:
+        return MUSIC_INDEX
+    return list(labels).index(AS_LABELS[MUSIC_INDEX])
+
 def init_layer(layer):
     """Initialize a Linear or Convolutional layer. """
     nn.init.xavier_uniform_(layer.weight)
@@ -116,9 +131,24 @@ class Cnn14(nn.Module):
         init_layer(self.fc1)
         init_layer(self.fc_audioset)
 
-    def forward(self, input, mixup_lambda=None):
+    def restrict_labels(self, labels):
+        """Compute only the given AudioSet labels (names in AS_LABELS).
+        fc_audioset keeps the rows of those labels, so clipwise_output becomes
+        (..., len(labels)) with columns in the order of labels."""
+
+        indices = torch.as_tensor(label_indices(labels), device=self.fc_audioset.weight.device)
+        fc = nn.Linear(self.fc_audioset.in_features, len(indices), bias=True).to(self.fc_audioset.weight.device)
+        with torch.no_grad():
+            fc.weight.copy_(self.fc_audioset.weight[indices])
+            fc.bias.copy_(self.fc_audioset.bias[indices])
+        self.fc_audioset = fc
+        self.labels = list(labels)
+        return self
+
+    def forward_features(self, input, mixup_lambda=None):
         """
-        Input: (batch_size, data_length)"""
+        Input: (batch_size, data_length)
+        Output: (batch_size, 2048, time_steps), one time step per 32 STFT hops"""
 
         x = self.spectrogram_extractor(input)   # (batch_size, 1, time_steps, freq_bins)
         x = self.logmel_extractor(x)    # (batch_size, 1, time_steps, mel_bins)
@@ -148,9 +178,12 @@ class Cnn14(nn.Module):
         x = F.dropout(x, p=0.2, training=self.training)
         x = torch.mean(x, dim=3)
 
-        (x1, _) = torch.max(x, dim=2)
-        x2 = torch.mean(x, dim=2)
-        x = x1 + x2
+        return x
+
+    def forward_head(self, x):
+        """
+        Input: (..., 2048) time-pooled features"""
+
         x = F.dropout(x, p=0.5, training=self.training)
         x = F.relu_(self.fc1(x))
         embedding = F.dropout(x, p=0.5, training=self.training)
@@ -160,6 +193,45 @@ class Cnn14(nn.Module):
 
         return output_dict
 
+    def forward(self, input, mixup_lambda=None):
+        """
+        Input: (batch_size, data_length)"""
+
+        x = self.forward_features(input, mixup_lambda)
+
+        (x1, _) = torch.max(x, dim=2)
+        x2 = torch.mean(x, dim=2)
+        x = x1 + x2
+
+        return self.forward_head(x)
+
+    def forward_sliding(self, x, window_frames, hop_frames):
+        """See sliding_window_output."""
+
+        return sliding_window_output(self, x, window_frames, hop_frames)
+
+
+def sliding_window_output(model, x, window_frames, hop_frames):
+    """Clipwise output of every window sliding over a precomputed feature map,
+    so overlapping windows share one pass through the convolutional trunk.
+    Only model.forward_head is called, so this also works for exported models.
+
+    Args:
+      model: Cnn14 (or its inference build)
+      x: (batch_size, 2048, time_steps), output of forward_features
+      window_frames: int, window length in time steps
+      hop_frames: int, hop between windows in time steps
+
+    Returns:
+      output_dict: clipwise_output (batch_size, windows_num, classes_num),
+        embedding (batch_size, windows_num, 2048)
+    """
+    x1 = F.max_pool1d(x, kernel_size=window_frames, stride=hop_frames)
+    x2 = F.avg_pool1d(x, kernel_size=window_frames, stride=hop_frames)
+    x = (x1 + x2).transpose(1, 2)
+
+    return model.forward_head(x)
+
 
 import numpy as np
 import time
@@ -225,7 +297,6 @@ def forward(model, generator, return_input=False,
 
     # Forward data to a model in mini-batches
     for n, batch_data_dict in enumerate(generator):
-        print(n)
         batch_waveform = move_data_to_device(batch_data_dict['waveform'], device)
 
         with torch.no_grad():
@@ -0,0 +1,222 @@
+import os
+import copy
+import hashlib
+import time
+import argparse
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+from vp.annotation.modules.panns import Cnn14, ConvBlock, music_index
+
+
+class Cnn14Inference(Cnn14):
+    """Cnn14 for inference only: no SpecAugmentation, mixup or dropout.
+    Built from a trained Cnn14 with build_inference_cnn14."""
+
+    def forward_features(self, input):
+        """
+        Input: (batch_size, data_length)
+        Output: (batch_size, 2048, time_steps)"""
+
+        x = self.spectrogram_extractor(input)   # (batch_size, 1, time_steps, freq_bins)
+        x = self.logmel_extractor(x)    # (batch_size, 1, time_steps, mel_bins)
+
+        x = x.transpose(1, 3)
+        x = self.bn0(x)
+        x = x.transpose(1, 3)
+
+        x = self.conv_block1(x, pool_size=(2, 2), pool_type='avg')
+        x = self.conv_block2(x, pool_size=(2, 2), pool_type='avg')
+        x = self.conv_block3(x, pool_size=(2, 2), pool_type='avg')
+        x = self.conv_block4(x, pool_size=(2, 2), pool_type='avg')
+        x = self.conv_block5(x, pool_size=(2, 2), pool_type='avg')
+        x = self.conv_block6(x, pool_size=(1, 1), pool_type='avg')
+        x = torch.mean(x, dim=3)
+
+        return x
+
+    def forward_head(self, x):
+        """
+        Input: (..., 2048) time-pooled features"""
+
+        embedding = F.relu_(self.fc1(x))
+        clipwise_output = torch.sigmoid(self.fc_audioset(embedding))
+
+        return {'clipwise_output': clipwise_output, 'embedding': embedding}
+
+    def forward(self, input):
+        """
+        Input: (batch_size, data_length)"""
+
+        x = self.forward_features(input)
+
+        (x1, _) = torch.max(x, dim=2)
+        x2 = torch.mean(x, dim=2)
+
+        return self.forward_head(x1 + x2)
+
+
+def fuse_conv_block(block):
+    """Fold bn1/bn2 of an eval-mode ConvBlock into conv1/conv2."""
+    block.conv1 = fuse_conv_bn_eval(block.conv1, block.bn1)
+    block.conv2 = fuse_conv_bn_eval(block.conv2, block.bn2)
+    block.bn1 = nn.Identity()
+    block.bn2 = nn.Identity()
+    return block
+
+
+def build_inference_cnn14(model, fuse_bn=True, quantize=False):
+    """Inference build of a trained Cnn14.
+
+    Args:
+      model: Cnn14 with loaded weights
+      fuse_bn: bool, fold Conv+BN in every ConvBlock
+      quantize: bool, dynamic int8 quantization of fc1/fc_audioset (CPU only)
+
+    Returns:
+      Cnn14Inference in eval mode, the input model is left untouched
+    """
+    model = copy.deepcopy(model).cpu().eval()
+    model.__class__ = Cnn14Inference
+    del model.spec_augmenter
+
+    if fuse_bn:
+        for module in model.modules():
+            if isinstance(module, ConvBlock):
+                fuse_conv_block(module)
+
+    if quantize:
+        model = torch.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+    for param in model.parameters():
+        param.requires_grad_(False)
+    model.variant = variant_tag(True, quantize, False, getattr(model, 'labels', None))
+    return model
+
+
+def export_torchscript(model, path, sample_rate=32000, clip_sec=20):
+    """Trace forward, forward_features and forward_head of an inference build and save it to path."""
+    example_input = torch.zeros(2, sample_rate * clip_sec)
+    with torch.no_grad():
+        example_features = model.forward_features(example_input)
+        traced = torch.jit.trace_module(model, {
+            'forward': (example_input,),
+            'forward_features': (example_input,),
+            'forward_head': (example_features.mean(dim=2),),
+        }, strict=False)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    torch.jit.save(traced, tmp_path)
+    os.replace(tmp_path, path)
+    return traced
+
+
+def labels_tag(labels):
+    return "all" if labels is None else hashlib.md5('|'.join(labels).encode()).hexdigest()[:8]
+
+
+def variant_tag(inference_build=True, quantize=False, script=False, labels=None):
+    """Which Cnn14 variant produced some outputs (their values differ slightly between variants)."""
+    return f"fp32={int(not inference_build)}|q={int(quantize)}|script={int(script)}|labels={labels_tag(labels)}"
+
+
+def inference_ckpt_path(ckpt_dir, ckpt_name, sample_rate=32000, quantize=False, labels=None):
+    name = os.path.splitext(ckpt_name)[0]
+    if labels is not None:
+        name += f".labels-{labels_tag(labels)}"
+    return os.path.join(ckpt_dir, f"{name}.inference{'.int8' if quantize else ''}.sr{sample_rate}.pt")
+
+
+def load_inference_cnn14(model, ckpt_dir, ckpt_name, device="cpu", sample_rate=32000, quantize=False, script=False):
+    """Inference build of model, optionally exported to (and reloaded from) TorchScript under ckpt_dir."""
+    if quantize and device != "cpu":
+        print(f"⚠️ int8 quantization is CPU only, skipped on {device}")
+        quantize = False
+
+    labels = getattr(model, 'labels', None)
+    script_path = inference_ckpt_path(ckpt_dir, ckpt_name, sample_rate, quantize, labels)
+    if script and os.path.exists(script_path):
+        inference_model = torch.jit.load(script_path, map_location=device).eval()
+    else:
+        inference_model = build_inference_cnn14(model, quantize=quantize)
+        if script:
+            inference_model = export_torchscript(inference_model, script_path, sample_rate)
+    if labels is not None:
+        # TorchScript drops python attributes
+        inference_model.labels = labels
+    inference_model.variant = variant_tag(True, quantize, script, labels)
+    return inference_model.to(device).eval()
+
+
+def compare_inference_models(ref_model, fast_model, chunks, batch_size=8, device="cpu"):
+    """Accuracy parity of music logits and throughput of fast_model against ref_model.
+
+    Args:
+      ref_model: fp32 Cnn14
+      fast_model: inference build of the same weights
+      chunks: (chunks_num, data_length) audio chunks
+
+    Returns:
+      dict with max/mean absolute music logit difference and chunks/sec of both models
+    """
+    def run(model):
+        music_col = music_index(model)
+        outputs = []
+        start_time = time.time()
+        with torch.no_grad():
+            for i in range(0, len(chunks), batch_size):
+                batch = torch.as_tensor(chunks[i:i + batch_size], dtype=torch.float32, device=device)
+                outputs.append(model(batch)['clipwise_output'][:, music_col].cpu().numpy())
+        elapsed = max(time.time() - start_time, 1e-9)
+        return np.concatenate(outputs), len(chunks) / elapsed
+
+    run(fast_model)  # warm up (first TorchScript call optimizes the graph)
+    ref_logits, ref_speed = run(ref_model)
+    fast_logits, fast_speed = run(fast_model)
+    diff = np.abs(ref_logits - fast_logits)
+    return {
+        'max_abs_diff': float(diff.max()),
+        'mean_abs_diff': float(diff.mean()),
+        'ref_chunks_per_sec': ref_speed,
+        'fast_chunks_per_sec': fast_speed,
+        'speedup': fast_speed / ref_speed,
+    }
+
+
+def main():
+    from vp.annotation.music_detection import PANN_CKPT_NAME, load_pann_model, load_audio_chunks
+
+    parser = argparse.ArgumentParser(description="Export the Cnn14 inference build and check it against fp32")
+    parser.add_argument("--ckpt_dir", type=str, default="ckpt")
+    parser.add_argument("--audio_path", type=str, default=None, help="audio for the parity check (random noise if omitted)")
+    parser.add_argument("--num_chunks", type=int, default=16)
+    parser.add_argument("--batch_size", type=int, default=8)
+    parser.add_argument("--sample_rate", type=int, default=32000)
+    parser.add_argument("--quantize", action="store_true")
+    parser.add_argument("--script", action="store_true")
+    parser.add_argument("--labels", type=str, nargs="+", default=None, help="AudioSet label subset of the inference build")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="max allowed music logit difference")
+    args = parser.parse_args()
+
+    os.makedirs(args.ckpt_dir, exist_ok=True)
+    ref_model = load_pann_model(args.ckpt_dir, "cpu", args.sample_rate)
+    fast_model = copy.deepcopy(ref_model).restrict_labels(args.labels) if args.labels else ref_model
+    fast_model = load_inference_cnn14(fast_model, args.ckpt_dir, PANN_CKPT_NAME, "cpu", args.sample_rate,
+                                      quantize=args.quantize, script=args.script)
+    if args.audio_path is not None:
+        chunks = load_audio_chunks(args.audio_path, args.sample_rate)[:args.num_chunks]
+    else:
+        chunks = np.random.RandomState(0).uniform(-0.5, 0.5, (args.num_chunks, args.sample_rate * 20)).astype(np.float32)
+
+    report = compare_inference_models(ref_model, fast_model, chunks, args.batch_size)
+    print(f"music logit diff: max {report['max_abs_diff']:.5f}, mean {report['mean_abs_diff']:.5f}")
+    print(f"fp32: {report['ref_chunks_per_sec']:.2f} chunks/sec, inference build: "
+          f"{report['fast_chunks_per_sec']:.2f} chunks/sec (x{report['speedup']:.2f})")
+    if report['max_abs_diff'] > args.tolerance:
+        raise SystemExit(f"❌ parity check failed: {report['max_abs_diff']:.5f} > {args.tolerance}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,88 +1,572 @@
 import os
 import json
+import fcntl
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import torch
 import argparse
-import librosa
 import julius
 import numpy as np
+import torch.nn.functional as F
 
-from vp.annotation.modules.panns import MUSIC_INDEX
-from vp.configs.constants import PANN_CLIP_DURATION_SEC
+from vp.annotation.modules.panns import music_index, sliding_window_output
+from vp.configs.constants import (PANN_CLIP_DURATION_SEC, PANN_BATCH_SIZE, PANN_DECODE_WORKERS, PANN_PREFETCH_DEPTH,
+                                  PANN_CACHE_DIR, PANN_CACHE_MAX_BYTES, PANN_INFERENCE_BUILD,
+                                  PANN_QUANTIZE, PANN_TORCHSCRIPT, PANN_LABELS, AUDIO_EMB_DIM)
+from vp.utils.logit_cache import LogitCache, file_content_hash
+from vp.utils.audio_io import decode_audio_pcm, stream_audio_windows
+from vp.utils.metrics import timed
+
+PANN_CKPT_NAME = "Cnn14_mAP=0.431.pth"
+PANN_CKPT_URL = "https://zenodo.org/record/3987831/files/Cnn14_mAP=0.431.pth"
+# Cnn14 feature map has one time step per 32 STFT hops (hop_size=320)
+PANN_FRAME_SAMPLES = 320 * 32
+# Long audio goes through the trunk in blocks of this many time steps (64s at 32kHz)
+PANN_FRAMEWISE_BLOCK_FRAMES = 200
 
 def convert_audio(wav, original_rate, target_rate):
     if original_rate != target_rate:
         wav = julius.resample_frac(wav, original_rate, target_rate)
-    # Split audio into chunks of PANN_CLIP_DURATION_SEC
+    # Split audio into chunks of PANN_CLIP_DURATION_SEC (a reshaped view, the incomplete tail is dropped)
     chunk_size = PANN_CLIP_DURATION_SEC * target_rate
-    chunks = []
-    for i in range(0, len(wav), chunk_size):
-        chunk = wav[i:i + chunk_size]
-        if len(chunk) == chunk_size:
-            chunks.append(chunk)
-    return np.stack(chunks)
+    num_chunks = len(wav) // chunk_size
+    return np.asarray(wav[:num_chunks * chunk_size], dtype=np.float32).reshape(num_chunks, chunk_size)
 
 def extract_bendit_logits():
     pass
 
-def extract_pann_logits(audio_path, output_dir, ckpt_dir, device="cuda", sample_rate=32000, model=None):
+def resolve_device(device=None):
+    if device is None:
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    return device
+
+def ensure_pann_checkpoint(ckpt_dir):
+    """Download the Cnn14 checkpoint if missing. Concurrent callers wait on a lock file instead of downloading it again."""
+    model_path = os.path.join(ckpt_dir, PANN_CKPT_NAME)
+    if os.path.exists(model_path):
+        return model_path
+    os.makedirs(ckpt_dir, exist_ok=True)
+    with open(f"{model_path}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        if not os.path.exists(model_path):
+            tmp_path = f"{model_path}.{os.getpid()}.tmp"
+            torch.hub.download_url_to_file(url=PANN_CKPT_URL, dst=tmp_path)
+            os.replace(tmp_path, model_path)
+    return model_path
+
+def load_pann_model(ckpt_dir, device="cuda", sample_rate=32000, inference_build=False, quantize=False, script=False,
+                    labels=None):
     from vp.annotation.modules.panns import Cnn14
 
+    model_path = ensure_pann_checkpoint(ckpt_dir)
+    model = Cnn14(
+        sample_rate=sample_rate,
+        window_size=1024,
+        hop_size=320,
+        mel_bins=64,
+        fmin=50,
+        fmax=16000,
+        classes_num=527
+    )
+    checkpoint = torch.load(model_path, map_location="cpu" if inference_build else device)
+    model.load_state_dict(checkpoint['model'])
+    model.eval()
+    if labels is not None:
+        model.restrict_labels(labels)
+    if inference_build:
+        from vp.annotation.modules.panns_inference import load_inference_cnn14
+        return load_inference_cnn14(model, ckpt_dir, PANN_CKPT_NAME, device, sample_rate, quantize=quantize, script=script)
+    model.to(device)
+    return model
+
+def get_pann_model(ckpt_dir, device="cuda", sample_rate=32000, model=None, inference_build=PANN_INFERENCE_BUILD,
+                   quantize=PANN_QUANTIZE, script=PANN_TORCHSCRIPT, labels=PANN_LABELS):
     # Use a static variable to cache the loaded model
-    if not hasattr(extract_pann_logits, "_static_model") or model is not None:
-        model_path = os.path.join(ckpt_dir, "Cnn14_mAP=0.431.pth")
-        if not os.path.exists(model_path):
-            torch.hub.download_url_to_file(
-                url='https://zenodo.org/record/3987831/files/Cnn14_mAP=0.431.pth',
-                dst=model_path
-            )
-        if model is None:
-            model = Cnn14(
-                sample_rate=sample_rate,
-                window_size=1024,
-                hop_size=320,
-                mel_bins=64,
-                fmin=50,
-                fmax=16000,
-                classes_num=527
-            )
-            checkpoint = torch.load(model_path, map_location=device)
-            model.load_state_dict(checkpoint['model'])
-            model.to(device)
-            model.eval()
+    if model is not None:
         extract_pann_logits._static_model = model
-    else:
-        model = extract_pann_logits._static_model
+    elif not hasattr(extract_pann_logits, "_static_model"):
+        with timed("pann_load"):
+            extract_pann_logits._static_model = load_pann_model(ckpt_dir, device, sample_rate, inference_build,
+                                                                quantize, script, labels)
+    return extract_pann_logits._static_model
 
-    cur_audio, input_sr = librosa.load(audio_path, mono=True, sr=None, res_type='kaiser_fast')
-    cur_audio = convert_audio(wav=torch.from_numpy(cur_audio), original_rate=input_sr, target_rate=sample_rate)
-    # model inference
-    print(cur_audio.shape)
-    with torch.no_grad():
-        out = model(torch.as_tensor(cur_audio, dtype=torch.float32, device=device), None)
-    music_logits = out["clipwise_output"][:, MUSIC_INDEX]
+def share_pann_model(ckpt_dir, device="cpu", sample_rate=32000):
+    """
+    Load the model once in the parent process before starting a worker Pool.
+    Its weights are moved to shared memory, so workers (see init_pann_worker) use one copy
+    instead of each loading the checkpoint. CPU only: a CUDA context cannot be forked.
+    """
+    model = get_pann_model(ckpt_dir, device, sample_rate)
+    try:
+        model.share_memory()
+    except RuntimeError:
+        # weights that cannot be moved (e.g. packed int8 params) are still shared copy-on-write after fork
+        pass
+    return model
+
+def init_pann_worker(model=None, num_threads=None):
+    """Pool initializer: reuse the model shared by the parent and split CPU threads between workers."""
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+    if model is not None:
+        get_pann_model(None, model=model)
+
+def load_audio(audio_path, sample_rate=32000):
+    # Decoded straight from the mp3/mp4 to mono float PCM at sample_rate through an ffmpeg pipe
+    with timed("pann_decode", key=os.path.basename(audio_path)) as t:
+        wav = decode_audio_pcm(audio_path, sample_rate)
+        t.nbytes = wav.nbytes
+    return torch.from_numpy(wav)
+
+def load_audio_chunks(audio_path, sample_rate=32000):
+    return convert_audio(wav=load_audio(audio_path, sample_rate), original_rate=sample_rate, target_rate=sample_rate)
+
+def prefetch_audio_chunks(audio_paths, sample_rate=32000, num_workers=PANN_DECODE_WORKERS,
+                          queue_depth=PANN_PREFETCH_DEPTH, load_fn=load_audio_chunks):
+    """
+    Decode and resample upcoming files in a worker pool while the caller runs inference.
+    Yields (index, audio_path, chunks, error) in the same order as audio_paths.
+    At most queue_depth decoded files are held at once; decoding pauses until the
+    caller consumes the oldest one (backpressure). load_fn(audio_path, sample_rate) returns the chunks.
+    """
+    if num_workers <= 0:
+        for idx, audio_path in enumerate(audio_paths):
+            try:
+                yield idx, audio_path, load_fn(audio_path, sample_rate), None
+            except Exception as e:
+                yield idx, audio_path, None, e
+        return
+
+    queue_depth = max(queue_depth, 1)
+    # Decoding runs in ffmpeg subprocesses, so threads are enough here.
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        pending = deque()
+        path_iter = iter(enumerate(audio_paths))
+        for idx, audio_path in path_iter:
+            pending.append((idx, audio_path, executor.submit(load_fn, audio_path, sample_rate)))
+            if len(pending) >= queue_depth:
+                break
+        try:
+            while pending:
+                idx, audio_path, future = pending.popleft()
+                next_item = next(path_iter, None)
+                if next_item is not None:
+                    pending.append((*next_item, executor.submit(load_fn, next_item[1], sample_rate)))
+                try:
+                    yield idx, audio_path, future.result(), None
+                except Exception as e:
+                    yield idx, audio_path, None, e
+        finally:
+            for _, _, future in pending:
+                future.cancel()
+
+def logits_to_results(music_logits, hop_sec=None, window_sec=PANN_CLIP_DURATION_SEC, duration=None):
+    """
+    Without hop_sec, each logit covers its own non-overlapping window.
+    With hop_sec (framewise mode), each logit is assigned to the hop-long cell around
+    the center of its window; the first and last cells are stretched to 0 and duration
+    so that the cells tile the whole audio.
+    """
     results = []
+    if hop_sec is None:
+        for idx, logit in enumerate(music_logits):
+            results.append({
+                "onset": idx * PANN_CLIP_DURATION_SEC,
+                "offset": (idx + 1) * PANN_CLIP_DURATION_SEC,
+                "music_logit": float(logit)
+            })
+        return results
+
+    num_windows = len(music_logits)
     for idx, logit in enumerate(music_logits):
+        center = idx * hop_sec + window_sec / 2
+        onset = 0.0 if idx == 0 else center - hop_sec / 2
+        offset = duration if idx == num_windows - 1 else center + hop_sec / 2
         results.append({
-            "onset": idx * PANN_CLIP_DURATION_SEC,
-            "offset": (idx + 1) * PANN_CLIP_DURATION_SEC,
+            "onset": round(max(0.0, min(onset, duration)), 3),
+            "offset": round(max(0.0, min(offset, duration)), 3),
             "music_logit": float(logit)
         })
+    return results
+
+def framewise_blocks_per_batch(sample_rate=32000, batch_size=PANN_BATCH_SIZE):
+    # keep the same activation memory as a batch of batch_size 20s chunks
+    block_samples = PANN_FRAMEWISE_BLOCK_FRAMES * PANN_FRAME_SAMPLES
+    return max(1, batch_size * PANN_CLIP_DURATION_SEC * sample_rate // block_samples)
+
+def wav_blocks(wav, blocks_per_batch=1):
+    """
+    In-memory counterpart of stream_audio_windows(..., keep_tail=True) over PANN_FRAMEWISE_BLOCK_FRAMES blocks:
+    batches of (n, block_samples) views of wav, then the incomplete last block as (1, remaining samples).
+    """
+    wav = np.asarray(wav, dtype=np.float32)
+    block_samples = PANN_FRAMEWISE_BLOCK_FRAMES * PANN_FRAME_SAMPLES
+    num_blocks = len(wav) // block_samples
+    for i in range(0, num_blocks, blocks_per_batch):
+        n = min(blocks_per_batch, num_blocks - i)
+        yield wav[i * block_samples:(i + n) * block_samples].reshape(n, block_samples)
+    if len(wav) > num_blocks * block_samples:
+        yield wav[None, num_blocks * block_samples:]
+
+def timed_batches(batches, stage, key=None):
+    """Yield from batches, recording the time spent producing each one (e.g. ffmpeg decoding) under stage."""
+    batches = iter(batches)
+    while True:
+        with timed(stage, key=key) as t:
+            batch = next(batches, None)
+            t.nbytes = 0 if batch is None else batch.nbytes
+        if batch is None:
+            return
+        yield batch
+
+def framewise_music_logits(model, wav, sample_rate=32000, hop_sec=1.0, device="cuda",
+                           batch_size=PANN_BATCH_SIZE, key=None, return_embeddings=False):
+    """
+    Music probability of a PANN_CLIP_DURATION_SEC window sliding over the whole audio.
+    The convolutional trunk runs once over the audio (in PANN_FRAMEWISE_BLOCK_FRAMES blocks)
+    and every window is pooled from the shared feature map. The last window is completed by
+    repeating the last frame, so the tail of the audio is scored as well.
+
+    wav is a waveform, or an iterable of (n, block_samples) block batches whose last one may be
+    shorter (stream_audio_windows(..., keep_tail=True)), so that only the feature map
+    (2048 floats per frame) is kept instead of the whole waveform.
+
+    Returns (music_logits, effective hop_sec, effective window_sec, duration), followed by the
+    (windows, 2048) embeddings of the same windows with return_embeddings.
+    """
+    frame_sec = PANN_FRAME_SAMPLES / sample_rate
+    window_frames = max(1, round(PANN_CLIP_DURATION_SEC / frame_sec))
+    hop_frames = max(1, round(hop_sec / frame_sec))
+    block_samples = PANN_FRAMEWISE_BLOCK_FRAMES * PANN_FRAME_SAMPLES
+    if isinstance(wav, (np.ndarray, torch.Tensor)):
+        wav = wav_blocks(wav, framewise_blocks_per_batch(sample_rate, batch_size))
+
+    with torch.no_grad():
+        features = []
+        num_samples = 0
+        for blocks in wav:
+            num_samples += blocks.size
+            x = torch.as_tensor(blocks, dtype=torch.float32)
+            if x.shape[1] < block_samples:
+                x = F.pad(x, (0, block_samples - x.shape[1]))
+            with timed("pann_infer", key=key, nbytes=blocks.nbytes):
+                x = model.forward_features(x.to(device))  # (blocks, 2048, frames)
+                features.append(x.transpose(0, 1).reshape(x.shape[1], -1))
+
+        duration = num_samples / sample_rate
+        if num_samples == 0:
+            empty = (np.zeros(0, dtype=np.float32), hop_frames * frame_sec, window_frames * frame_sec, duration)
+            return empty + (np.zeros((0, AUDIO_EMB_DIM), dtype=np.float32),) if return_embeddings else empty
+        num_frames = int(np.ceil(num_samples / PANN_FRAME_SAMPLES))
+        x = torch.cat(features, dim=1)[:, :num_frames]
+
+        num_windows = max(1, int(np.ceil((num_frames - window_frames) / hop_frames)) + 1)
+        pad = (num_windows - 1) * hop_frames + window_frames - num_frames
+        if pad > 0:
+            x = torch.cat((x, x[:, -1:].repeat(1, pad)), dim=1)
+        out = sliding_window_output(model, x[None], window_frames, hop_frames)
+    music_logits = out["clipwise_output"][0, :, music_index(model)].cpu().numpy()
+    if return_embeddings:
+        window_embeddings = out["embedding"][0].float().cpu().numpy()
+        return music_logits, hop_frames * frame_sec, window_frames * frame_sec, duration, window_embeddings
+    return music_logits, hop_frames * frame_sec, window_frames * frame_sec, duration
+
+def embedding_key(audio_path):
+    """clip_id of an audio file for the embedding store: the file name without extension and _audio/_video suffix."""
+    stem = os.path.splitext(os.path.basename(audio_path))[0]
+    for suffix in ("_audio", "_video"):
+        if stem.endswith(suffix):
+            return stem[:-len(suffix)]
+    return stem
+
+def save_pann_logits(results, audio_path, output_dir):
     results_path = os.path.splitext(os.path.basename(audio_path))[0] + ".json"
     with open(os.path.join(output_dir, results_path), "w") as f:
         json.dump(results, f)
 
+def pann_model_tag(model=None):
+    """
+    Variant tag of model (see variant_tag). Without model, that of the process-wide model of get_pann_model,
+    or of the model it would load from the PANN_* constants when none is loaded yet.
+    """
+    from vp.annotation.modules.panns_inference import variant_tag
+
+    if model is None:
+        model = getattr(extract_pann_logits, "_static_model", None)
+    if model is None:
+        # quantize/script only apply to the inference build (see load_pann_model)
+        return variant_tag(PANN_INFERENCE_BUILD, PANN_INFERENCE_BUILD and PANN_QUANTIZE,
+                           PANN_INFERENCE_BUILD and PANN_TORCHSCRIPT, PANN_LABELS)
+    # load_pann_model/build_inference_cnn14 set variant; a plain Cnn14 is the fp32 model
+    return getattr(model, "variant", None) or variant_tag(False, labels=getattr(model, "labels", None))
+
+def pann_config_tag(sample_rate=32000, hop_sec=None, model=None):
+    return (f"{os.path.splitext(PANN_CKPT_NAME)[0]}|sr={sample_rate}|chunk={PANN_CLIP_DURATION_SEC}|hop={hop_sec}"
+            f"|{pann_model_tag(model)}")
+
+def get_pann_cache():
+    """Process-wide LogitCache in PANN_CACHE_DIR, or None when caching is disabled."""
+    if PANN_CACHE_DIR is None:
+        return None
+    if not hasattr(get_pann_cache, "_static_cache"):
+        get_pann_cache._static_cache = LogitCache(PANN_CACHE_DIR, PANN_CACHE_MAX_BYTES)
+    return get_pann_cache._static_cache
+
+def load_cached_pann_logits(cache, alias, sample_rate=32000, hop_sec=None, model=None):
+    """Results cached under alias (e.g. a video_id) for this config, without reading the audio."""
+    hit = cache.get_alias(f"{alias}|{pann_config_tag(sample_rate, hop_sec, model)}")
+    if hit is None:
+        return None
+    music_logits, meta = hit
+    return logits_to_results(music_logits, **meta)
+
+def extract_pann_logits(audio_path, output_dir, ckpt_dir, device="cuda", sample_rate=32000, model=None, hop_sec=None,
+                        cache=None, cache_alias=None, batch_size=PANN_BATCH_SIZE, return_embeddings=False):
+    """
+    Write music logits of audio_path to output_dir as JSON and return them.
+    With a LogitCache, results are looked up by a hash of the audio content and the
+    model/sample-rate/chunk config before any decoding or inference, and stored after.
+    cache_alias (e.g. a video_id) additionally registers the result for load_cached_pann_logits.
+    With return_embeddings, returns (results, window_embeddings): the 2048-d embeddings of the scored
+    windows as {"embeddings", "hop_sec", "window_sec"} (window i starts at i * hop_sec), or None on a cache hit.
+    The audio is streamed from ffmpeg: in batches of batch_size chunks, or with hop_sec in
+    PANN_FRAMEWISE_BLOCK_FRAMES trunk blocks (see framewise_music_logits).
+    """
+    model = get_pann_model(ckpt_dir, device, sample_rate, model)
+    config_tag = pann_config_tag(sample_rate, hop_sec, model)
+    if cache is not None:
+        cache_key = f"{file_content_hash(audio_path)}|{config_tag}"
+        hit = cache.get(cache_key)
+        if hit is not None:
+            music_logits, meta = hit
+            results = logits_to_results(music_logits, **meta)
+            save_pann_logits(results, audio_path, output_dir)
+            return (results, None) if return_embeddings else results
+
+    # windows are views of a fixed-size buffer, so memory does not grow with the audio length
+    key = os.path.basename(audio_path)
+    if hop_sec is not None:
+        # 64s trunk blocks are streamed too; only their feature maps are kept for the sliding windows
+        block_sec = PANN_FRAMEWISE_BLOCK_FRAMES * PANN_FRAME_SAMPLES / sample_rate
+        blocks = stream_audio_windows(audio_path, sample_rate, block_sec, keep_tail=True,
+                                      batch_size=framewise_blocks_per_batch(sample_rate, batch_size))
+        outputs = framewise_music_logits(model, timed_batches(blocks, "pann_decode", key), sample_rate, hop_sec,
+                                         device, key=key, return_embeddings=return_embeddings)
+        music_logits, hop_sec, window_sec, duration = outputs[:4]
+        embeddings = outputs[4] if return_embeddings else None
+        meta = {"hop_sec": hop_sec, "window_sec": window_sec, "duration": duration}
+    else:
+        music_logits = [np.zeros(0, dtype=np.float32)]
+        embeddings = [np.zeros((0, AUDIO_EMB_DIM), dtype=np.float32)]
+        windows_iter = stream_audio_windows(audio_path, sample_rate, PANN_CLIP_DURATION_SEC, batch_size=batch_size)
+        with torch.no_grad():
+            for windows in timed_batches(windows_iter, "pann_decode", key):
+                with timed("pann_infer", key=key, nbytes=windows.nbytes):
+                    out = model(torch.from_numpy(windows).to(device))
+                    music_logits.append(out["clipwise_output"][:, music_index(model)].cpu().numpy())
+                    if return_embeddings:
+                        embeddings.append(out["embedding"].float().cpu().numpy())
+        music_logits = np.concatenate(music_logits)
+        embeddings = np.concatenate(embeddings)
+        hop_sec = window_sec = PANN_CLIP_DURATION_SEC
+        meta = {}
+
+    if cache is not None:
+        alias = None if cache_alias is None else f"{cache_alias}|{config_tag}"
+        cache.put(cache_key, music_logits, meta, alias=alias)
+    results = logits_to_results(music_logits, **meta)
+    save_pann_logits(results, audio_path, output_dir)
+    if return_embeddings:
+        return results, {"embeddings": embeddings, "hop_sec": hop_sec, "window_sec": window_sec}
+    return results
+
+def batched_pann_outputs(model, file_chunks, batch_size=PANN_BATCH_SIZE, device="cuda", sample_rate=32000,
+                         return_logits=True, return_embeddings=False, stage="pann_infer"):
+    """
+    Pack the 20s chunks of many files into fixed-size batches and run the model once per batch.
+    file_chunks yields (file_idx, chunks). After each batch, yields the list of files whose last
+    chunk was just inferred as (file_idx, music_logits, embedding): the per-chunk music logits
+    (None unless return_logits) and the mean 2048-d embedding over the chunks (None unless
+    return_embeddings, or when the file has no chunks).
+    """
+    chunk_size = PANN_CLIP_DURATION_SEC * sample_rate
+    batch = np.empty((batch_size, chunk_size), dtype=np.float32)
+    owners = []              # file index of each row in the batch
+    remaining = {}           # file index -> number of chunks not inferred yet
+    num_chunks = {}          # file index -> number of chunks
+    file_logits = {}         # file index -> music logits collected so far
+    file_embeddings = {}     # file index -> sum of chunk embeddings
+    finished = []
+
+    def finish(file_idx):
+        del remaining[file_idx]
+        music_logits = np.asarray(file_logits.pop(file_idx), dtype=np.float32) if return_logits else None
+        embedding = file_embeddings.pop(file_idx, None)
+        count = num_chunks.pop(file_idx)
+        finished.append((file_idx, music_logits, embedding / count if embedding is not None else None))
+
+    def run_batch():
+        with timed(stage, nbytes=batch[:len(owners)].nbytes), torch.no_grad():
+            out = model(torch.as_tensor(batch[:len(owners)], device=device))
+            music_logits = out["clipwise_output"][:, music_index(model)].cpu().numpy() if return_logits else None
+            embeddings = out["embedding"].float().cpu().numpy() if return_embeddings else None
+        for row, file_idx in enumerate(owners):
+            if music_logits is not None:
+                file_logits[file_idx].append(music_logits[row])
+            if embeddings is not None:
+                file_embeddings[file_idx] = file_embeddings.get(file_idx, 0) + embeddings[row]
+            remaining[file_idx] -= 1
+            if remaining[file_idx] == 0:
+                finish(file_idx)
+        owners.clear()
+
+    for file_idx, chunks in file_chunks:
+        remaining[file_idx] = num_chunks[file_idx] = len(chunks)
+        file_logits[file_idx] = []
+        if len(chunks) == 0:
+            finish(file_idx)
+
+        pos = 0
+        while pos < len(chunks):
+            n = min(batch_size - len(owners), len(chunks) - pos)
+            batch[len(owners):len(owners) + n] = chunks[pos:pos + n]
+            owners.extend([file_idx] * n)
+            pos += n
+            if len(owners) == batch_size:
+                run_batch()
+        if finished:
+            yield list(finished)
+            finished.clear()
+    if owners:
+        run_batch()
+    if finished:
+        yield list(finished)
+
+def extract_pann_logits_batch(audio_paths, output_dir, ckpt_dir, device="cuda", sample_rate=32000,
+                              batch_size=PANN_BATCH_SIZE, model=None, num_workers=PANN_DECODE_WORKERS,
+                              prefetch_depth=PANN_PREFETCH_DEPTH, embedding_store=None, cache=None):
+    """
+    Run PANN over many audio files at once.
+    Chunks from different files are packed into fixed-size batches, so the model runs
+    once per batch instead of once per file, and the outputs are split back per file.
+    Decoding of upcoming files overlaps with inference (see prefetch_audio_chunks).
+    With an EmbeddingStore, the 2048-d embedding of the same forward pass is averaged over
+    the chunks of each file and stored under embedding_key(audio_path).
+    With a LogitCache, each file is looked up before its chunks are queued (cache hits are
+    neither decoded nor inferred) and the logits of the other files are stored once finished.
+    """
+    model = get_pann_model(ckpt_dir, device, sample_rate, model)
+    os.makedirs(output_dir, exist_ok=True)
+    stats = {"files": 0, "chunks": 0, "failed": 0, "cached": 0}
+    start_time = time.time()
+
+    cache_keys = {}          # file index -> cache key of the files to infer
+    if cache is not None:
+        config_tag = pann_config_tag(sample_rate, model=model)
+        # a hit still needs inference when its embedding is missing from embedding_store
+        stored = embedding_store.load().index if embedding_store is not None else None
+        to_infer = []
+        for audio_path in audio_paths:
+            try:
+                cache_key = f"{file_content_hash(audio_path)}|{config_tag}"
+            except OSError:
+                cache_key = None  # reported as a load failure below
+            hit = cache.get(cache_key) if cache_key is not None else None
+            if hit is not None and (stored is None or embedding_key(audio_path) in stored):
+                music_logits, meta = hit
+                save_pann_logits(logits_to_results(music_logits, **meta), audio_path, output_dir)
+                stats["cached"] += 1
+                continue
+            cache_keys[len(to_infer)] = cache_key
+            to_infer.append(audio_path)
+        audio_paths = to_infer
+
+    def loaded_chunks():
+        for file_idx, audio_path, chunks, error in prefetch_audio_chunks(audio_paths, sample_rate, num_workers,
+                                                                         prefetch_depth):
+            if error is not None:
+                print(f"❌ 오디오 로드 실패: {audio_path}, 사유: {error}")
+                stats["failed"] += 1
+                continue
+            stats["chunks"] += len(chunks)
+            yield file_idx, chunks
+
+    for finished in batched_pann_outputs(model, loaded_chunks(), batch_size, device, sample_rate,
+                                         return_embeddings=embedding_store is not None):
+        finished_embeddings = ([], [])
+        for file_idx, music_logits, embedding in finished:
+            if cache_keys.get(file_idx) is not None:
+                cache.put(cache_keys[file_idx], music_logits, {})
+            save_pann_logits(logits_to_results(music_logits), audio_paths[file_idx], output_dir)
+            if embedding is not None:
+                finished_embeddings[0].append(embedding_key(audio_paths[file_idx]))
+                finished_embeddings[1].append(embedding)
+            stats["files"] += 1
+        if finished_embeddings[0]:
+            embedding_store.append(finished_embeddings[0], np.stack(finished_embeddings[1]))
+
+    elapsed = max(time.time() - start_time, 1e-9)
+    stats["files_per_sec"] = stats["files"] / elapsed
+    stats["chunks_per_sec"] = stats["chunks"] / elapsed
+    print(f"✅ PANN 배치 추론 완료: {stats['files']}개 파일 (캐시 {stats['cached']}개 별도), {stats['chunks']}개 청크, {elapsed:.1f}초 "
+          f"({stats['files_per_sec']:.2f} files/sec, {stats['chunks_per_sec']:.2f} chunks/sec)")
+    return stats
+
+def list_audio_paths(audio_dir, id_list_path=None, ext=".mp3"):
+    if id_list_path is not None:
+        with open(id_list_path, "r", encoding="utf-8") as f:
+            audio_ids = [line.strip() for line in f if line.strip()]
+        return [os.path.join(audio_dir, f"{audio_id}{ext}") for audio_id in audio_ids]
+    return sorted(os.path.join(audio_dir, fname) for fname in os.listdir(audio_dir) if fname.endswith(ext))
+
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--audio_path", type=str, default="data/audio/18500.mp3")
+    parser.add_argument("--audio_path", type=str, default=None, help="single file mode; batch mode over --audio_dir if omitted")
     parser.add_argument("--audio_dir", type=str, default="data/audio")
+    parser.add_argument("--id_list", type=str, default=None, help="txt file of audio ids to read from --audio_dir")
+    parser.add_argument("--ext", type=str, default=".mp3", help="extension of the files in --audio_dir (.mp4 decodes the audio track)")
     parser.add_argument("--output_dir", type=str, default="data/annotation/music_detection")
     parser.add_argument("--ckpt_dir", type=str, default="ckpt")
-    parser.add_argument("--device", type=str, default="cuda")
+    parser.add_argument("--device", type=str, default=None, help="cuda if available, else cpu")
     parser.add_argument("--sample_rate", type=int, default=32000)
+    parser.add_argument("--batch_size", type=int, default=PANN_BATCH_SIZE)
+    parser.add_argument("--hop_sec", type=float, default=None, help="framewise mode with this hop between 20s windows")
+    parser.add_argument("--use_cache", action="store_true", help="look up / store logits in PANN_CACHE_DIR")
+    parser.add_argument("--inference_build", action="store_true", default=PANN_INFERENCE_BUILD, help="use the Conv+BN folded Cnn14")
+    parser.add_argument("--quantize", action="store_true", default=PANN_QUANTIZE, help="dynamic int8 fc layers (CPU only, with --inference_build)")
+    parser.add_argument("--script", action="store_true", default=PANN_TORCHSCRIPT, help="use the cached TorchScript export (with --inference_build)")
+    parser.add_argument("--labels", type=str, nargs="+", default=PANN_LABELS, help="AudioSet labels to compute (must include Music)")
+    parser.add_argument("--num_workers", type=int, default=PANN_DECODE_WORKERS, help="audio decoding workers (0: no prefetch)")
+    parser.add_argument("--prefetch_depth", type=int, default=PANN_PREFETCH_DEPTH, help="max number of decoded files waiting for inference")
+    parser.add_argument("--emb_dir", type=str, default=None, help="batch mode: also store Cnn14 embeddings of the same pass in this EmbeddingStore")
     args = parser.parse_args()
     os.makedirs(args.ckpt_dir, exist_ok=True)
-    extract_pann_logits(args.audio_path, args.output_dir, args.ckpt_dir, args.device, args.sample_rate)
+    args.device = resolve_device(args.device)
+    model = get_pann_model(args.ckpt_dir, args.device, args.sample_rate, inference_build=args.inference_build,
+                           quantize=args.quantize, script=args.script, labels=args.labels)
+    cache = get_pann_cache() if args.use_cache else None
+    if args.audio_path is not None:
+        extract_pann_logits(args.audio_path, args.output_dir, args.ckpt_dir, args.device, args.sample_rate,
+                            hop_sec=args.hop_sec, cache=cache, batch_size=args.batch_size)
+    elif args.hop_sec is not None:
+        # framewise mode runs the trunk over each whole file, so files are not packed into batches
+        os.makedirs(args.output_dir, exist_ok=True)
+        for audio_path in list_audio_paths(args.audio_dir, args.id_list, args.ext):
+            extract_pann_logits(audio_path, args.output_dir, args.ckpt_dir, args.device, args.sample_rate,
+                                hop_sec=args.hop_sec, cache=cache, batch_size=args.batch_size)
+    else:
+        audio_paths = list_audio_paths(args.audio_dir, args.id_list, args.ext)
+        embedding_store = None
+        if args.emb_dir is not None:
+            from vp.utils.embedding_store import EmbeddingStore
+            embedding_store = EmbeddingStore(args.emb_dir, AUDIO_EMB_DIM, tag=pann_config_tag(args.sample_rate, model=model))
+        extract_pann_logits_batch(audio_paths, args.output_dir, args.ckpt_dir, args.device, args.sample_rate,
+                                  batch_size=args.batch_size, num_workers=args.num_workers,
+                                  prefetch_depth=args.prefetch_depth, embedding_store=embedding_store, cache=cache)
+        if embedding_store is not None:
+            embedding_store.compact()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,84 @@
+import os
+import json
+import shutil
+import subprocess
+import numpy as np
+
+# 모든 fixture는 오프라인으로 생성 (ffmpeg lavfi 소스 또는 numpy), 같은 인자로 다시 부르면 기존 파일을 재사용
+
+
+def synth_audio(duration_sec, sample_rate=32000, kind="sine", seed=0):
+    """
+    (duration_sec * sample_rate,) float32 waveform.
+    kind: "sine" (440Hz + 880Hz), "noise" (uniform noise), "mixed" (sine 구간과 noise 구간이 30초씩 번갈아 나옴)
+    """
+    t = np.arange(int(duration_sec * sample_rate), dtype=np.float32) / sample_rate
+    sine = 0.3 * np.sin(2 * np.pi * 440 * t) + 0.1 * np.sin(2 * np.pi * 880 * t)
+    noise = np.random.RandomState(seed).uniform(-0.3, 0.3, len(t)).astype(np.float32)
+    if kind == "sine":
+        return sine.astype(np.float32)
+    if kind == "noise":
+        return noise
+    if kind == "mixed":
+        return np.where((t // 30) % 2 == 0, sine, noise).astype(np.float32)
+    raise ValueError(f"unknown kind: {kind}")
+
+
+def synth_logits(duration_sec, hop_sec=1.0, music_ratio=0.3, mean_run_sec=60, seed=0):
+    """extract_pann_logits 결과 형식({"onset", "offset", "music_logit"})의 가짜 framewise 결과 (음악/비음악 구간이 번갈아 나옴)."""
+    rng = np.random.RandomState(seed)
+    results, onset, music = [], 0.0, False
+    while onset < duration_sec:
+        run_sec = rng.exponential(mean_run_sec * (music_ratio if music else 1 - music_ratio) * 2)
+        for _ in range(max(1, int(run_sec / hop_sec))):
+            if onset >= duration_sec:
+                break
+            logit = rng.uniform(0.75, 1.0) if music else rng.uniform(0.0, 0.6)
+            results.append({"onset": onset, "offset": min(onset + hop_sec, duration_sec), "music_logit": float(logit)})
+            onset += hop_sec
+        music = not music
+    return results
+
+
+def _ffmpeg(args, path):
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp{os.path.splitext(path)[1]}"
+        subprocess.run(["ffmpeg", "-y", "-hide_banner", "-loglevel", "error", *args, tmp_path], check=True)
+        os.replace(tmp_path, path)
+    return path
+
+
+def make_audio_file(fixture_dir, duration_sec, sample_rate=32000, kind="sine"):
+    """ffmpeg lavfi로 만든 mono wav (kind: "sine" 또는 "noise")."""
+    source = (f"sine=frequency=440:sample_rate={sample_rate}:duration={duration_sec}" if kind == "sine"
+              else f"anoisesrc=color=pink:sample_rate={sample_rate}:duration={duration_sec}:amplitude=0.3")
+    path = os.path.join(fixture_dir, f"audio_{kind}_{sample_rate}_{duration_sec}s.wav")
+    return _ffmpeg(["-f", "lavfi", "-i", source, "-ac", "1"], path)
+
+
+def make_video_file(fixture_dir, duration_sec, size="320x240", fps=25, gop_sec=2):
+    """testsrc2 영상 + sine 오디오의 작은 h264/aac mp4 (gop_sec마다 keyframe)."""
+    path = os.path.join(fixture_dir, f"video_{size}_{fps}fps_{duration_sec}s.mp4")
+    return _ffmpeg([
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate={fps}:duration={duration_sec}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=44100:duration={duration_sec}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-g", str(int(fps * gop_sec)), "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "128k", "-shortest",
+    ], path)
+
+
+def make_clip_dir(root_dir, clip_id, duration_sec=10, size="320x240"):
+    """upload_clip_folder가 올리는 형식의 clip 디렉토리 ({clip_id}_video.mp4, _audio.mp3, _metadata.json)."""
+    source_dir = os.path.join(root_dir, "_sources")
+    video_path = make_video_file(source_dir, duration_sec, size)
+    audio_path = _ffmpeg(["-i", video_path, "-vn", "-acodec", "libmp3lame", "-ab", "192k"],
+                         os.path.join(source_dir, f"audio_{duration_sec}s.mp3"))
+
+    clip_dir = os.path.join(root_dir, clip_id)
+    os.makedirs(clip_dir, exist_ok=True)
+    shutil.copyfile(video_path, os.path.join(clip_dir, f"{clip_id}_video.mp4"))
+    shutil.copyfile(audio_path, os.path.join(clip_dir, f"{clip_id}_audio.mp3"))
+    with open(os.path.join(clip_dir, f"{clip_id}_metadata.json"), "w") as f:
+        json.dump({"id": clip_id, "duration": duration_sec}, f)
+    return clip_dir
@@ -0,0 +1,381 @@
+import os
+import sys
+import json
+import shutil
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import contextlib
+import numpy as np
+import torch
+
+from vp.benchmarks.fixtures import synth_audio, synth_logits, make_audio_file, make_video_file, make_clip_dir
+
+# 입력 크기 (quick: CI나 커밋마다 돌릴 작은 크기)
+SIZES = {
+    "full": {
+        "audio_sec": [60, 600, 3600],
+        "sample_rates": [16000, 32000, 44100],
+        "pann_audio_sec": [60, 600],
+        "pann_batch_sizes": [8, 32],
+        "logits_sec": [600, 3600, 4 * 3600],
+        "video_sec": [30, 120],
+        "cut_clip_sec": [5, 10],
+        "cut_num_clips": [1, 8],
+        "upload_clips": [1, 8, 32],
+        "frames_video_sec": [30, 300],
+        "frames_num_clips": 16,
+    },
+    "quick": {
+        "audio_sec": [60, 600],
+        "sample_rates": [32000, 44100],
+        "pann_audio_sec": [60],
+        "pann_batch_sizes": [8],
+        "logits_sec": [600, 3600],
+        "video_sec": [30],
+        "cut_clip_sec": [5],
+        "cut_num_clips": [1, 4],
+        "upload_clips": [1, 8],
+        "frames_video_sec": [30],
+        "frames_num_clips": 4,
+    },
+}
+
+
+def measure(fn, repeat=3, warmup=1, setup=None):
+    """
+    fn의 실행 시간 통계. setup이 있으면 매 실행 전에 (시간 측정 밖에서) 호출하고 그 반환값을 fn에 넘긴다.
+    """
+    times = []
+    for i in range(warmup + repeat):
+        arg = setup() if setup is not None else None
+        start = time.perf_counter()
+        fn(arg) if setup is not None else fn()
+        if i >= warmup:
+            times.append(time.perf_counter() - start)
+    return {
+        "repeat": repeat,
+        "min_sec": min(times),
+        "median_sec": float(np.median(times)),
+        "mean_sec": float(np.mean(times)),
+    }
+
+
+def result(name, params, timing, work=None, unit=None):
+    # work: median 1회에 처리한 양 (ex: 오디오 초) → throughput = work / median_sec
+    entry = {"name": name, "params": params, **timing}
+    if work is not None:
+        entry["throughput"] = {"unit": unit, "value": work / max(timing["median_sec"], 1e-12)}
+    return entry
+
+
+@contextlib.contextmanager
+def patched(module, **values):
+    """module 전역 값을 잠시 바꿈 (DOWNLOAD_DIR 등 constants를 star import한 값)."""
+    old = {key: getattr(module, key) for key in values}
+    for key, value in values.items():
+        setattr(module, key, value)
+    try:
+        yield
+    finally:
+        for key, value in old.items():
+            setattr(module, key, value)
+
+
+def bench_convert_audio(ctx):
+    from vp.annotation.music_detection import convert_audio
+
+    results = []
+    for sample_rate in ctx["sizes"]["sample_rates"]:
+        for duration in ctx["sizes"]["audio_sec"]:
+            wav = torch.from_numpy(synth_audio(duration, sample_rate))
+            timing = measure(lambda: convert_audio(wav, sample_rate, 32000), ctx["repeat"])
+            results.append(result("convert_audio", {"sample_rate": sample_rate, "duration_sec": duration},
+                                  timing, duration, "audio_sec/sec"))
+    return results
+
+
+def random_cnn14(inference_build=False):
+    from vp.annotation.modules.panns import Cnn14
+    from vp.annotation.modules.panns_inference import build_inference_cnn14
+
+    torch.manual_seed(0)
+    model = Cnn14(sample_rate=32000, window_size=1024, hop_size=320, mel_bins=64, fmin=50, fmax=16000,
+                  classes_num=527).eval()
+    return build_inference_cnn14(model) if inference_build else model
+
+
+def bench_extract_pann_logits(ctx):
+    from vp.annotation.music_detection import extract_pann_logits
+
+    output_dir = os.path.join(ctx["work_dir"], "pann_out")
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    for build in ("fp32", "inference"):
+        model = random_cnn14(inference_build=build == "inference")
+        for duration in ctx["sizes"]["pann_audio_sec"]:
+            audio_path = make_audio_file(ctx["fixture_dir"], duration, 44100, "noise")
+            for batch_size in ctx["sizes"]["pann_batch_sizes"]:
+                timing = measure(lambda: extract_pann_logits(audio_path, output_dir, None, "cpu", model=model,
+                                                             batch_size=batch_size), ctx["repeat"])
+                results.append(result("extract_pann_logits", {"build": build, "duration_sec": duration,
+                                                               "batch_size": batch_size, "hop_sec": None},
+                                      timing, duration, "audio_sec/sec"))
+            timing = measure(lambda: extract_pann_logits(audio_path, output_dir, None, "cpu", model=model, hop_sec=1),
+                             ctx["repeat"])
+            results.append(result("extract_pann_logits", {"build": build, "duration_sec": duration,
+                                                           "batch_size": None, "hop_sec": 1},
+                                  timing, duration, "audio_sec/sec"))
+    return results
+
+
+def bench_clip_segmentation(ctx):
+    from vp.crawling.crawl_and_upload import music_clip_ranges
+
+    results = []
+    for duration in ctx["sizes"]["logits_sec"]:
+        logits = synth_logits(duration)
+        timing = measure(lambda: music_clip_ranges(logits), ctx["repeat"])
+        results.append(result("get_clip_start_and_end.segmentation", {"duration_sec": duration, "hop_sec": 1.0},
+                              timing, duration, "audio_sec/sec"))
+    return results
+
+
+def bench_cut_clips(ctx):
+    from vp.crawling import crawl_and_upload
+    from vp.crawling.crawl_and_upload import YTCralwer
+
+    download_dir = os.path.join(ctx["work_dir"], "cut")
+    crawler = object.__new__(YTCralwer)  # _init_data(video csv) 없이 cut_clips만 사용
+    results = []
+    # 잘라낸 clip의 scratch 예약도 임시 DOWNLOAD_DIR 기준의 새 ScratchSpace에 기록
+    with patched(crawl_and_upload, DOWNLOAD_DIR=download_dir, _scratch_space=None):
+        for video_sec in ctx["sizes"]["video_sec"]:
+            original_id = f"source_{video_sec}s"
+            _, mp4_path, _, json_path = crawler.get_file_path(original_id)
+            os.makedirs(os.path.dirname(mp4_path), exist_ok=True)
+            if not os.path.exists(mp4_path):
+                shutil.copy(make_video_file(ctx["fixture_dir"], video_sec), mp4_path)
+            with open(json_path, "w") as f:
+                json.dump({"id": original_id}, f)
+
+            for clip_sec in ctx["sizes"]["cut_clip_sec"]:
+                for num_clips in ctx["sizes"]["cut_num_clips"]:
+                    if num_clips * (clip_sec + 1) > video_sec:
+                        continue
+                    # 영상에 고르게 퍼진 구간, keyframe 사이에서 시작
+                    span = video_sec / num_clips
+                    segments = [(span * (i + 0.5) - clip_sec / 2 + 0.3, span * (i + 0.5) + clip_sec / 2 + 0.3)
+                                for i in range(num_clips)]
+                    for exact in (False, True):
+                        crawler.exact_cuts = exact
+                        timing = measure(lambda: crawler.cut_clips(original_id, segments), ctx["repeat"])
+                        mode = "copy" if crawl_and_upload.CUT_STREAM_COPY and not exact else "exact"
+                        results.append(result("cut_clips", {"video_sec": video_sec, "clip_sec": clip_sec,
+                                                            "num_clips": num_clips, "mode": mode},
+                                              timing, num_clips * clip_sec, "clip_sec/sec"))
+    return results
+
+
+def bench_extract_audio(ctx):
+    from vp.crawling.crawl_and_upload import extract_audio
+
+    results = []
+    for video_sec in ctx["sizes"]["video_sec"]:
+        mp4_path = make_video_file(ctx["fixture_dir"], video_sec)
+        mp3_path = os.path.join(ctx["work_dir"], f"extract_audio_{video_sec}s.mp3")
+        timing = measure(lambda: extract_audio(mp4_path, mp3_path), ctx["repeat"])
+        results.append(result("extract_audio", {"video_sec": video_sec}, timing, video_sec, "audio_sec/sec"))
+    return results
+
+
+def bench_upload_clip_folder(ctx):
+    try:
+        from moto import mock_aws
+    except ImportError:
+        try:
+            from moto import mock_s3 as mock_aws  # moto < 5
+        except ImportError:
+            return [{"name": "upload_clip_folder", "skipped": "moto is not installed"}]
+    import boto3
+    from vp.utils import fetch_data
+
+    for key in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        os.environ.setdefault(key, "testing")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+    download_dir = os.path.join(ctx["work_dir"], "upload")
+    results = []
+    counter = iter(range(10 ** 9))
+    with mock_aws(), patched(fetch_data, DOWNLOAD_DIR=download_dir, S3_PREFIX="bench", S3_INVENTORY_PATH=None,
+                             S3_ENDPOINT_URL=None):
+        # moto 안에서 새 클라이언트/업로더를 만들도록 프로세스 캐시를 비움
+        fetch_data._s3_clients.clear()
+        fetch_data._s3_uploaders.clear()
+        boto3.client("s3").create_bucket(Bucket=fetch_data.S3_BUCKET)
+        for num_clips in ctx["sizes"]["upload_clips"]:
+            def setup():
+                clip_ids = [f"clip_{next(counter):07d}" for _ in range(num_clips)]
+                for clip_id in clip_ids:
+                    make_clip_dir(download_dir, clip_id)
+                return clip_ids
+
+            def upload(clip_ids):
+                for clip_id in clip_ids:
+                    assert fetch_data.upload_clip_folder(clip_id)
+
+            timing = measure(upload, ctx["repeat"], setup=setup)
+            results.append(result("upload_clip_folder", {"num_clips": num_clips}, timing, num_clips, "clips/sec"))
+        fetch_data._s3_clients.clear()
+        fetch_data._s3_uploaders.clear()
+    return results
+
+
+def naive_sample_frames(video_path, num_frames, size, duration):
+    """비교 기준: 영상 전체를 원본 해상도로 디코딩한 뒤 N장을 골라 frame마다 PIL로 resize."""
+    from PIL import Image
+    from vp.utils.video_io import probe_video, sample_times
+
+    info = probe_video(video_path)
+    raw = subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", video_path, "-map", "0:v:0",
+                          "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1"], check=True, capture_output=True).stdout
+    frames = np.frombuffer(raw, dtype=np.uint8).reshape(-1, info["height"], info["width"], 3)
+    indices = [min(len(frames) - 1, int(t * info["fps"])) for t in sample_times(num_frames, 0, duration)]
+    return np.stack([np.asarray(Image.fromarray(frames[i]).resize((size[1], size[0]))) for i in indices])
+
+
+def bench_sample_frames(ctx):
+    from vp.utils.video_io import sample_frames
+
+    methods = ["naive", "fps", "seek", "keyframe"]
+    try:
+        import cv2  # noqa: F401
+        methods.append("opencv")
+    except ImportError:
+        pass
+    num_frames, size = 8, (224, 224)
+    out = np.empty((num_frames, *size, 3), dtype=np.uint8)
+    results = []
+    for video_sec in ctx["sizes"]["frames_video_sec"]:
+        video_path = make_video_file(ctx["fixture_dir"], video_sec, size="1280x720")
+        for method in methods:
+            if method == "naive":
+                fn = lambda: naive_sample_frames(video_path, num_frames, size, video_sec)
+            else:
+                fn = lambda: sample_frames(video_path, num_frames, size, 0, video_sec, method=method, out=out)
+            timing = measure(fn, ctx["repeat"])
+            results.append(result("sample_frames", {"method": method, "video_sec": video_sec, "source": "1280x720",
+                                                    "num_frames": num_frames}, timing, num_frames, "frames/sec"))
+    return results
+
+
+def bench_extract_video_frames(ctx):
+    from vp.extractor.video_embs import extract_video_frames
+
+    num_clips = ctx["sizes"]["frames_num_clips"]
+    video_path = make_video_file(ctx["fixture_dir"], 30, size="1280x720")
+    frames_dir = os.path.join(ctx["work_dir"], "frames")
+    results = []
+    for num_workers in sorted({1, min(4, os.cpu_count() or 1)}):
+        timing = measure(lambda: extract_video_frames([video_path] * num_clips, frames_dir, num_workers=num_workers),
+                         ctx["repeat"])
+        results.append(result("extract_video_frames", {"num_clips": num_clips, "num_workers": num_workers},
+                              timing, num_clips, "clips/sec"))
+    return results
+
+
+BENCHMARKS = {
+    "convert_audio": bench_convert_audio,
+    "extract_pann_logits": bench_extract_pann_logits,
+    "clip_segmentation": bench_clip_segmentation,
+    "cut_clips": bench_cut_clips,
+    "extract_audio": bench_extract_audio,
+    "upload_clip_folder": bench_upload_clip_folder,
+    "sample_frames": bench_sample_frames,
+    "extract_video_frames": bench_extract_video_frames,
+}
+
+
+def environment_info():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "numpy": np.__version__,
+    }
+
+
+def result_key(entry):
+    return entry["name"], json.dumps(entry.get("params"), sort_keys=True)
+
+
+def compare_results(baseline, current, max_regression=None):
+    """
+    같은 (name, params) 결과의 median 시간 비율 (current / baseline)을 출력.
+    max_regression(ex: 0.1 = 10% 느려짐)을 넘는 항목이 있으면 False.
+    """
+    baseline_by_key = {result_key(entry): entry for entry in baseline["results"] if "median_sec" in entry}
+    ok = True
+    print(f"baseline {baseline['environment'].get('commit')} → current {current['environment'].get('commit')}")
+    for entry in current["results"]:
+        old = baseline_by_key.get(result_key(entry))
+        if old is None or "median_sec" not in entry:
+            continue
+        ratio = entry["median_sec"] / max(old["median_sec"], 1e-12)
+        regressed = max_regression is not None and ratio > 1 + max_regression
+        ok &= not regressed
+        print(f"{'❌' if regressed else '  '} {entry['name']:>36} {result_key(entry)[1]}: "
+              f"{old['median_sec'] * 1000:.1f}ms → {entry['median_sec'] * 1000:.1f}ms (x{ratio:.2f})")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the preprocessing hot paths (synthetic offline fixtures)")
+    parser.add_argument("--only", type=str, nargs="+", choices=list(BENCHMARKS), default=None)
+    parser.add_argument("--size", type=str, choices=list(SIZES), default="full")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--fixture_dir", type=str, default=None, help="reuse generated fixtures across runs (default: temp dir)")
+    parser.add_argument("--output", type=str, default=None, help="JSON output path (default: stdout)")
+    parser.add_argument("--compare", type=str, default=None, help="baseline JSON of a previous run")
+    parser.add_argument("--max_regression", type=float, default=None, help="exit 1 if a median is slower than baseline by this ratio")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="vp_bench_") as work_dir:
+        ctx = {
+            "sizes": SIZES[args.size],
+            "repeat": args.repeat,
+            "work_dir": work_dir,
+            "fixture_dir": args.fixture_dir or os.path.join(work_dir, "fixtures"),
+        }
+        results = []
+        for name in args.only or BENCHMARKS:
+            print(f"⏱️ {name}", file=sys.stderr)
+            results += BENCHMARKS[name](ctx)
+
+    report = {"environment": environment_info(), "size": args.size, "results": results}
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare is not None:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        if not compare_results(baseline, report, args.max_regression):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -26,6 +26,7 @@ VIDEO_CSV_PATH = f'{DAFTPUNK_DIR}/db/videos.csv'
 
 # Clip info
 YT_CLIP_INFO_JSON_PATH = f"{_PATH_TO_PROJECT_ROOT}/yt_dataset.json"
+YT_CLIP_MANIFEST_DIR = f"{_PATH_TO_PROJECT_ROOT}/yt_dataset_manifest"  # JSONL shards (yt_dataset.json is imported once)
 
 # Log file path
 FAILED_LOG = f"{LOG_DIR}/failed_ids_clip.txt"
@@ -39,4 +40,100 @@ S3_BUCKET = "maclab-youtube-crawl"
 PANN_CLIP_DURATION_SEC = 20
 MUSIC_LOGIT_THRESHOLD = 0.7
 CLIP_PADDING_SEC = 5
-MAX_CLIP_SEC = 30
\ No newline at end of file
+MAX_CLIP_SEC = 30
+
+# Clip cutting: stream copy from the keyframe at most CUT_KEYFRAME_TOLERANCE_SEC before the clip start, else re-encode
+CUT_STREAM_COPY = True
+CUT_KEYFRAME_TOLERANCE_SEC = 2.0
+
+# PANN batch inference
+PANN_BATCH_SIZE = 32
+PANN_DECODE_WORKERS = 4
+PANN_PREFETCH_DEPTH = 8
+
+# Framewise music detection: hop between 20s windows (None: non-overlapping 20s chunks, ex: 1 for 1s clip boundaries)
+PANN_HOP_SEC = None
+
+# PANN logits cache (None: disabled)
+PANN_CACHE_DIR = f"{_PATH_TO_PROJECT_ROOT}/cache/pann_logits"
+PANN_CACHE_MAX_BYTES = 1024 ** 3
+
+# PANN inference build (Conv+BN folded, no augmentation/dropout)
+PANN_DEVICE = None  # None: cuda if available, else cpu
+PANN_INFERENCE_BUILD = False  # PANN_QUANTIZE/PANN_TORCHSCRIPT only apply to the inference build
+PANN_QUANTIZE = False  # dynamic int8 fc1/fc_audioset, CPU only
+PANN_TORCHSCRIPT = False  # TorchScript export cached under CKPT_DIR
+PANN_LABELS = None  # AudioSet labels computed by the head (None: all 527, ex: ["Music", "Singing", "Speech"])
+
+# Staged crawl pipeline (crawl_and_upload.py --pipeline)
+PIPELINE_STAGE_WORKERS = {"download": 4, "transcode": 2, "detect": 1, "cut": 2, "upload": 4}
+PIPELINE_QUEUE_SIZE = 4
+PIPELINE_METRICS_INTERVAL_SEC = 30
+DOWNLOAD_DIR_MAX_BYTES = 100 * 1024 ** 3
+
+# S3 transfer
+S3_ENDPOINT_URL = None  # MinIO 등 S3 호환 서버 주소 (None: AWS S3)
+S3_UPLOAD_WORKERS = 8  # 동시에 업로드할 파일 수
+S3_DOWNLOAD_WORKERS = 32  # bulk 다운로드 시 동시에 받을 파일 수 (max in-flight)
+S3_MULTIPART_THRESHOLD = 64 * 1024 ** 2
+S3_MULTIPART_CHUNKSIZE = 16 * 1024 ** 2
+S3_PART_CONCURRENCY = 4  # 파일 하나의 multipart part 동시 업로드 수
+S3_MAX_POOL_CONNECTIONS = max(S3_UPLOAD_WORKERS, S3_DOWNLOAD_WORKERS) * S3_PART_CONCURRENCY
+S3_UPLOAD_RETRIES = 5
+
+# Local S3 inventory index (None: disabled, S3 LIST per query)
+S3_INVENTORY_PATH = f"{_PATH_TO_PROJECT_ROOT}/cache/s3_inventory.sqlite"
+S3_INVENTORY_MAX_AGE_SEC = 60 * 60  # 크롤링 시작 시 마지막 동기화가 이보다 오래됐으면 다시 listing
+
+# Crawl state store (replaces the FAILED_LOG/UPLOAD_FAILED_LOG/COMPLETED_LOG txt files, which are imported once)
+CRAWL_STATE_DB_PATH = f"{LOG_DIR}/crawl_state.sqlite"
+
+# Download scheduling: token bucket per cookie file, AIMD rate control (requests/sec per cookie)
+DOWNLOAD_INITIAL_RATE = 0.05
+DOWNLOAD_MIN_RATE = 0.001
+DOWNLOAD_MAX_RATE = 0.5
+DOWNLOAD_RATE_INCREASE = 0.002  # 성공할 때마다 더함
+DOWNLOAD_RATE_DECREASE = 0.5  # 차단될 때마다 곱함
+DOWNLOAD_BLOCK_COOLDOWN_SEC = 60  # 차단된 쿠키를 쉬게 하는 시간 (연속 차단마다 2배)
+
+# Section download (YTCralwer): PANN on a low-bitrate audio-only stream first, then video only for the music sections
+YT_SECTION_DOWNLOAD = False  # crawl_and_upload.py --section_download turns it on for one run
+SECTION_AUDIO_FORMAT = "bestaudio[abr<=64]/worstaudio"
+SECTION_MERGE_GAP_SEC = 30  # 간격이 이보다 짧은 clip들은 한 range로 받음
+SECTION_MAX_RANGES = 6  # range가 이보다 많으면 전체 다운로드
+SECTION_MAX_COVERAGE = 0.6  # range 길이 합이 영상 길이의 이 비율을 넘으면 전체 다운로드
+
+# Scratch space of DOWNLOAD_DIR: downloads reserve their estimated size within DOWNLOAD_DIR_MAX_BYTES
+SCRATCH_MIN_FREE_BYTES = 10 * 1024 ** 3  # 디스크에 항상 남겨둘 여유 공간
+SCRATCH_ESTIMATE_FACTOR = 1.5  # yt-dlp filesize 대비 예약 크기 (원본 + 잘라낸 clip mp4/mp3)
+SCRATCH_DEFAULT_JOB_BYTES = 512 * 1024 ** 2  # metadata에 크기가 없을 때
+SCRATCH_WAIT_TIMEOUT_SEC = 600
+SCRATCH_TMPFS_DIR = "/dev/shm/vp_scratch"  # audio-only 스트림 등 작은 중간 파일 (None: 사용 안 함)
+SCRATCH_TMPFS_MAX_BYTES = 2 * 1024 ** 3
+
+# Stage timing metrics (JSONL per run, summary printed every METRICS_SUMMARY_INTERVAL_SEC)
+METRICS_DIR = f"{LOG_DIR}/metrics"
+METRICS_SUMMARY_INTERVAL_SEC = 60
+
+# Audio embeddings (Cnn14 2048-d, float16 sharded memmap store, see vp/utils/embedding_store.py)
+AUDIO_EMB_DIR = f"{_PATH_TO_PROJECT_ROOT}/data/embeddings/audio_cnn14"
+AUDIO_EMB_DIM = 2048
+EMB_ROWS_PER_SHARD = 16384
+
+# Video frame sampling (vp/utils/video_io.sample_frames, vp/extractor/video_embs.py)
+VIDEO_NUM_FRAMES = 8
+VIDEO_FRAME_SIZE = (224, 224)  # (height, width)
+VIDEO_SEEK_MIN_GAP_SEC = 5  # sample 간격이 이보다 길면 sample마다 keyframe seek, 아니면 구간을 한 번 디코딩
+VIDEO_DECODE_WORKERS = 8
+VIDEO_FRAMES_DIR = f"{_PATH_TO_PROJECT_ROOT}/data/frames"
+
+# Near-duplicate clips (re-uploads of the same performance): LSH index over clip audio embeddings, checked before cutting
+DEDUP_INDEX_DIR = None  # ex: f"{_PATH_TO_PROJECT_ROOT}/cache/dedup_index" (needs clip embeddings in AUDIO_EMB_DIR for its mean)
+DEDUP_SIMILARITY_THRESHOLD = 0.95  # cosine 유사도 (projection 후)
+DEDUP_PROJ_DIM = 128
+DEDUP_LSH_TABLES = 8
+DEDUP_LSH_BITS = 14
+DEDUP_REFRESH_SEC = 60  # 다른 worker가 추가한 항목을 다시 읽는 간격
+
+# MMTrailerCrawler: one job per video, clips cut locally from one download of merged sections (SECTION_* above)
+MMTRAILER_GROUP_BY_VIDEO = True
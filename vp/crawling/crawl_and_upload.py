@@ -1,26 +1,99 @@
 import yt_dlp
 from yt_dlp.utils import download_range_func
 import os
+import glob
 import json
 import numpy as np
 import shutil
 import subprocess
-import time
-import random
 import argparse
 import pandas as pd
 from tqdm import tqdm
-from multiprocessing import Pool, Value, Lock
-
-import boto3
+from multiprocessing import Pool
 
 from vp.utils.fetch_data import *
 from vp.configs.constants import *
-from vp.annotation.music_detection import extract_pann_logits
-
-s3 = boto3.client("s3")
-cur_cookie_index = Value('i', 0)
-cookie_lock = Lock()
+from vp.crawling.pipeline import Stage, StagePipeline, dir_size_bytes
+from vp.crawling.download_scheduler import CookieScheduler, list_cookie_files
+from vp.utils.metadata_io import ClipManifest
+from vp.utils.scratch_space import ScratchSpace, estimate_download_bytes
+from vp.utils.metrics import timed, start_metrics_run, MetricsReporter
+from vp.utils.video_io import cut_segments
+from vp.utils.dedup_index import DuplicateIndex
+from vp.annotation.music_detection import (extract_pann_logits, get_pann_cache, load_cached_pann_logits, resolve_device,
+                                           ensure_pann_checkpoint, share_pann_model, init_pann_worker, get_pann_model)
+from vp.extractor.audio_embs import clip_audio_embeddings, pool_clip_embeddings, load_audio_embeddings
+
+_download_scheduler = None
+
+
+def get_download_scheduler():
+    """
+    프로세스 전체에서 공유하는 CookieScheduler. 상태가 shared memory에 있으므로
+    Pool을 만들기 전에 부모 프로세스에서 먼저 호출해야 worker들이 같은 bucket을 쓴다.
+    """
+    global _download_scheduler
+    if _download_scheduler is None:
+        _download_scheduler = CookieScheduler(
+            list_cookie_files(COOKIES_FILE_DIR),
+            initial_rate=DOWNLOAD_INITIAL_RATE,
+            min_rate=DOWNLOAD_MIN_RATE,
+            max_rate=DOWNLOAD_MAX_RATE,
+            increase_per_success=DOWNLOAD_RATE_INCREASE,
+            decrease_factor=DOWNLOAD_RATE_DECREASE,
+            block_cooldown_sec=DOWNLOAD_BLOCK_COOLDOWN_SEC,
+        )
+    return _download_scheduler
+
+
+_scratch_space = None
+
+
+def get_scratch_space():
+    """
+    프로세스 전체에서 공유하는 DOWNLOAD_DIR ScratchSpace. get_download_scheduler처럼
+    Pool을 만들기 전에 부모 프로세스에서 먼저 호출해야 worker들이 같은 budget을 쓴다.
+    """
+    global _scratch_space
+    if _scratch_space is None:
+        _scratch_space = ScratchSpace(
+            DOWNLOAD_DIR,
+            max_bytes=DOWNLOAD_DIR_MAX_BYTES,
+            min_free_bytes=SCRATCH_MIN_FREE_BYTES,
+            tmpfs_dir=SCRATCH_TMPFS_DIR,
+            tmpfs_max_bytes=SCRATCH_TMPFS_MAX_BYTES,
+            wait_timeout_sec=SCRATCH_WAIT_TIMEOUT_SEC,
+        )
+    return _scratch_space
+
+
+_dedup_index = None
+
+
+def get_dedup_index():
+    """
+    near-duplicate clip 검색용 DuplicateIndex (DEDUP_INDEX_DIR이 None이면 None).
+    Pool을 만들기 전에 부모 프로세스에서 먼저 호출하면 worker들이 읽어 둔 index를 fork로 이어받는다.
+    index를 처음 만들 때는 AUDIO_EMB_DIR에 있는 clip embedding들의 평균을 mean으로 쓰고,
+    그런 embedding이 없으면 index를 만들지 않고 dedup 없이 crawl한다.
+    """
+    global _dedup_index
+    if _dedup_index is None and DEDUP_INDEX_DIR is not None:
+        mean = None
+        if not os.path.exists(os.path.join(DEDUP_INDEX_DIR, "mean.npy")):
+            if os.path.exists(os.path.join(AUDIO_EMB_DIR, "meta.json")):
+                _, embeddings = load_audio_embeddings(AUDIO_EMB_DIR)
+                mean = embeddings.mean(axis=0) if len(embeddings) else None
+            if mean is None:
+                # Cnn14 embedding은 음수가 없어서 평균을 빼지 않으면 서로 다른 음악도 cosine 유사도가 높게 나옴
+                print(f"⚠️ dedup 비활성화: {AUDIO_EMB_DIR}에 index의 mean을 정할 clip embedding이 없음 "
+                      f"(vp/extractor/audio_embs.py로 추출한 뒤 다시 실행)")
+                _dedup_index = False
+                return None
+        _dedup_index = DuplicateIndex(DEDUP_INDEX_DIR, mean=mean)
+        print(f"♻️ dedup index: {len(_dedup_index)}개 clip")
+    # False: mean이 없어 비활성화됨
+    return None if _dedup_index is False else _dedup_index
 
 
 def extract_audio(mp4_path, mp3_path):
@@ -30,89 +103,322 @@ def extract_audio(mp4_path, mp3_path):
         "-vn", "-acodec", "libmp3lame", "-ab", "192k",
         mp3_path
     ]
-    subprocess.run(cmd, check=True)
+    with timed("extract_audio", key=os.path.basename(mp4_path), nbytes=os.path.getsize(mp4_path)):
+        subprocess.run(cmd, check=True)
+
+
+def downloaded_bytes(info):
+    # size of the files yt-dlp wrote for info (one per format/section)
+    paths = [d.get("filepath") for d in info.get("requested_downloads") or []]
+    return sum(os.path.getsize(path) for path in paths if path and os.path.exists(path))
+
+
+def music_clip_ranges(logits, threshold=MUSIC_LOGIT_THRESHOLD, padding_sec=CLIP_PADDING_SEC, max_clip_sec=MAX_CLIP_SEC):
+    """
+    PANN 결과(onset/offset/music_logit)에서 music_logit이 threshold를 넘는 연속 구간을 찾아
+    padding_sec만큼 늘리고 max_clip_sec 단위로 나눈 clip (start, end) 리스트.
+    """
+    # Convert logits to binary
+    binary = [logit["music_logit"] > threshold for logit in logits]
+
+    # Group clips based on binary sequence
+    music_onset_offset_list = []
+    i = 0
+    start, end = -1, -1
+    for i in range(len(binary)):
+        if binary[i]:
+            if start == -1:
+                start = logits[i]["onset"]
+            end = logits[i]["offset"]
+        else:
+            if start != -1:
+                music_onset_offset_list.append((start, end))
+            start, end = -1, -1
+    if start != -1:
+        music_onset_offset_list.append((start, end))
+
+    for i in range(len(music_onset_offset_list)):
+        music_onset_offset_list[i] = (max(0, music_onset_offset_list[i][0] - padding_sec), music_onset_offset_list[i][1] + padding_sec)
+
+    # Split into clips if longer than max_clip_sec
+    clip_onset_offset_list = []
+    for start, end in music_onset_offset_list:
+        duration = end - start
+        if duration > max_clip_sec:
+            num_clips = int(np.ceil(duration / max_clip_sec))
+            for j in range(num_clips):
+                clip_start = start + j * max_clip_sec
+                clip_end = min(end, clip_start + max_clip_sec)
+                clip_onset_offset_list.append((clip_start, clip_end))
+        else:
+            clip_onset_offset_list.append((start, end))
+
+    return clip_onset_offset_list
+
+
+def plan_sections(clips, duration=None, merge_gap_sec=SECTION_MERGE_GAP_SEC, max_ranges=SECTION_MAX_RANGES,
+                  max_coverage=SECTION_MAX_COVERAGE):
+    """
+    음악 clip 구간들을 yt-dlp download_ranges로 받을 section으로 묶음.
+    간격이 merge_gap_sec 이하인 clip들은 한 section으로 받는다 (range마다 seek와 경계 re-encode 비용이 듦).
+
+    Parameters:
+    - clips (list of tuple): 잘라낼 clip (start, end, ...) 구간 (초), 뒤의 값(ex: clip_id)은 그대로 section에 담김
+    - duration (float, optional): 영상 길이 (초)
+
+    Returns:
+    - sections (list of (float, float, list)): (start, end, section 안의 clip들).
+      section이 max_ranges개보다 많거나 영상의 max_coverage 이상을 덮으면 전체 다운로드가 더 빠르므로 None
+    """
+    sections = []
+    for clip in sorted(clips):
+        start, end = clip[:2]
+        if sections and start - sections[-1][1] <= merge_gap_sec:
+            sections[-1][1] = max(sections[-1][1], end)
+            sections[-1][2].append(clip)
+        else:
+            sections.append([start, end, [clip]])
+    if len(sections) > max_ranges:
+        return None
+    if duration and sum(end - start for start, end, _ in sections) > max_coverage * duration:
+        return None
+    return [tuple(section) for section in sections]
+
+
+def group_clips_by_video(clips):
+    """
+    (video_id, clip_id, start, end) job들을 영상별로 묶음: [(video_id, [(clip_id, start, end), ...])].
+    영상 순서는 처음 나온 순서를 따른다.
+    """
+    groups = {}
+    for video_id, clip_id, start, end in clips:
+        groups.setdefault(video_id, []).append((clip_id, start, end))
+    return list(groups.items())
 
 
 class Crawler:
+    # Extract the full-length mp3 right after download (False: clips get their mp3 when they are cut)
+    extract_full_audio = True
+    # Re-encode every cut clip at its exact start (False: stream copy from a nearby keyframe, see cut_segments)
+    exact_cuts = False
+
     def __init__(self, dataset_path=None):
         self._init_data(dataset_path)
 
     def _init_data(self, dataset_path):
         raise NotImplementedError
 
-    def get_cookie_file_path(self):
-        with cookie_lock:
-            cookie_file_names = [f for f in os.listdir(COOKIES_FILE_DIR) if f.endswith('.txt')] + ['default.txt']
-            cur_cookie_index.value %= len(cookie_file_names)
-            cookie_file_name = cookie_file_names[cur_cookie_index.value]
-            return os.path.join(COOKIES_FILE_DIR, cookie_file_name)
-
-    def handle_error_message(self, error_message, used_cookie_fn):
-        if "not a bot" in error_message or "rate-limited" in error_message:
-            with cookie_lock:
-                if self.get_cookie_file_path() == used_cookie_fn:
-                    cur_cookie_index.value += 1
-                    print(f"🔄 쿠키 파일 변경: {self.get_cookie_file_path()}")
-
     def download_clip(self, args):
-        video_id, clip_id, start_sec, end_sec = args
-
-        clip_dir, mp4_path, mp3_path, json_path = self.get_file_path(clip_id)
-        shutil.rmtree(clip_dir, ignore_errors=True)
-        os.makedirs(clip_dir, exist_ok=True)
+        _, clip_id, _, _ = args
+        return self.fetch_clip(args) and self.transcode_clip(clip_id)
 
+    def get_ytdlp_file_path(self, clip_id):
         # file path used after download with yt-dlp
+        clip_dir = os.path.join(DOWNLOAD_DIR, clip_id)
         ytdlp_mp4_path = os.path.join(clip_dir, f"{clip_id}.mp4")
         ytdlp_mp3_path = os.path.join(clip_dir, f"{clip_id}_audio.mp3")
         ytdlp_json_path = os.path.join(clip_dir, f"{clip_id}.info.json")
         mp4_template = os.path.join(clip_dir, f"{clip_id}.%(ext)s")
+        return ytdlp_mp4_path, ytdlp_mp3_path, ytdlp_json_path, mp4_template
 
-        cookie_fn = self.get_cookie_file_path()
+    def fetch_clip(self, args):
+        video_id, clip_id, start_sec, end_sec = args
 
-        try:
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'noplaylist': True,
-                'ignoreerrors': False,
-                'cookiefile': cookie_fn,
-                'outtmpl': mp4_template,
-                'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/mp4',
-                'merge_output_format': 'mp4',
-                'writeinfojson': True,
-                'force_keyframes_at_cuts': True,
-                'postprocessors': [],
-            }
-            if start_sec is not None and end_sec is not None:
-                ydl_opts['download_ranges'] = download_range_func(None, [(start_sec, end_sec)])
-            
-            # ✅ 랜덤한 시간 지연 추가 (0.5초 ~ 1.5초)
-            sleep_time = random.uniform(0.5, 1.5)
-            print(f"[WAIT] {clip_id} 다운로드 전 대기 중... ({sleep_time:.2f}초)")
-            time.sleep(sleep_time)
+        clip_dir, _, _, _ = self.get_file_path(clip_id)
+        self.remove_clip_dir(clip_id)
+        os.makedirs(clip_dir, exist_ok=True)
 
-            print(f">>> {clip_id} 다운로드 중...")
+        _, _, _, mp4_template = self.get_ytdlp_file_path(clip_id)
+        ydl_opts = {
+            'outtmpl': mp4_template,
+            'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/mp4',
+            'merge_output_format': 'mp4',
+            'writeinfojson': True,
+            'force_keyframes_at_cuts': True,
+        }
+        if start_sec is not None and end_sec is not None:
+            ydl_opts['download_ranges'] = download_range_func(None, [(start_sec, end_sec)])
+
+        if not self.ytdlp_download(video_id, clip_id, ydl_opts):
+            self.remove_clip_dir(clip_id)
+            return False
+        return True
+
+    def remove_clip_dir(self, clip_id):
+        # clip 디렉토리를 지우고 scratch 예약(tmpfs 디렉토리 포함)을 반납
+        clip_dir, _, _, _ = self.get_file_path(clip_id)
+        shutil.rmtree(clip_dir, ignore_errors=True)
+        get_scratch_space().release(clip_id)
+
+    def ytdlp_download(self, video_id, clip_id, ydl_opts, ranges=None, prefer_tmpfs=False, plan_fn=None):
+        """
+        yt-dlp 다운로드 한 번 (쿠키는 download scheduler에서 받음). 실패하면 FAILED_LOG에 기록하고 False.
+        format을 고른 뒤 metadata의 파일 크기로 clip_id의 scratch 공간을 예약하고 다운로드한다
+        (ranges가 있으면 그 구간 비율만큼). prefer_tmpfs면 tmpfs에 자리가 있을 때 그곳에 받는다
+        (ydl_opts의 outtmpl은 'paths' 기준 상대 경로여야 함). 예약을 기다리는 시간은 "download" 시간에 들어가지 않는다.
+        plan_fn(info)가 있으면 받은 metadata로 (바꿀 ydl params, ranges)를 정한 뒤 같은 세션에서 다운로드한다.
+        """
+        # 쿠키별 token bucket에서 요청 허가를 받음 (고정 sleep 대신 차단 신호에 따라 속도 조절)
+        scheduler = get_download_scheduler()
+        scratch = get_scratch_space()
+        cookie_fn = scheduler.acquire()
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'noplaylist': True,
+            'ignoreerrors': False,
+            'cookiefile': cookie_fn,
+            'postprocessors': [],
+            **ydl_opts,
+        }
+
+        try:
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([f"https://www.youtube.com/watch?v={video_id}"])
+                # metadata만 먼저 받음 (scratch 공간을 기다리는 동안 요청을 쥐고 있지 않도록)
+                with timed("metadata", key=clip_id):
+                    info = ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=False)
+                    if plan_fn is not None:
+                        params, ranges = plan_fn(info)
+                        ydl.params.update(params)
+                nbytes = estimate_download_bytes(info, ranges, SCRATCH_DEFAULT_JOB_BYTES)
+
+                # scratch 대기는 다운로드 시간에 넣지 않고, 실패해도 쿠키 탓으로 보고하지 않음
+                try:
+                    tmp_dir = scratch.tmp_dir(clip_id, nbytes) if prefer_tmpfs else None
+                    if tmp_dir is not None:
+                        ydl.params['paths'] = {'home': tmp_dir}
+                    else:
+                        # 원본 + 잘라낸 clip(mp4/mp3)이 함께 있는 시점까지 고려
+                        scratch.reserve(clip_id, nbytes * SCRATCH_ESTIMATE_FACTOR)
+                except Exception as e:
+                    log_result(clip_id, FAILED_LOG, f"scratch 공간 예약 실패: {e}")
+                    return False
+
+                print(f">>> {clip_id} 다운로드 중... ({nbytes / 1024 ** 2:.0f}MB)")
+                with timed("download", key=clip_id) as t:
+                    info = ydl.process_ie_result(info, download=True)
+                    t.nbytes = downloaded_bytes(info) or nbytes
 
         except Exception as e:
             error_msg = str(e).lower()
             log_result(clip_id, FAILED_LOG, error_msg)
-            self.handle_error_message(error_msg, cookie_fn)
-            shutil.rmtree(clip_dir, ignore_errors=True)
+            scheduler.report(cookie_fn, False, error_msg)
             return False
 
-        if os.path.exists(ytdlp_mp4_path):
+        scheduler.report(cookie_fn, True)
+        return True
+
+    def fetch_sources(self, video_id, clips):
+        """
+        한 영상의 여러 clip을 자를 source mp4들을 yt-dlp 세션 한 번으로 받음.
+        받은 metadata의 영상 길이로 plan_sections를 정해 가까운 clip들은 한 section으로 묶어 download_ranges로 받고,
+        section이 너무 많거나 영상 대부분을 덮으면 전체 비디오를 받는다.
+
+        Parameters:
+        - clips (list of tuple): (start, end, ...) clip 구간 (초)
+
+        Returns:
+        - sources (list of (str, float, list)): (mp4 경로, 영상 안에서의 시작 시각, 그 mp4에서 자를 clip들),
+          다운로드에 실패하면 None
+        """
+        clip_dir, mp4_path, _, json_path = self.get_file_path(video_id)
+        self.remove_clip_dir(video_id)
+        os.makedirs(clip_dir, exist_ok=True)
+        section_template = os.path.join(clip_dir, f"{video_id}_section_%(section_start)d.%(ext)s")
+        plan = {}
+
+        def plan_fn(info):
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(yt_dlp.YoutubeDL.sanitize_info(info), f, ensure_ascii=False)
+            plan["sections"] = plan_sections(clips, info.get("duration"))
+            if plan["sections"] is None:
+                return {}, None
+            ranges = [(start, end) for start, end, _ in plan["sections"]]
+            return {
+                'outtmpl': {'default': section_template},
+                'download_ranges': download_range_func(None, ranges),
+                'force_keyframes_at_cuts': True,
+            }, ranges
+
+        ydl_opts = {
+            'outtmpl': os.path.join(clip_dir, f"{video_id}_video.%(ext)s"),
+            'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/mp4',
+            'merge_output_format': 'mp4',
+        }
+        if not self.ytdlp_download(video_id, video_id, ydl_opts, plan_fn=plan_fn):
+            self.remove_clip_dir(video_id)
+            return None
+
+        if plan["sections"] is None:
+            sources = [(mp4_path, 0.0, sorted(clips))]
+        else:
+            sources = [(os.path.join(clip_dir, f"{video_id}_section_{int(start)}.mp4"), start, section_clips)
+                       for start, _, section_clips in plan["sections"]]
+        for source_path, start, _ in sources:
+            if not os.path.exists(source_path):
+                log_result(video_id, FAILED_LOG, f"다운로드된 source 없음: {os.path.basename(source_path)}")
+                self.remove_clip_dir(video_id)
+                return None
+        return sources
+
+    def cut_clips(self, original_id, onset_offset_list, source_path=None, offset=0.0, first_idx=0, new_clip_ids=None):
+        """
+        Cut every (start, end) segment of the original video in a single ffmpeg run.
+        source_path is a section of the video starting at offset (default: the full mp4).
+        Clips are named {original_id}_{idx:07d} from first_idx unless new_clip_ids are given.
+        Returns (video_id, new_clip_id, start, end) of the cut clips, with start snapped to
+        the keyframe used for stream copy.
+        """
+        _, mp4_path, _, json_path = self.get_file_path(original_id)
+        if source_path is not None:
+            mp4_path = source_path
+        if new_clip_ids is None:
+            new_clip_ids = [f"{original_id}_{idx:07d}" for idx in range(first_idx, first_idx + len(onset_offset_list))]
+        new_paths = [self.get_file_path(new_id) for new_id in new_clip_ids]
+        for new_clip_dir, _, _, _ in new_paths:
+            os.makedirs(new_clip_dir, exist_ok=True)
+
+        # Cut video and audio
+        try:
+            with timed("cut", key=original_id, nbytes=os.path.getsize(mp4_path)):
+                cuts = cut_segments(mp4_path, [(start - offset, end - offset) for start, end in onset_offset_list],
+                                    mp4_paths=[new_mp4_path for _, new_mp4_path, _, _ in new_paths],
+                                    mp3_paths=[new_mp3_path for _, _, new_mp3_path, _ in new_paths],
+                                    stream_copy=CUT_STREAM_COPY and not self.exact_cuts)
+        except subprocess.CalledProcessError as e:
+            print(f"❌ Clip cutting failed for {original_id}: {e}")
+            for new_id in new_clip_ids:
+                self.remove_clip_dir(new_id)
+            return []
+
+        # metadata
+        for _, _, _, new_json_path in new_paths:
+            shutil.copy(json_path, new_json_path)
+
+        # the clips stay on disk until uploaded
+        scratch = get_scratch_space()
+        for new_id, (new_clip_dir, _, _, _) in zip(new_clip_ids, new_paths):
+            scratch.account(new_id, dir_size_bytes(new_clip_dir))
+
+        return [(original_id, new_id, cut["start"] + offset, cut["end"] + offset) for new_id, cut in zip(new_clip_ids, cuts)]
+
+    def transcode_clip(self, clip_id):
+        clip_dir, mp4_path, mp3_path, json_path = self.get_file_path(clip_id)
+        ytdlp_mp4_path, ytdlp_mp3_path, ytdlp_json_path, _ = self.get_ytdlp_file_path(clip_id)
+
+        if os.path.exists(ytdlp_mp4_path) and self.extract_full_audio:
             extract_audio(ytdlp_mp4_path, ytdlp_mp3_path)
 
-        if not (os.path.exists(ytdlp_mp4_path) and os.path.exists(ytdlp_mp3_path) and os.path.exists(ytdlp_json_path)):
+        if not (os.path.exists(ytdlp_mp4_path) and os.path.exists(ytdlp_json_path)
+                and (os.path.exists(ytdlp_mp3_path) or not self.extract_full_audio)):
             log_result(clip_id, FAILED_LOG, "다운로드된 파일 없음")
-            shutil.rmtree(clip_dir, ignore_errors=True)
+            self.remove_clip_dir(clip_id)
             return False
         
         # Change file name
         os.rename(ytdlp_mp4_path, mp4_path)
-        os.rename(ytdlp_mp3_path, mp3_path)
+        if self.extract_full_audio:
+            os.rename(ytdlp_mp3_path, mp3_path)
         os.rename(ytdlp_json_path, json_path)
 
         return True
@@ -123,8 +429,10 @@ class Crawler:
         else:
             _, clip_id, _, _ = video_info
         clip_dir, _, _, _ = self.get_file_path(clip_id)
-        if upload_clip_folder(clip_id):
-            shutil.rmtree(clip_dir)
+        with timed("upload", key=clip_id, nbytes=dir_size_bytes(clip_dir)):
+            uploaded = upload_clip_folder(clip_id)
+        if uploaded:
+            self.remove_clip_dir(clip_id)
             log_result(clip_id, COMPLETED_LOG)
             print(f"업로드 성공: {clip_id}")
             return True
@@ -144,17 +452,67 @@ class Crawler:
             return self.s3_upload(video_info)
         return False
 
+    def worker_init(self):
+        # (initializer, initargs) of the Pool workers
+        return None, ()
+
     def run(self):
         print(f"🔍 처리할 clip_id 수: {len(self.data)}")
-        with Pool(NUM_WORKERS) as pool:
-            with tqdm(total=len(self.data), desc="다운로드 및 업로드 진행") as pbar:
-                for _ in pool.imap_unordered(self.process, self.data):
-                    pbar.update(1)
+        refresh_s3_inventory()
+        scheduler = get_download_scheduler()  # fork 전에 만들어야 worker들이 공유
+        get_scratch_space().cleanup_orphans(keep=load_ids(UPLOAD_FAILED_LOG))  # 업로드 재시도용 clip은 남김
+        print(f"⏱️ metrics: {start_metrics_run()}")
+        initializer, initargs = self.worker_init()
+        with MetricsReporter(METRICS_SUMMARY_INTERVAL_SEC):
+            with Pool(NUM_WORKERS, initializer=initializer, initargs=initargs) as pool:
+                with tqdm(total=len(self.data), desc="다운로드 및 업로드 진행") as pbar:
+                    for _ in pool.imap_unordered(self.process, self.data):
+                        pbar.update(1)
+        scheduler.print_stats()
 
     def process(self, video_info):
         raise NotImplementedError("process() must be implemented by subclasses")
 
+    def download_stage(self, video_info):
+        return [video_info] if self.fetch_clip(video_info) else []
+
+    def transcode_stage(self, video_info):
+        _, clip_id, _, _ = video_info
+        return [video_info] if self.transcode_clip(clip_id) else []
+
+    def upload_stage(self, video_info):
+        self.s3_upload(video_info)
+        return []
+
+    def pipeline_stages(self):
+        # download → transcode → upload (각 stage 함수는 다음 stage로 넘길 item 리스트를 반환)
+        workers = PIPELINE_STAGE_WORKERS
+        return [
+            Stage("download", self.download_stage, workers["download"], PIPELINE_QUEUE_SIZE),
+            Stage("transcode", self.transcode_stage, workers["transcode"], PIPELINE_QUEUE_SIZE),
+            Stage("upload", self.upload_stage, workers["upload"], PIPELINE_QUEUE_SIZE),
+        ]
+
+    def run_pipeline(self):
+        print(f"🔍 처리할 clip_id 수: {len(self.data)}")
+        refresh_s3_inventory()
+        # DOWNLOAD_DIR 사용량은 다운로드마다 ScratchSpace 예약으로 제한
+        get_scratch_space().cleanup_orphans(keep=load_ids(UPLOAD_FAILED_LOG))  # 업로드 재시도용 clip은 남김
+        print(f"⏱️ metrics: {start_metrics_run(run_name='pipeline')}")
+        pipeline = StagePipeline(self.pipeline_stages(),
+                                 metrics_interval_sec=PIPELINE_METRICS_INTERVAL_SEC)
+        with MetricsReporter(METRICS_SUMMARY_INTERVAL_SEC):
+            metrics = pipeline.run(self.data)
+        get_s3_uploader().print_stats()
+        get_download_scheduler().print_stats()
+        return metrics
+
 class MMTrailerCrawler(Crawler):
+    # One job per video: its clips are cut locally from one download (False: one yt-dlp range download per clip)
+    group_by_video = MMTRAILER_GROUP_BY_VIDEO
+    # dataset clips are given by frame index, so they are cut exactly
+    exact_cuts = True
+
     def __init__(self, dataset_path):
         super().__init__(dataset_path=dataset_path)
     
@@ -169,170 +527,417 @@ class MMTrailerCrawler(Crawler):
         with open(dataset_path, "r", encoding="utf-8") as f:
             data = json.load(f)
 
-        failed = load_ids(FAILED_LOG)
-        completed = load_ids(COMPLETED_LOG)
-        filtered = [item for item in data if item['clip_id'] not in failed and item['clip_id'] not in completed]
+        todo = set(get_crawl_state().filter_todo(item['clip_id'] for item in data))
+        filtered = [item for item in data if item['clip_id'] in todo]
         self.data = [refine(item) for item in filtered]
-        
+        if self.group_by_video:
+            groups = group_clips_by_video(self.data)
+            print(f"📦 {len(self.data)}개 clip → {len(groups)}개 영상으로 묶음")
+            self.data = groups
+
+    def fetch_group(self, group):
+        """영상 하나의 clip들을 한 번에 받을 sources (see fetch_sources), 실패하면 clip마다 기록하고 None."""
+        video_id, clips = group
+        sources = self.fetch_sources(video_id, [(start, end, clip_id) for clip_id, start, end in clips])
+        if sources is None:
+            for clip_id, _, _ in clips:
+                log_result(clip_id, FAILED_LOG, f"source 다운로드 실패: {video_id}")
+        return sources
+
+    def cut_group(self, video_id, sources):
+        """sources에서 dataset의 clip_id로 clip들을 잘라내고 (video_id, clip_id, start, end) 리스트를 반환."""
+        cut = []
+        for source_path, offset, section_clips in sources:
+            clips = self.cut_clips(video_id, [(start, end) for start, end, _ in section_clips],
+                                   source_path=source_path, offset=offset,
+                                   new_clip_ids=[clip_id for _, _, clip_id in section_clips])
+            if not clips:
+                for _, _, clip_id in section_clips:
+                    log_result(clip_id, FAILED_LOG, "clip 자르기 실패")
+            cut += clips
+        return cut
+
     def process(self, video_info):
-        if self.download_clip(video_info):
-            return self.s3_upload(video_info)
-        return False
-    
+        if not self.group_by_video:
+            if self.download_clip(video_info):
+                return self.s3_upload(video_info)
+            return False
+
+        video_id, _ = video_info
+        sources = self.fetch_group(video_info)
+        if sources is None:
+            return False
+        uploaded = [self.s3_upload(clip) for clip in self.cut_group(video_id, sources)]
+        self.remove_clip_dir(video_id)
+        return bool(uploaded) and all(uploaded)
+
+    def fetch_stage(self, group):
+        sources = self.fetch_group(group)
+        return [] if sources is None else [(group[0], sources)]
+
+    def cut_stage(self, item):
+        video_id, sources = item
+        clips = self.cut_group(video_id, sources)
+
+        # Cleanup original download
+        self.remove_clip_dir(video_id)
+        return clips
+
+    def pipeline_stages(self):
+        if not self.group_by_video:
+            return super().pipeline_stages()
+        # download(sources of a video) → cut → upload
+        workers = PIPELINE_STAGE_WORKERS
+        return [
+            Stage("download", self.fetch_stage, workers["download"], PIPELINE_QUEUE_SIZE),
+            Stage("cut", self.cut_stage, workers["cut"], PIPELINE_QUEUE_SIZE),
+            Stage("upload", self.upload_stage, workers["upload"], PIPELINE_QUEUE_SIZE),
+        ]
+
+
 class YTCralwer(Crawler):
+    # PANN decodes the audio track of the mp4 directly; only the cut clips need an mp3
+    extract_full_audio = False
+    # Run PANN on an audio-only download and fetch video only for the music sections (False: full video first)
+    section_download = YT_SECTION_DOWNLOAD
+
     def __init__(self, dataset_path):
         self.clip_info_json_path = YT_CLIP_INFO_JSON_PATH
-        self.clip_info_list = []
+        self.manifest = ClipManifest(YT_CLIP_MANIFEST_DIR)
+        # 중복 검사를 통과한 clip의 embedding은 업로드에 성공한 뒤에만 dedup index에 추가한다
+        self.dedup_pending = {}  # video_id -> {(start, end): embedding}, 자르기 전
+        self.dedup_clips = {}    # clip_id -> embedding, 잘라낸 뒤 업로드 전
         super().__init__(dataset_path=dataset_path)
     
     def _init_data(self, dataset_path):
         df = pd.read_csv(dataset_path)
         
         # Filter out already processed video_ids
-        if os.path.exists(self.clip_info_json_path):
-            with open(self.clip_info_json_path, 'r') as f:
-                self.clip_info_list = json.load(f)
-        existing_video_ids = set(item['video_id'] for item in self.clip_info_list) if self.clip_info_list else set()
+        self.manifest.migrate_json(self.clip_info_json_path)
+        self.manifest.compact()
+        existing_video_ids = self.manifest.values('video_id')
         video_ids = list(set(df['video_id'].tolist()) - existing_video_ids)
         self.data = [(vid, vid, None, None) for vid in video_ids]
         
-    def get_clip_start_and_end(self, video_id):
-        clip_dir, _, mp3_path, _ = self.get_file_path(video_id)
+    def worker_init(self):
+        # PANN 모델을 부모 프로세스에서 한 번만 로드하고 공유 메모리로 worker들과 공유
+        device = resolve_device(PANN_DEVICE)
+        num_threads = max(1, (os.cpu_count() or 1) // NUM_WORKERS)
+        if device != "cpu":
+            # CUDA는 fork할 수 없으므로 체크포인트 다운로드만 미리 하고 각 worker가 로드
+            ensure_pann_checkpoint(CKPT_DIR)
+            return init_pann_worker, (None, num_threads)
+        return init_pann_worker, (share_pann_model(CKPT_DIR, device), num_threads)
+
+    def get_clip_start_and_end(self, video_id, audio_path=None, return_embeddings=False):
+        """
+        음악 clip 구간 리스트. return_embeddings이면 (구간 리스트, PANN window embedding)을 반환하고,
+        캐시된 logits를 써서 추론하지 않은 경우 window embedding은 None이다.
+        """
+        clip_dir, mp4_path, _, _ = self.get_file_path(video_id)
         
-        # get music onset and offset using PANN
-        print(f"🔍 PANN 추론 시작: {video_id}")
-        extract_pann_logits(audio_path=mp3_path,
-                            output_dir=clip_dir,
-                            ckpt_dir=CKPT_DIR)
-        logit_path = os.path.join(clip_dir, os.path.basename(mp3_path).replace(".mp3", ".json"))
-        with open(logit_path) as f:
-            logits = json.load(f)
-
-        # Convert logits to binary
-        binary = [logit["music_logit"] > MUSIC_LOGIT_THRESHOLD for logit in logits]
-
-        # Group clips based on binary sequence
-        music_onset_offset_list = []
-        i = 0
-        start, end = -1, -1
-        for i in range(len(binary)):
-            if binary[i]:
-                if start == -1:
-                    start = logits[i]["onset"]
-                end = logits[i]["offset"]
+        # get music onset and offset using PANN (cached logits of a previous run are reused)
+        cache = get_pann_cache()
+        logits = load_cached_pann_logits(cache, video_id, hop_sec=PANN_HOP_SEC) if cache is not None else None
+        window_embeddings = None
+        if logits is None:
+            print(f"🔍 PANN 추론 시작: {video_id}")
+            logits = extract_pann_logits(audio_path=audio_path or mp4_path,
+                                         output_dir=clip_dir,
+                                         ckpt_dir=CKPT_DIR,
+                                         device=resolve_device(PANN_DEVICE),
+                                         hop_sec=PANN_HOP_SEC,
+                                         cache=cache,
+                                         cache_alias=video_id,
+                                         return_embeddings=return_embeddings)
+            if return_embeddings:
+                logits, window_embeddings = logits
+
+        clips = music_clip_ranges(logits)
+        return (clips, window_embeddings) if return_embeddings else clips
+
+    def drop_duplicate_clips(self, video_id, clips, audio_path=None, window_embeddings=None):
+        """
+        index에 이미 있는 clip(다른 영상으로 다시 올라온 같은 공연 등)과 오디오가 거의 같은 clip을 뺌.
+        여기서는 검색만 하고, 남은 clip은 S3 업로드에 성공한 뒤 index에 추가된다 (see s3_upload).
+        clip embedding은 detection pass의 window_embeddings에서 pooling하고, 없을 때(캐시된 logits)만 clip 구간을 다시 추론한다.
+        """
+        index = get_dedup_index()
+        if index is None or not clips:
+            return clips
+        _, mp4_path, _, _ = self.get_file_path(video_id)
+        device = resolve_device(PANN_DEVICE)
+        with timed("dedup", key=video_id):
+            if window_embeddings is not None:
+                embeddings = pool_clip_embeddings(clips, **window_embeddings)
             else:
-                if start != -1:
-                    music_onset_offset_list.append((start, end))
-                start, end = -1, -1
-        if start != -1:
-            music_onset_offset_list.append((start, end))
-            
-        for i in range(len(music_onset_offset_list)):
-            music_onset_offset_list[i] = (max(0, music_onset_offset_list[i][0] - CLIP_PADDING_SEC), music_onset_offset_list[i][1] + CLIP_PADDING_SEC)
-        
-        # Split into clips if longer than MAX_CLIP_SEC
-        clip_onset_offset_list = []
-        for start, end in music_onset_offset_list:
-            duration = end - start
-            if duration > MAX_CLIP_SEC:
-                num_clips = int(np.ceil(duration / MAX_CLIP_SEC))
-                for j in range(num_clips):
-                    clip_start = start + j * MAX_CLIP_SEC
-                    clip_end = min(end, clip_start + MAX_CLIP_SEC)
-                    clip_onset_offset_list.append((clip_start, clip_end))
+                embeddings = clip_audio_embeddings(audio_path or mp4_path, clips, get_pann_model(CKPT_DIR, device), device)
+            matches = index.query(embeddings, exclude_source=video_id)
+
+        kept, pending = [], {}
+        for (start, end), embedding, (match, sim) in zip(clips, embeddings, matches):
+            if match is not None and sim >= index.threshold:
+                print(f"♻️ 중복 clip 건너뜀: {video_id} {start:.1f}-{end:.1f}s ≈ {match} (유사도 {sim:.3f})")
             else:
-                clip_onset_offset_list.append((start, end))
-            
-        return clip_onset_offset_list
+                kept.append((start, end))
+                pending[(start, end)] = embedding
+        if pending:
+            self.dedup_pending[video_id] = pending
+        return kept
+
+    def detect_clips(self, video_id, audio_path=None):
+        """음악 clip 구간 중 중복이 아닌 것 (see get_clip_start_and_end, drop_duplicate_clips)."""
+        clips, window_embeddings = self.get_clip_start_and_end(video_id, audio_path, return_embeddings=True)
+        return self.drop_duplicate_clips(video_id, clips, audio_path, window_embeddings)
+
+    def get_source_audio_dir(self, video_id):
+        # the audio-only download goes to tmpfs when ScratchSpace had room for it
+        clip_dir, _, _, _ = self.get_file_path(video_id)
+        tmpfs_dir = get_scratch_space().tmpfs_dir
+        if tmpfs_dir is not None and os.path.isdir(os.path.join(tmpfs_dir, video_id)):
+            return os.path.join(tmpfs_dir, video_id)
+        return clip_dir
+
+    def get_source_audio_path(self, video_id):
+        # low-bitrate audio-only download of the section mode (container depends on the format yt-dlp picks)
+        audio_dir = self.get_source_audio_dir(video_id)
+        paths = [p for p in glob.glob(os.path.join(audio_dir, f"{video_id}_source_audio.*")) if not p.endswith(".json")]
+        return paths[0] if paths else None
+
+    def fetch_audio(self, video_id):
+        """Section mode phase 1: 저비트레이트 audio-only 스트림과 metadata만 다운로드."""
+        clip_dir, _, _, json_path = self.get_file_path(video_id)
+        self.remove_clip_dir(video_id)
+        os.makedirs(clip_dir, exist_ok=True)
 
-    def process(self, video_info):
-        # Download the full video
-        success = self.download_clip(video_info)
-        if not success:
+        ydl_opts = {
+            'paths': {'home': clip_dir},
+            'outtmpl': f"{video_id}_source_audio.%(ext)s",
+            'format': SECTION_AUDIO_FORMAT,
+            'writeinfojson': True,
+        }
+        if not self.ytdlp_download(video_id, video_id, ydl_opts, prefer_tmpfs=True):
+            self.remove_clip_dir(video_id)
             return False
 
-        # Chunk into clips
+        info_json_path = os.path.join(self.get_source_audio_dir(video_id), f"{video_id}_source_audio.info.json")
+        if self.get_source_audio_path(video_id) is None or not os.path.exists(info_json_path):
+            log_result(video_id, FAILED_LOG, "다운로드된 파일 없음")
+            self.remove_clip_dir(video_id)
+            return False
+        shutil.move(info_json_path, json_path)
+        return True
+
+    def fetch_video(self, video_id, clips):
+        """
+        Section mode phase 2: 음악 clip이 있는 section의 비디오만 download_ranges로 받음.
+        section이 너무 많거나 영상 대부분을 덮으면 전체 비디오를 받는다.
+
+        Returns:
+        - sources (list of (str, float, list)): (mp4 경로, 영상 안에서의 시작 시각, 그 mp4에서 자를 clip 구간들),
+          다운로드에 실패하면 None
+        """
+        clip_dir, mp4_path, _, json_path = self.get_file_path(video_id)
+        with open(json_path, "r", encoding="utf-8") as f:
+            duration = json.load(f).get("duration")
+
+        sections = plan_sections(clips, duration)
+        if sections is None:
+            print(f"📼 전체 다운로드로 대체: {video_id}")
+            if not self.download_clip((video_id, video_id, None, None)):
+                return None
+            return [(mp4_path, 0.0, clips)]
+
+        section_template = os.path.join(clip_dir, f"{video_id}_section_%(section_start)d.%(ext)s")
+        ydl_opts = {
+            'outtmpl': section_template,
+            'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/mp4',
+            'merge_output_format': 'mp4',
+            'force_keyframes_at_cuts': True,
+            'download_ranges': download_range_func(None, [(start, end) for start, end, _ in sections]),
+        }
+        if not self.ytdlp_download(video_id, video_id, ydl_opts, ranges=[(start, end) for start, end, _ in sections]):
+            self.remove_clip_dir(video_id)
+            return None
+
+        sources = []
+        for start, end, section_clips in sections:
+            section_path = os.path.join(clip_dir, f"{video_id}_section_{int(start)}.mp4")
+            if not os.path.exists(section_path):
+                log_result(video_id, FAILED_LOG, f"다운로드된 section 없음: {start}-{end}")
+                self.remove_clip_dir(video_id)
+                return None
+            sources.append((section_path, start, section_clips))
+        return sources
+
+    def s3_upload(self, video_info):
+        uploaded = super().s3_upload(video_info)
+        embedding = self.dedup_clips.pop(video_info, None)
+        if uploaded and embedding is not None:
+            get_dedup_index().add([video_info], embedding[None])
+        return uploaded
+
+    def download_and_detect(self, video_info):
+        """
+        Download and run PANN on one video.
+        Returns (sources, clips) with sources as in fetch_video, ([], []) without music, or None on failure.
+        """
+        video_id, _, _, _ = video_info
+        if self.section_download:
+            if not self.fetch_audio(video_id):
+                return None
+            clips = self.detect_clips(video_id, self.get_source_audio_path(video_id))
+            if not clips:
+                return [], []
+            sources = self.fetch_video(video_id, clips)
+            return None if sources is None else (sources, clips)
+
+        # Download the full video
+        if not self.download_clip(video_info):
+            return None
+        clips = self.detect_clips(video_id)
+        _, mp4_path, _, _ = self.get_file_path(video_id)
+        return [(mp4_path, 0.0, clips)], clips
+
+    def process(self, video_info):
         video_id, _, _, _ = video_info
-        music_onset_offset = self.get_clip_start_and_end(video_id)
+        result = self.download_and_detect(video_info)
+        if result is None:
+            self.dedup_pending.pop(video_id, None)
+            return False
+
+        sources, music_onset_offset = result
         if not music_onset_offset:
             print(f"음악 구간 없음: {video_id}")
+            self.remove_clip_dir(video_id)
             return True
-            
-        for idx, (clip_start, clip_end) in enumerate(music_onset_offset):
-            new_clip_id = f"{video_id}_{idx:07d}"
-            self.cut_clip(video_id, clip_start, clip_end, new_clip_id)
 
+        # Chunk into clips
+        for _, new_clip_id, clip_start, clip_end in self.cut_sources(video_id, sources):
             # Upload to S3
             self.s3_upload(new_clip_id)
             
-            # Update new dataset list
-            dict_item = {
-                "video_id": video_id,
-                "clip_id": new_clip_id,
-                "clip_start_end_sec": (clip_start, clip_end),
-            }
-            self.clip_info_list.append(dict_item)
-        
-            # Save new dataset JSON
-            with open(self.clip_info_json_path, 'w') as f:
-                json.dump(self.clip_info_list, f, indent=4)
+            self.record_clip(video_id, new_clip_id, clip_start, clip_end)
             
         # Cleanup original download
-        clip_dir, _, _, _ = self.get_file_path(video_id)
-        shutil.rmtree(clip_dir)
+        self.remove_clip_dir(video_id)
         
         return True
     
-    def cut_clip(self, original_id, start, end, new_id):
-        _, mp4_path, mp3_path, json_path = self.get_file_path(original_id)
-        new_clip_dir, new_mp4_path, new_mp3_path, new_json_path = self.get_file_path(new_id)
-        os.makedirs(new_clip_dir, exist_ok=True)
-        
-        # Cut video and audio
-        duration = end - start
-        
-        # video
-        try:
-            command = [
-                "ffmpeg", "-y", "-ss", str(start), "-t", str(duration),
-                "-i", mp4_path, "-c:v", "libx264", "-c:a", "aac",
-                "-strict", "experimental", "-loglevel", "error",
-                new_mp4_path
-            ]
-            subprocess.run(command, check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Video cutting failed for {original_id}: {e}")
-            return
-        
-        # audio
-        try:
-            command = [
-                "ffmpeg", "-y",
-                "-ss", str(start), "-t", str(duration),
-                "-i", mp3_path,
-                "-c", "copy",  # copy audio stream without re-encoding
-                "-loglevel", "error",
-                new_mp3_path
-            ]
-            subprocess.run(command, check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Audio cutting failed for {original_id}: {e}")
-            return
-        
-        # metadata
-        shutil.copy(json_path, new_json_path)
+    def record_clip(self, video_id, clip_id, clip_start, clip_end):
+        # Append to this worker's manifest shard
+        self.manifest.append({
+            "video_id": video_id,
+            "clip_id": clip_id,
+            "clip_start_end_sec": (clip_start, clip_end),
+        })
+
+    def run(self):
+        dedup_index = get_dedup_index()  # fork 전에 읽어 두면 worker들이 이어받음
+        super().run()
+        # yt_dataset.json을 읽는 downstream을 위해 기존 형식으로도 내보냄 (compact 포함)
+        self.manifest.export_json(self.clip_info_json_path)
+        if dedup_index is not None:
+            dedup_index.store.compact()
+
+    def run_pipeline(self):
+        dedup_index = get_dedup_index()
+        metrics = super().run_pipeline()
+        # yt_dataset.json을 읽는 downstream을 위해 기존 형식으로도 내보냄 (compact 포함)
+        self.manifest.export_json(self.clip_info_json_path)
+        if dedup_index is not None:
+            dedup_index.store.compact()
+        return metrics
+
+    def fetch_audio_stage(self, video_info):
+        video_id, _, _, _ = video_info
+        return [video_info] if self.fetch_audio(video_id) else []
 
+    def detect_stage(self, video_info):
+        video_id, _, _, _ = video_info
+        audio_path = self.get_source_audio_path(video_id) if self.section_download else None
+        music_onset_offset = self.detect_clips(video_id, audio_path)
+        if not music_onset_offset:
+            print(f"음악 구간 없음: {video_id}")
+            self.remove_clip_dir(video_id)
+            return []
+        if self.section_download:
+            return [(video_id, music_onset_offset)]
+        _, mp4_path, _, _ = self.get_file_path(video_id)
+        return [(video_id, [(mp4_path, 0.0, music_onset_offset)])]
+
+    def fetch_video_stage(self, item):
+        video_id, music_onset_offset = item
+        sources = self.fetch_video(video_id, music_onset_offset)
+        if sources is None:
+            self.dedup_pending.pop(video_id, None)
+            return []
+        return [(video_id, sources)]
+
+    def cut_stage(self, item):
+        video_id, sources = item
+        clips = self.cut_sources(video_id, sources)
+
+        # Cleanup original download
+        self.remove_clip_dir(video_id)
+        return clips
+
+    def upload_stage(self, item):
+        video_id, new_clip_id, clip_start, clip_end = item
+        self.s3_upload(new_clip_id)
+        self.record_clip(video_id, new_clip_id, clip_start, clip_end)
+        return []
+
+    def pipeline_stages(self):
+        workers = PIPELINE_STAGE_WORKERS
+        if self.section_download:
+            # download(audio) → detect(PANN) → fetch(music sections) → cut → upload
+            return [
+                Stage("download", self.fetch_audio_stage, workers["download"], PIPELINE_QUEUE_SIZE),
+                Stage("detect", self.detect_stage, workers["detect"], PIPELINE_QUEUE_SIZE),
+                Stage("fetch", self.fetch_video_stage, workers["download"], PIPELINE_QUEUE_SIZE),
+                Stage("cut", self.cut_stage, workers["cut"], PIPELINE_QUEUE_SIZE),
+                Stage("upload", self.upload_stage, workers["upload"], PIPELINE_QUEUE_SIZE),
+            ]
+        # download → transcode → detect(PANN) → cut → upload
+        return [
+            Stage("download", self.download_stage, workers["download"], PIPELINE_QUEUE_SIZE),
+            Stage("transcode", self.transcode_stage, workers["transcode"], PIPELINE_QUEUE_SIZE),
+            Stage("detect", self.detect_stage, workers["detect"], PIPELINE_QUEUE_SIZE),
+            Stage("cut", self.cut_stage, workers["cut"], PIPELINE_QUEUE_SIZE),
+            Stage("upload", self.upload_stage, workers["upload"], PIPELINE_QUEUE_SIZE),
+        ]
+
+    def cut_sources(self, original_id, sources):
+        """Cut the clips of every (mp4_path, offset, clips) source; clip ids are numbered across sources."""
+        pending = self.dedup_pending.pop(original_id, {})
+        cut = []
+        for source_path, offset, clips in sources:
+            source_cut = self.cut_clips(original_id, clips, source_path=source_path, offset=offset, first_idx=len(cut))
+            # dedup embedding follows the clip to its upload
+            for (start, end), (_, new_clip_id, _, _) in zip(clips, source_cut):
+                if (start, end) in pending:
+                    self.dedup_clips[new_clip_id] = pending[(start, end)]
+            cut += source_cut
+        return cut
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="YouTube Crawler")
     parser.add_argument('--crawler', type=str, choices=['mmtrailer', 'yt'])
+    parser.add_argument('--pipeline', action='store_true', help="stage별 worker pool로 실행 (download/transcode/detect/cut/upload)")
+    parser.add_argument('--section_download', action='store_true', default=YT_SECTION_DOWNLOAD,
+                        help="yt: audio-only로 PANN을 먼저 돌리고 음악 구간의 비디오만 다운로드")
     args = parser.parse_args()
 
     if args.crawler == 'mmtrailer':
         crawler = MMTrailerCrawler(JSON_PATH)
     elif args.crawler == 'yt':
         crawler = YTCralwer(VIDEO_CSV_PATH)
+        crawler.section_download = args.section_download
     else:
         raise ValueError("Invalid crawler type. Choose 'mmtrailer' or 'yt'.")
 
-    crawler.run()
+    if args.pipeline:
+        crawler.run_pipeline()
+    else:
+        crawler.run()
@@ -0,0 +1,223 @@
+import os
+import time
+import random
+import argparse
+import multiprocessing
+
+# 쿠키별 상태 (RawArray의 한 행)
+_RATE, _TOKENS, _REFILLED_AT, _BLOCKED_UNTIL, _STRIKES, _REQUESTS, _BLOCKS = range(7)
+_NUM_FIELDS = 7
+
+BLOCK_SIGNALS = ("not a bot", "rate-limited", "http error 429", "too many requests")
+
+
+def is_block_signal(error_message):
+    error_message = error_message.lower()
+    return any(signal in error_message for signal in BLOCK_SIGNALS)
+
+
+def list_cookie_files(cookie_dir):
+    # default.txt는 디렉토리에 없어도 항상 마지막 후보로 사용 (기존 동작과 동일)
+    names = sorted(f for f in os.listdir(cookie_dir) if f.endswith('.txt')) if os.path.isdir(cookie_dir) else []
+    if 'default.txt' not in names:
+        names.append('default.txt')
+    return [os.path.join(cookie_dir, name) for name in names]
+
+
+class CookieScheduler:
+    """
+    쿠키 파일별 token bucket으로 다운로드 요청 속도를 조절하는 스케줄러.
+    상태는 shared memory(RawArray)에 두므로 Pool을 만들기 전에 생성하면 fork된 worker와
+    pipeline thread가 같은 bucket을 공유한다 (pickle로는 전달할 수 없음).
+
+    - acquire()는 token이 가장 많이 남은 쿠키를 고른다. token은 쿠키의 rate만큼 차오르므로
+      요청은 쿠키의 상태(rate)에 비례해 분산되고, 모든 bucket이 비면 다음 token까지만 기다린다.
+    - report()는 AIMD로 rate를 조절한다: 성공하면 increase_per_success만큼 더하고,
+      차단 신호("not a bot", rate-limit 등)를 받으면 decrease_factor를 곱하고
+      연속 차단 횟수에 따라 2배씩 늘어나는 cooldown 동안 그 쿠키를 쉬게 한다.
+
+    Parameters:
+    - cookie_paths (list of str): 사용할 쿠키 파일 경로
+    - initial_rate (float): 쿠키 하나의 시작 요청 속도 (requests/sec)
+    - min_rate, max_rate (float): rate 하한/상한
+    - increase_per_success (float): 성공 시 더할 rate (additive increase)
+    - decrease_factor (float): 차단 시 곱할 값 (multiplicative decrease)
+    - burst (float): bucket에 쌓일 수 있는 최대 token 수
+    - block_cooldown_sec (float): 첫 차단 후 쉬는 시간 (연속 차단마다 2배, max_cooldown_sec까지)
+    - clock, sleep (callable): 테스트/시뮬레이션에서 가짜 시계를 쓰기 위한 주입점
+    """
+
+    def __init__(self, cookie_paths, initial_rate=0.05, min_rate=0.001, max_rate=0.5, increase_per_success=0.002,
+                 decrease_factor=0.5, burst=2.0, block_cooldown_sec=60.0, max_cooldown_sec=3600.0,
+                 clock=time.monotonic, sleep=time.sleep):
+        if not cookie_paths:
+            raise ValueError("cookie_paths is empty")
+        self.cookie_paths = list(cookie_paths)
+        self.index = {path: i for i, path in enumerate(self.cookie_paths)}
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_per_success = increase_per_success
+        self.decrease_factor = decrease_factor
+        self.burst = burst
+        self.block_cooldown_sec = block_cooldown_sec
+        self.max_cooldown_sec = max_cooldown_sec
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = multiprocessing.Lock()
+        self.state = multiprocessing.RawArray('d', len(self.cookie_paths) * _NUM_FIELDS)
+        now = clock()
+        for i in range(len(self.cookie_paths)):
+            self._set(i, _RATE, initial_rate)
+            self._set(i, _TOKENS, 1.0)
+            self._set(i, _REFILLED_AT, now)
+
+    def _get(self, i, field):
+        return self.state[i * _NUM_FIELDS + field]
+
+    def _set(self, i, field, value):
+        self.state[i * _NUM_FIELDS + field] = value
+
+    def _refill(self, i, now):
+        elapsed = max(0.0, now - self._get(i, _REFILLED_AT))
+        self._set(i, _TOKENS, min(self.burst, self._get(i, _TOKENS) + elapsed * self._get(i, _RATE)))
+        self._set(i, _REFILLED_AT, now)
+
+    def try_acquire(self):
+        """Token을 하나 쓸 수 있으면 (cookie_path, 0), 아니면 (None, 다음 token까지 남은 초)."""
+        with self.lock:
+            now = self.clock()
+            best, best_tokens, wait_sec = None, 1.0, float("inf")
+            for i in range(len(self.cookie_paths)):
+                self._refill(i, now)
+                blocked_for = self._get(i, _BLOCKED_UNTIL) - now
+                tokens = self._get(i, _TOKENS)
+                if blocked_for > 0:
+                    wait_sec = min(wait_sec, blocked_for + max(0.0, 1.0 - tokens) / self._get(i, _RATE))
+                elif tokens >= best_tokens:
+                    best, best_tokens = i, tokens
+                else:
+                    wait_sec = min(wait_sec, (1.0 - tokens) / self._get(i, _RATE))
+            if best is None:
+                return None, wait_sec
+            self._set(best, _TOKENS, best_tokens - 1.0)
+            self._set(best, _REQUESTS, self._get(best, _REQUESTS) + 1)
+            return self.cookie_paths[best], 0.0
+
+    def acquire(self):
+        """요청을 보내도 되는 쿠키 경로를 반환 (모든 bucket이 비었으면 token이 찰 때까지 대기)."""
+        while True:
+            cookie_path, wait_sec = self.try_acquire()
+            if cookie_path is not None:
+                return cookie_path
+            # 여러 worker가 동시에 깨어나 같은 token을 다투지 않도록 약간의 jitter
+            self.sleep(max(wait_sec, 0.01) * random.uniform(1.0, 1.1))
+
+    def report(self, cookie_path, ok, error_message=None):
+        """다운로드 결과로 쿠키의 rate를 조절. 차단 신호가 아닌 실패(삭제된 영상 등)는 rate에 반영하지 않음."""
+        i = self.index[cookie_path]
+        with self.lock:
+            if ok:
+                self._set(i, _RATE, min(self.max_rate, self._get(i, _RATE) + self.increase_per_success))
+                self._set(i, _STRIKES, 0)
+            elif error_message is not None and is_block_signal(error_message):
+                now = self.clock()
+                self._refill(i, now)
+                strikes = self._get(i, _STRIKES)
+                cooldown = min(self.max_cooldown_sec, self.block_cooldown_sec * 2 ** strikes)
+                self._set(i, _RATE, max(self.min_rate, self._get(i, _RATE) * self.decrease_factor))
+                self._set(i, _TOKENS, 0.0)
+                self._set(i, _BLOCKED_UNTIL, now + cooldown)
+                self._set(i, _STRIKES, strikes + 1)
+                self._set(i, _BLOCKS, self._get(i, _BLOCKS) + 1)
+                print(f"🔄 쿠키 차단 감지: {os.path.basename(cookie_path)} "
+                      f"({cooldown:.0f}초 휴식, rate {self._get(i, _RATE):.3f}/s)")
+
+    def stats(self):
+        with self.lock:
+            now = self.clock()
+            return [{
+                "cookie": path,
+                "rate_per_sec": self._get(i, _RATE),
+                "requests": int(self._get(i, _REQUESTS)),
+                "blocks": int(self._get(i, _BLOCKS)),
+                "blocked_for_sec": max(0.0, self._get(i, _BLOCKED_UNTIL) - now),
+            } for i, path in enumerate(self.cookie_paths)]
+
+    def print_stats(self):
+        lines = [f"{os.path.basename(s['cookie']):>20}: {s['requests']} 요청, {s['blocks']} 차단, "
+                 f"{s['rate_per_sec'] * 3600:.0f}/h" + (f", {s['blocked_for_sec']:.0f}초 휴식 중" if s['blocked_for_sec'] else "")
+                 for s in self.stats()]
+        print("🍪 쿠키 상태\n" + "\n".join(lines))
+
+
+class FakeClock:
+    """시뮬레이션용 가짜 시계: sleep()이 실제로 기다리지 않고 시간만 앞으로 돌린다."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, sec):
+        self.now += sec
+
+
+class FakeDownloader:
+    """
+    쿠키마다 숨겨진 허용 속도(limits, requests/sec)를 가진 가짜 다운로더.
+    최근 window_sec 동안의 요청 속도가 한도를 넘으면 yt-dlp처럼 rate-limit 에러를 낸다.
+    """
+
+    def __init__(self, limits, clock, window_sec=600.0, download_sec=5.0):
+        self.limits = limits
+        self.clock = clock
+        self.window_sec = window_sec
+        self.download_sec = download_sec
+        self.history = {cookie: [] for cookie in limits}
+
+    def download(self, cookie_path):
+        now = self.clock()
+        history = [t for t in self.history[cookie_path] if t > now - self.window_sec]
+        history.append(now)
+        self.history[cookie_path] = history
+        self.clock.sleep(self.download_sec)
+        if len(history) > self.limits[cookie_path] * self.window_sec:
+            raise RuntimeError("ERROR: [youtube] Sign in to confirm you're not a bot. This helps protect against abuse. (rate-limited)")
+
+
+def simulate(scheduler, downloader, duration_sec):
+    """가짜 시계 위에서 worker 하나로 duration_sec 동안 다운로드를 반복하고 성공 수와 차단 수를 반환."""
+    ok, blocked = 0, 0
+    clock = scheduler.clock
+    while clock() < duration_sec:
+        cookie_path = scheduler.acquire()
+        try:
+            downloader.download(cookie_path)
+        except RuntimeError as e:
+            scheduler.report(cookie_path, False, str(e))
+            blocked += 1
+            continue
+        scheduler.report(cookie_path, True)
+        ok += 1
+    return ok, blocked
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the cookie scheduler against a fake rate-limited downloader")
+    parser.add_argument("--limits", type=float, nargs="+", default=[0.005, 0.02, 0.05], help="hidden requests/sec limit of each fake cookie")
+    parser.add_argument("--hours", type=float, default=6)
+    parser.add_argument("--initial_rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    clock = FakeClock()
+    cookies = [f"cookie{i}.txt" for i in range(len(args.limits))]
+    scheduler = CookieScheduler(cookies, initial_rate=args.initial_rate, clock=clock, sleep=clock.sleep)
+    downloader = FakeDownloader(dict(zip(cookies, args.limits)), clock)
+    ok, blocked = simulate(scheduler, downloader, args.hours * 3600)
+    print(f"✅ {ok} clips / {args.hours}h ({ok / args.hours:.0f} clips/hour), {blocked} 차단")
+    scheduler.print_stats()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import os
+import time
+import queue
+import threading
+
+_STOP = object()
+
+
+def dir_size_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for fname in files:
+            try:
+                total += os.path.getsize(os.path.join(root, fname))
+            except OSError:
+                pass  # 다른 stage가 이미 지운 파일
+    return total
+
+
+class Stage:
+    """
+    파이프라인의 한 단계.
+
+    Parameters:
+    - name (str): stage 이름 (metrics 출력용)
+    - fn (callable): item 하나를 받아 다음 stage로 넘길 item 리스트를 반환 (빈 리스트면 여기서 종료)
+    - num_workers (int): 이 stage의 worker thread 수
+    - queue_size (int): 이 stage 입력 queue의 최대 길이 (가득 차면 이전 stage가 대기)
+    """
+
+    def __init__(self, name, fn, num_workers=1, queue_size=8):
+        self.name = name
+        self.fn = fn
+        self.num_workers = num_workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.active_workers = num_workers
+        self.processed = 0
+        self.failed = 0
+        self.emitted = 0
+        self.busy_sec = 0.0
+
+    def metrics(self, elapsed):
+        return {
+            "stage": self.name,
+            "processed": self.processed,
+            "failed": self.failed,
+            "emitted": self.emitted,
+            "queue_depth": self.queue.qsize(),
+            "items_per_sec": self.processed / max(elapsed, 1e-9),
+            "utilization": self.busy_sec / max(elapsed * self.num_workers, 1e-9),
+        }
+
+
+class StagePipeline:
+    """
+    download → transcode → detect → cut → upload 처럼 병목이 다른 단계들을
+    bounded queue로 연결하고 단계마다 독립된 크기의 worker pool로 실행하는 엔진.
+    각 단계는 네트워크, ffmpeg subprocess, torch 연산처럼 GIL을 놓는 작업이므로 thread로 실행한다.
+
+    Parameters:
+    - stages (list of Stage): 실행 순서대로 나열한 stage
+    - metrics_interval_sec (float): stage별 처리량/queue 길이 출력 주기
+    """
+
+    def __init__(self, stages, metrics_interval_sec=30):
+        self.stages = stages
+        self.metrics_interval_sec = metrics_interval_sec
+        self.start_time = None
+        self._done = threading.Event()
+
+    def _feed(self, items):
+        first = self.stages[0].queue
+        for item in items:
+            first.put(item)
+        first.put(_STOP)
+
+    def _worker(self, idx):
+        stage = self.stages[idx]
+        next_queue = self.stages[idx + 1].queue if idx + 1 < len(self.stages) else None
+        while True:
+            item = stage.queue.get()
+            if item is _STOP:
+                # 같은 stage의 다른 worker도 종료하도록 되돌려 놓고, 마지막 worker가 다음 stage에 전달
+                stage.queue.put(_STOP)
+                with stage.lock:
+                    stage.active_workers -= 1
+                    last = stage.active_workers == 0
+                if last:
+                    stage.queue.get_nowait()
+                    if next_queue is not None:
+                        next_queue.put(_STOP)
+                return
+
+            start = time.time()
+            try:
+                outputs = stage.fn(item) or []
+                failed = False
+            except Exception as e:
+                print(f"❌ [{stage.name}] 처리 실패: {item}, 사유: {e}")
+                outputs, failed = [], True
+            with stage.lock:
+                stage.busy_sec += time.time() - start
+                stage.processed += 1
+                stage.failed += failed
+                stage.emitted += len(outputs)
+            if next_queue is not None:
+                for output in outputs:
+                    next_queue.put(output)
+
+    def metrics(self):
+        elapsed = time.time() - self.start_time
+        return [stage.metrics(elapsed) for stage in self.stages]
+
+    def print_metrics(self):
+        lines = [f"{m['stage']:>10}: {m['processed']} 처리 ({m['failed']} 실패), "
+                 f"{m['items_per_sec'] * 60:.2f}/min, queue {m['queue_depth']}, 가동률 {m['utilization'] * 100:.0f}%"
+                 for m in self.metrics()]
+        print("📊 파이프라인 상태\n" + "\n".join(lines))
+
+    def _monitor(self):
+        while not self._done.wait(self.metrics_interval_sec):
+            self.print_metrics()
+
+    def run(self, items):
+        self.start_time = time.time()
+        threads = [threading.Thread(target=self._feed, args=(items,), daemon=True)]
+        for idx, stage in enumerate(self.stages):
+            threads += [threading.Thread(target=self._worker, args=(idx,), daemon=True)
+                        for _ in range(stage.num_workers)]
+        monitor = threading.Thread(target=self._monitor, daemon=True)
+        for thread in threads:
+            thread.start()
+        monitor.start()
+        for thread in threads:
+            thread.join()
+        self._done.set()
+        self.print_metrics()
+        return self.metrics()
@@ -1 +1,155 @@
-### TODO:
\ No newline at end of file
+import os
+import time
+import argparse
+import numpy as np
+import torch
+
+from vp.annotation.music_detection import (get_pann_model, resolve_device, load_audio, convert_audio, embedding_key,
+                                           pann_config_tag, prefetch_audio_chunks, list_audio_paths,
+                                           batched_pann_outputs)
+from vp.configs.constants import (CKPT_DIR, PANN_CLIP_DURATION_SEC, PANN_BATCH_SIZE, PANN_DECODE_WORKERS,
+                                  PANN_PREFETCH_DEPTH, AUDIO_EMB_DIR, AUDIO_EMB_DIM)
+from vp.utils.audio_io import decode_audio_pcm
+from vp.utils.embedding_store import EmbeddingStore
+from vp.utils.metrics import timed
+
+
+def wav_windows(wav, sample_rate=32000):
+    """
+    Cnn14 입력 window들 (num_windows, PANN_CLIP_DURATION_SEC * sample_rate).
+    music detection과 같은 20초 window이고 (그래서 extract_pann_logits_batch의 embedding과 같은 값),
+    20초보다 짧은 clip은 반복해서 window 하나를 채운다.
+    """
+    chunks = convert_audio(wav, sample_rate, sample_rate)
+    if len(chunks) == 0 and len(wav) > 0:
+        chunk_size = PANN_CLIP_DURATION_SEC * sample_rate
+        chunks = np.resize(np.asarray(wav), chunk_size)[None].astype(np.float32)
+    return chunks
+
+
+def embedding_windows(audio_path, sample_rate=32000):
+    return wav_windows(load_audio(audio_path, sample_rate), sample_rate)
+
+
+def clip_audio_embeddings(audio_path, ranges, model, device="cpu", sample_rate=32000):
+    """
+    한 오디오 파일 안의 (start, end) 구간마다의 clip embedding (len(ranges), 2048) float32.
+    구간만 디코딩하고, 모든 구간의 window를 한 배치로 추론한다 (빈 구간은 0 벡터).
+    """
+    windows, owners = [], []
+    for idx, (start, end) in enumerate(ranges):
+        wav = decode_audio_pcm(audio_path, sample_rate, start=start, duration=end - start)
+        clip_windows = wav_windows(wav, sample_rate)
+        windows.append(clip_windows)
+        owners += [idx] * len(clip_windows)
+
+    embeddings = np.zeros((len(ranges), AUDIO_EMB_DIM), dtype=np.float32)
+    if not owners:
+        return embeddings
+    with timed("audio_emb_infer", nbytes=sum(w.nbytes for w in windows)), torch.no_grad():
+        out = model(torch.as_tensor(np.concatenate(windows), device=device))
+        window_embeddings = out["embedding"].float().cpu().numpy()
+    owners = np.asarray(owners)
+    np.add.at(embeddings, owners, window_embeddings)
+    embeddings /= np.maximum(np.bincount(owners, minlength=len(ranges)), 1)[:, None]
+    return embeddings
+
+
+def pool_clip_embeddings(ranges, embeddings, hop_sec, window_sec=PANN_CLIP_DURATION_SEC):
+    """
+    (start, end) 구간마다의 clip embedding (len(ranges), 2048) float32를 detection pass에서 이미 계산한
+    window embedding(window i는 i * hop_sec에서 시작, extract_pann_logits(..., return_embeddings=True))으로 만듦.
+    clip_audio_embeddings처럼 구간 시작부터 겹치지 않는 window들의 평균이고 (window 시작은 가장 가까운 hop으로 맞춤),
+    window보다 짧은 구간은 구간 가운데에 놓인 window 하나를 쓴다.
+    """
+    pooled = np.zeros((len(ranges), AUDIO_EMB_DIM), dtype=np.float32)
+    if len(embeddings) == 0:
+        return pooled
+    for idx, (start, end) in enumerate(ranges):
+        starts = np.arange(start, end - window_sec + 1e-6, window_sec)
+        if len(starts) == 0:
+            starts = np.array([(start + end - window_sec) / 2])
+        rows = np.clip(np.round(starts / hop_sec).astype(np.int64), 0, len(embeddings) - 1)
+        pooled[idx] = embeddings[rows].mean(axis=0)
+    return pooled
+
+
+def get_audio_embedding_store(emb_dir=AUDIO_EMB_DIR, sample_rate=32000, model=None):
+    # tag에 모델 variant(fp32/int8 등)가 들어가므로 다른 variant의 embedding이 한 저장소에 섞이지 않는다
+    return EmbeddingStore(emb_dir, AUDIO_EMB_DIM, tag=pann_config_tag(sample_rate, model=model))
+
+
+def load_audio_embeddings(emb_dir=AUDIO_EMB_DIR):
+    """
+    저장된 clip embedding 전체를 (clip_id 리스트, (N, 2048) float32 배열)로 읽음.
+    """
+    return EmbeddingStore(emb_dir).load().to_array()
+
+
+def extract_audio_embeddings(audio_paths, store, ckpt_dir=CKPT_DIR, device="cuda", sample_rate=32000,
+                             batch_size=PANN_BATCH_SIZE, model=None, num_workers=PANN_DECODE_WORKERS,
+                             prefetch_depth=PANN_PREFETCH_DEPTH, skip_existing=True):
+    """
+    여러 clip의 20초 window를 고정 크기 배치로 묶어(batched_pann_outputs) Cnn14 embedding을 계산하고,
+    clip별 window 평균을 store(EmbeddingStore)에 embedding_key(audio_path)로 저장.
+    디코딩은 prefetch_audio_chunks로 추론과 겹쳐서 수행한다.
+    """
+    model = get_pann_model(ckpt_dir, device, sample_rate, model)
+    if skip_existing:
+        done = store.load().index
+        audio_paths = [path for path in audio_paths if embedding_key(path) not in done]
+
+    stats = {"files": 0, "chunks": 0, "failed": 0}
+
+    def loaded_windows():
+        for file_idx, audio_path, chunks, error in prefetch_audio_chunks(audio_paths, sample_rate, num_workers,
+                                                                         prefetch_depth, load_fn=embedding_windows):
+            if error is not None or len(chunks) == 0:
+                print(f"❌ 오디오 로드 실패: {audio_path}, 사유: {error or '빈 오디오'}")
+                stats["failed"] += 1
+                continue
+            stats["chunks"] += len(chunks)
+            yield file_idx, chunks
+
+    start_time = time.time()
+    for finished in batched_pann_outputs(model, loaded_windows(), batch_size, device, sample_rate,
+                                         return_logits=False, return_embeddings=True, stage="audio_emb_infer"):
+        store.append([embedding_key(audio_paths[file_idx]) for file_idx, _, _ in finished],
+                     np.stack([embedding for _, _, embedding in finished]))
+        stats["files"] += len(finished)
+
+    elapsed = max(time.time() - start_time, 1e-9)
+    stats["files_per_sec"] = stats["files"] / elapsed
+    print(f"✅ audio embedding 추출 완료: {stats['files']}개 clip ({stats['failed']}개 실패), {stats['chunks']}개 window, "
+          f"{elapsed:.1f}초 ({stats['files_per_sec']:.2f} clips/sec)")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cnn14 audio embeddings of many clips into a sharded float16 store")
+    parser.add_argument("--audio_dir", type=str, default="data/audio")
+    parser.add_argument("--id_list", type=str, default=None, help="txt file of audio ids to read from --audio_dir")
+    parser.add_argument("--ext", type=str, default=".mp3", help="extension of the files in --audio_dir (.mp4 decodes the audio track)")
+    parser.add_argument("--emb_dir", type=str, default=AUDIO_EMB_DIR)
+    parser.add_argument("--ckpt_dir", type=str, default=CKPT_DIR)
+    parser.add_argument("--device", type=str, default=None, help="cuda if available, else cpu")
+    parser.add_argument("--sample_rate", type=int, default=32000)
+    parser.add_argument("--batch_size", type=int, default=PANN_BATCH_SIZE)
+    parser.add_argument("--num_workers", type=int, default=PANN_DECODE_WORKERS, help="audio decoding workers (0: no prefetch)")
+    parser.add_argument("--prefetch_depth", type=int, default=PANN_PREFETCH_DEPTH)
+    parser.add_argument("--overwrite", action="store_true", help="recompute clips already in the store")
+    args = parser.parse_args()
+
+    os.makedirs(args.ckpt_dir, exist_ok=True)
+    device = resolve_device(args.device)
+    model = get_pann_model(args.ckpt_dir, device, args.sample_rate)
+    store = get_audio_embedding_store(args.emb_dir, args.sample_rate, model)
+    audio_paths = list_audio_paths(args.audio_dir, args.id_list, args.ext)
+    extract_audio_embeddings(audio_paths, store, args.ckpt_dir, device, args.sample_rate, args.batch_size, model,
+                             num_workers=args.num_workers, prefetch_depth=args.prefetch_depth,
+                             skip_existing=not args.overwrite)
+    store.compact()
+
+
+if __name__ == "__main__":
+    main()
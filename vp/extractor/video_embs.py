@@ -1 +1,116 @@
-### TODO:
\ No newline at end of file
+import os
+import json
+import time
+import argparse
+import numpy as np
+from multiprocessing import Pool
+
+from vp.configs.constants import (VIDEO_NUM_FRAMES, VIDEO_FRAME_SIZE, VIDEO_DECODE_WORKERS, VIDEO_FRAMES_DIR)
+from vp.utils.video_io import sample_frames
+
+# worker 프로세스마다 한 번 연 frames.npy memmap
+_frames = None
+_sample_kwargs = None
+
+
+def video_clip_id(video_path):
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    return stem[:-len("_video")] if stem.endswith("_video") else stem
+
+
+def _init_worker(frames_path, sample_kwargs):
+    global _frames, _sample_kwargs
+    _frames = np.load(frames_path, mmap_mode="r+")
+    _sample_kwargs = sample_kwargs
+
+
+def _sample_into(job):
+    # 디코딩한 frame을 memmap의 idx 행에 바로 씀 (부모로 배열을 pickle해서 보내지 않음)
+    idx, video_path = job
+    try:
+        sample_frames(video_path, out=_frames[idx], **_sample_kwargs)
+        return idx, None
+    except Exception as e:
+        return idx, str(e)
+
+
+def extract_video_frames(video_paths, frames_dir=VIDEO_FRAMES_DIR, num_frames=VIDEO_NUM_FRAMES, size=VIDEO_FRAME_SIZE,
+                         method="auto", num_workers=VIDEO_DECODE_WORKERS):
+    """
+    여러 clip에서 num_frames장씩 뽑은 frame을 frames_dir/frames.npy (N, num_frames, H, W, 3) uint8 memmap에 저장.
+    clip들은 worker 프로세스들이 나눠서 디코딩하고 각자 자기 행에 바로 쓴다.
+    행 순서의 clip_id는 ids.txt, 디코딩에 성공한 행은 valid.npy에 기록한다.
+    """
+    os.makedirs(frames_dir, exist_ok=True)
+    frames_path = os.path.join(frames_dir, "frames.npy")
+    frames = np.lib.format.open_memmap(frames_path, mode="w+", dtype=np.uint8,
+                                       shape=(len(video_paths), num_frames, size[0], size[1], 3))
+    del frames  # header와 크기만 만들고 닫음
+
+    # 프로세스끼리 CPU를 나눠 쓰도록 ffmpeg 디코딩 thread는 1개
+    sample_kwargs = {"num_frames": num_frames, "size": tuple(size), "method": method, "threads": 1}
+    valid = np.zeros(len(video_paths), dtype=bool)
+    start_time = time.time()
+    with Pool(num_workers, initializer=_init_worker, initargs=(frames_path, sample_kwargs)) as pool:
+        for idx, error in pool.imap_unordered(_sample_into, enumerate(video_paths), chunksize=4):
+            if error is not None:
+                print(f"❌ frame 추출 실패: {video_paths[idx]}, 사유: {error}")
+            valid[idx] = error is None
+
+    np.save(os.path.join(frames_dir, "valid.npy"), valid)
+    with open(os.path.join(frames_dir, "ids.txt"), "w", encoding="utf-8") as f:
+        f.writelines(f"{video_clip_id(path)}\n" for path in video_paths)
+    with open(os.path.join(frames_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"num_frames": num_frames, "size": list(size), "method": method}, f)
+
+    elapsed = max(time.time() - start_time, 1e-9)
+    print(f"✅ frame 추출 완료: {int(valid.sum())}/{len(video_paths)}개 clip, {elapsed:.1f}초 "
+          f"({len(video_paths) / elapsed:.2f} clips/sec)")
+    return valid
+
+
+def load_video_frames(frames_dir=VIDEO_FRAMES_DIR):
+    """
+    (clip_id 리스트, (N, num_frames, H, W, 3) uint8 memmap, valid (N,) bool).
+    """
+    with open(os.path.join(frames_dir, "ids.txt"), "r", encoding="utf-8") as f:
+        clip_ids = [line.rstrip("\n") for line in f]
+    frames = np.load(os.path.join(frames_dir, "frames.npy"), mmap_mode="r")
+    valid = np.load(os.path.join(frames_dir, "valid.npy"))
+    return clip_ids, frames, valid
+
+
+def list_video_paths(video_dir, id_list_path=None, suffix="_video.mp4"):
+    # DOWNLOAD_DIR 형식({clip_id}/{clip_id}_video.mp4)과 한 디렉토리에 모인 mp4 모두 지원
+    if id_list_path is not None:
+        with open(id_list_path, "r", encoding="utf-8") as f:
+            clip_ids = [line.strip() for line in f if line.strip()]
+        paths = []
+        for clip_id in clip_ids:
+            nested = os.path.join(video_dir, clip_id, f"{clip_id}{suffix}")
+            paths.append(nested if os.path.exists(nested) else os.path.join(video_dir, f"{clip_id}{suffix}"))
+        return paths
+    paths = []
+    for root, _, fnames in os.walk(video_dir):
+        paths += [os.path.join(root, fname) for fname in fnames if fname.endswith(suffix)]
+    return sorted(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sample N low-resolution frames per clip into a uint8 memmap")
+    parser.add_argument("--video_dir", type=str, required=True)
+    parser.add_argument("--id_list", type=str, default=None, help="txt file of clip ids to read from --video_dir")
+    parser.add_argument("--suffix", type=str, default="_video.mp4")
+    parser.add_argument("--frames_dir", type=str, default=VIDEO_FRAMES_DIR)
+    parser.add_argument("--num_frames", type=int, default=VIDEO_NUM_FRAMES)
+    parser.add_argument("--size", type=int, nargs=2, default=list(VIDEO_FRAME_SIZE), metavar=("HEIGHT", "WIDTH"))
+    parser.add_argument("--method", type=str, default="auto", choices=["auto", "fps", "seek", "keyframe", "opencv"])
+    parser.add_argument("--num_workers", type=int, default=VIDEO_DECODE_WORKERS)
+    args = parser.parse_args()
+
+    video_paths = list_video_paths(args.video_dir, args.id_list, args.suffix)
+    extract_video_frames(video_paths, args.frames_dir, args.num_frames, tuple(args.size), args.method, args.num_workers)
+
+
+if __name__ == "__main__":
+    main()
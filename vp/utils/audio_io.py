@@ -1,6 +1,114 @@
-### TODO:
-# - [ ] Fetch data from S3
-# - [ ] Save to local
-# - [ ] Return local path
+import tempfile
+import subprocess
+import numpy as np
 
+_READ_BLOCK_BYTES = 1024 * 1024
 
+
+def ffmpeg_pcm_command(audio_path, sample_rate=32000, start=None, duration=None):
+    # 오디오 트랙을 mono float32 PCM(sample_rate)으로 stdout에 출력 (mp4/m4a/mp3 모두 가능)
+    # start/duration(초)이 있으면 입력 쪽 seek로 그 구간만 디코딩
+    seek = []
+    if start is not None:
+        seek += ["-ss", f"{start:.3f}"]
+    if duration is not None:
+        seek += ["-t", f"{duration:.3f}"]
+    return [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin",
+        *seek, "-i", audio_path,
+        "-map", "0:a:0", "-vn", "-ac", "1", "-ar", str(sample_rate),
+        "-f", "f32le", "-acodec", "pcm_f32le", "pipe:1"
+    ]
+
+
+def read_stderr(stderr_file):
+    # stderr는 pipe 대신 임시 파일로 받는다 (stdout을 다 읽기 전에 stderr pipe가 차서 ffmpeg가 멈추지 않도록)
+    stderr_file.seek(0)
+    return stderr_file.read().decode(errors='replace').strip()
+
+
+def decode_audio_pcm(audio_path, sample_rate=32000, start=None, duration=None):
+    """
+    ffmpeg pipe로 오디오 트랙을 바로 mono float32 PCM으로 디코딩 (mp3 변환이나 임시 파일 없음).
+
+    Parameters:
+    - audio_path (str): 오디오 또는 비디오 파일 경로 (ex: 다운로드한 mp4)
+    - sample_rate (int): 출력 sample rate (ffmpeg에서 resample)
+    - start, duration (float, optional): 디코딩할 구간 (초), 없으면 전체
+
+    Returns:
+    - wav (np.ndarray): (num_samples,) float32 배열
+    """
+    with tempfile.TemporaryFile() as stderr_file:
+        proc = subprocess.Popen(ffmpeg_pcm_command(audio_path, sample_rate, start, duration), stdout=subprocess.PIPE,
+                                stderr=stderr_file)
+        buf = bytearray()
+        while True:
+            block = proc.stdout.read(_READ_BLOCK_BYTES)
+            if not block:
+                break
+            buf += block
+        proc.stdout.close()
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg decoding failed: {audio_path}: {read_stderr(stderr_file)}")
+    del buf[len(buf) - len(buf) % 4:]
+    return np.frombuffer(buf, dtype=np.float32)
+
+
+def stream_audio_windows(audio_path, sample_rate=32000, window_sec=20, hop_sec=None, batch_size=32, keep_tail=False):
+    """
+    ffmpeg pipe에서 PCM을 고정 크기 버퍼로 읽어 window_sec 길이의 window를 batch 단위로 yield.
+    전체 waveform을 메모리에 올리지 않으므로 peak memory는 영상 길이가 아니라 batch_size에 비례.
+
+    Parameters:
+    - audio_path (str): 오디오 또는 비디오 파일 경로
+    - sample_rate (int): 출력 sample rate (ffmpeg에서 resample)
+    - window_sec (float): window 길이 (초)
+    - hop_sec (float): window 간격 (초), None이면 겹치지 않는 window
+    - batch_size (int): 한 번에 yield할 최대 window 수
+    - keep_tail (bool): True면 끝의 불완전한 window(다음 window 시작부터 끝까지)도 (1, 남은 샘플 수)로 마지막에 yield
+
+    Yields:
+    - windows (np.ndarray): (n, window_samples) float32, 버퍼의 strided view (복사 없음).
+      다음 batch를 읽을 때 덮어쓰이므로 그 전에 사용(또는 복사)해야 함. keep_tail이 아니면 끝의 불완전한 window는 버림.
+    """
+    window = int(round(window_sec * sample_rate))
+    hop = window if hop_sec is None else max(1, int(round(hop_sec * sample_rate)))
+    capacity = (batch_size - 1) * hop + window
+    buf = np.empty(capacity, dtype=np.float32)
+    raw = buf.view(np.uint8)
+    view = memoryview(raw)
+
+    stderr_file = tempfile.TemporaryFile()
+    proc = subprocess.Popen(ffmpeg_pcm_command(audio_path, sample_rate), stdout=subprocess.PIPE,
+                            stderr=stderr_file, bufsize=0)
+    filled = 0  # 버퍼에 채워진 byte 수
+    try:
+        eof = False
+        while True:
+            while not eof and filled < raw.nbytes:
+                n = proc.stdout.readinto(view[filled:])
+                if not n:
+                    eof = True
+                else:
+                    filled += n
+            num_samples = filled // 4
+            num_windows = 0 if num_samples < window else (num_samples - window) // hop + 1
+            if num_windows == 0:
+                if keep_tail and num_samples > 0:
+                    yield buf[None, :num_samples]
+                break
+            yield np.lib.stride_tricks.as_strided(buf, shape=(num_windows, window), strides=(hop * 4, 4))
+            # 다음 window가 시작하는 위치부터 남은 샘플을 버퍼 앞으로 이동 (ring buffer)
+            consumed = num_windows * hop * 4
+            raw[:filled - consumed] = raw[consumed:filled]
+            filled -= consumed
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg decoding failed: {audio_path}: {read_stderr(stderr_file)}")
+    finally:
+        view.release()
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        stderr_file.close()
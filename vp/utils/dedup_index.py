@@ -0,0 +1,282 @@
+import os
+import time
+import shutil
+import argparse
+import threading
+import numpy as np
+
+from vp.configs.constants import (DEDUP_PROJ_DIM, DEDUP_LSH_TABLES, DEDUP_LSH_BITS, DEDUP_SIMILARITY_THRESHOLD,
+                                  DEDUP_REFRESH_SEC, AUDIO_EMB_DIM)
+from vp.utils.embedding_store import EmbeddingStore
+
+# table 하나에서 볼 최대 후보 수 (비슷한 음악이 몰린 큰 bucket에서 query가 느려지지 않도록)
+_MAX_BUCKET_CANDIDATES = 2048
+
+
+def source_of(key):
+    """key의 원본 video_id ({video_id}_{clip 번호} 또는 {video_id}_{start}-{end})."""
+    return key.rsplit("_", 1)[0]
+
+
+class DuplicateIndex:
+    """
+    clip audio embedding의 near-duplicate 검색용 LSH index (numpy만 사용, 증분 추가).
+
+    embedding(Cnn14 2048-d)은 mean을 빼고 고정된 random projection으로 dim차원으로 줄인 뒤 L2 정규화해서
+    float16으로 EmbeddingStore(index_dir)에 저장한다 (clip당 dim * 2 byte).
+    검색은 random hyperplane LSH로 한다: num_tables개의 table마다 num_bits개의 sign bit로 bucket code를 만들고,
+    table별로 code를 정렬한 배열에서 searchsorted로 bucket을 찾은 뒤 후보들과 cosine 유사도를 계산한다.
+    새 항목은 정렬하지 않은 pending 영역에 두었다가 일정 크기가 넘으면 정렬 배열에 합친다.
+
+    프로세스마다 자기 메모리에 index를 들고, 추가한 항목은 자기 shard에 쓴다.
+    다른 프로세스가 추가한 항목은 refresh()(refresh_sec마다 자동)로 반영한다. shard마다 읽은 위치를
+    기억하므로 refresh는 새로 append된 부분만 읽는다 (key는 keys 리스트 하나에만 들고 있음).
+
+    Parameters:
+    - index_dir (str): EmbeddingStore 디렉토리
+    - mean (np.ndarray, optional): 처음 만들 때 뺄 embedding 평균 (필수, index_dir/mean.npy에 저장, 이후 무시.
+      바꾸려면 build_from_embeddings(..., rebuild=True)로 index를 다시 만든다)
+    - input_dim, dim, num_tables, num_bits, seed: projection과 hash 설정 (저장소 tag에 기록)
+    - threshold (float): 이 cosine 유사도 이상이면 중복
+    - refresh_sec (float): 다른 프로세스의 추가분을 다시 읽는 간격 (None: 자동으로 읽지 않음)
+    """
+
+    def __init__(self, index_dir, mean=None, input_dim=AUDIO_EMB_DIM, dim=DEDUP_PROJ_DIM, num_tables=DEDUP_LSH_TABLES,
+                 num_bits=DEDUP_LSH_BITS, threshold=DEDUP_SIMILARITY_THRESHOLD, refresh_sec=DEDUP_REFRESH_SEC, seed=0):
+        self.store = EmbeddingStore(index_dir, dim, tag=f"lsh|in={input_dim}|dim={dim}|seed={seed}")
+        mean_path = os.path.join(index_dir, "mean.npy")
+        if not os.path.exists(mean_path):
+            if mean is None:
+                # Cnn14 embedding은 ReLU 뒤라 음수가 없어서, 평균을 빼지 않으면 서로 다른 clip도 cosine 유사도가 높음
+                raise ValueError(f"{index_dir}에 mean.npy가 없어 mean이 필요함")
+            mean = np.asarray(mean, dtype=np.float32)
+            tmp_path = f"{mean_path}.{os.getpid()}.tmp.npy"
+            np.save(tmp_path, mean)
+            os.replace(tmp_path, mean_path)
+        self.mean = np.load(mean_path)
+        rng = np.random.RandomState(seed)
+        self.projection = (rng.randn(input_dim, dim) / np.sqrt(dim)).astype(np.float32)
+        self.planes = rng.randn(dim, num_tables * num_bits).astype(np.float32)
+        self.bit_weights = (1 << np.arange(num_bits, dtype=np.int64))
+        self.num_tables = num_tables
+        self.num_bits = num_bits
+        self.threshold = threshold
+        self.refresh_sec = refresh_sec
+        self.lock = threading.Lock()
+        self.last_refresh = 0.0
+        self.generation = -1  # 읽어 둔 compact 세대 (store.generation(), 처음에는 어떤 값과도 다름)
+        self._reset()
+        self.refresh()
+
+    def _reset(self):
+        dim = self.projection.shape[1]
+        self.keys = []
+        self.vectors = np.empty((0, dim), dtype=np.float16)
+        self.codes = np.empty((0, self.num_tables), dtype=np.int64)
+        self.size = 0
+        self.sorted_codes = [np.empty(0, dtype=np.int64) for _ in range(self.num_tables)]
+        self.sorted_rows = [np.empty(0, dtype=np.int32) for _ in range(self.num_tables)]
+        self.merged = 0  # rows < merged는 정렬 배열에 들어 있음
+        self.offsets = {}  # shard prefix -> (읽은 .ids byte 수, 읽은 .f16 행 수)
+
+    def project(self, embeddings):
+        x = (np.asarray(embeddings, dtype=np.float32).reshape(-1, self.mean.shape[0]) - self.mean) @ self.projection
+        return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
+    def hash(self, vectors):
+        bits = (np.asarray(vectors, dtype=np.float32) @ self.planes > 0).reshape(-1, self.num_tables, self.num_bits)
+        return bits.astype(np.int64) @ self.bit_weights
+
+    def _append(self, keys, vectors):
+        # vectors: projection된 (n, dim). 배열은 두 배씩 늘린다.
+        n = len(keys)
+        if self.size + n > len(self.vectors):
+            capacity = max(1024, 2 * len(self.vectors), self.size + n)
+            self.vectors = np.resize(self.vectors, (capacity, self.vectors.shape[1]))
+            self.codes = np.resize(self.codes, (capacity, self.num_tables))
+        self.vectors[self.size:self.size + n] = vectors
+        self.codes[self.size:self.size + n] = self.hash(vectors)
+        self.keys += keys
+        self.size += n
+        if self.size - self.merged > max(4096, self.merged // 20):
+            self._merge()
+
+    def _merge(self):
+        codes = self.codes[:self.size]
+        for t in range(self.num_tables):
+            order = np.argsort(codes[:, t], kind="stable")
+            self.sorted_codes[t] = codes[order, t]
+            self.sorted_rows[t] = order.astype(np.int32)
+        self.merged = self.size
+
+    def refresh(self):
+        """
+        store에서 이 프로세스가 아직 읽지 않은 항목(다른 프로세스가 추가한 것)을 읽어 index에 추가.
+        shard마다 지난번에 읽은 위치 뒤의 .ids/.f16 부분만 읽고, compact로 세대가 바뀌었으면 처음부터 다시 읽는다.
+        """
+        with self.lock:
+            num_read = 0
+            generation = self.store.generation()
+            if generation != self.generation:
+                self._reset()
+                self.generation = generation
+                for ids, vectors in self.store.compacted_parts():
+                    self._append(ids, vectors)
+                    num_read += len(ids)
+            for prefix in self.store.shard_prefixes():
+                ids_offset, row = self.offsets.get(prefix, (0, 0))
+                ids, vectors, ids_offset = self.store.read_shard_tail(prefix, ids_offset, row)
+                if ids:
+                    self._append(ids, vectors)
+                    self.offsets[prefix] = (ids_offset, row + len(ids))
+                    num_read += len(ids)
+            self.last_refresh = time.time()
+            return num_read
+
+    def _store_append(self, keys, vectors):
+        # 이미 메모리에 넣은 항목이므로, 자기 shard의 읽은 위치도 함께 옮겨 refresh가 다시 읽지 않게 함 (lock 안에서 호출)
+        self.store.append(keys, vectors)
+        prefix = self.store.shard_prefix()
+        ids_offset, row = self.offsets.get(prefix, (0, 0))
+        self.offsets[prefix] = (ids_offset + sum(len(key.encode("utf-8")) + 1 for key in keys), row + len(keys))
+
+    def _maybe_refresh(self):
+        if self.refresh_sec is not None and time.time() - self.last_refresh > self.refresh_sec:
+            self.refresh()
+
+    def _candidates(self, code):
+        rows = []
+        for t in range(self.num_tables):
+            lo, hi = np.searchsorted(self.sorted_codes[t], [code[t], code[t] + 1])
+            rows.append(self.sorted_rows[t][lo:min(hi, lo + _MAX_BUCKET_CANDIDATES)])
+        if self.size > self.merged:
+            pending = np.nonzero((self.codes[self.merged:self.size] == code).any(axis=1))[0] + self.merged
+            rows.append(pending.astype(np.int32))
+        return np.unique(np.concatenate(rows))
+
+    def _search(self, vector, code, exclude_source=None):
+        rows = self._candidates(code)
+        if exclude_source is not None:
+            rows = rows[[source_of(self.keys[row]) != exclude_source for row in rows]] if len(rows) else rows
+        if len(rows) == 0:
+            return None, 0.0
+        sims = self.vectors[rows].astype(np.float32) @ vector
+        best = int(np.argmax(sims))
+        return self.keys[rows[best]], float(sims[best])
+
+    def query(self, embeddings, exclude_source=None):
+        """embedding마다 가장 비슷한 (key, cosine 유사도), 후보가 없으면 (None, 0.0)."""
+        self._maybe_refresh()
+        vectors = self.project(embeddings)
+        codes = self.hash(vectors)
+        with self.lock:
+            return [self._search(vector, code, exclude_source) for vector, code in zip(vectors, codes)]
+
+    def add(self, keys, embeddings):
+        """index에 추가하고 이 프로세스의 shard에 저장."""
+        vectors = self.project(embeddings)
+        with self.lock:
+            self._append(list(keys), vectors)
+            self._store_append(list(keys), vectors)
+
+    def add_unique(self, keys, embeddings, exclude_source=None):
+        """
+        index(그리고 같은 호출의 앞선 항목)와 threshold 이상 비슷하지 않은 항목만 추가.
+        exclude_source(ex: video_id)의 항목은 비교하지 않는다 (실패 후 다시 처리하는 영상이 자기 자신과 겹치지 않도록).
+
+        Returns:
+        - matches (list): 항목마다 중복이면 (비슷한 key, 유사도), 추가했으면 None
+        """
+        self._maybe_refresh()
+        vectors = self.project(embeddings)
+        codes = self.hash(vectors)
+        matches, added = [], []
+        with self.lock:
+            for key, vector, code in zip(keys, vectors, codes):
+                match, sim = self._search(vector, code, exclude_source)
+                if match is not None and sim >= self.threshold:
+                    matches.append((match, sim))
+                    continue
+                self._append([key], vector[None])
+                matches.append(None)
+                added.append((key, vector))
+            if added:
+                self._store_append([key for key, _ in added], np.stack([vector for _, vector in added]))
+        return matches
+
+    def __len__(self):
+        return self.size
+
+
+def build_from_embeddings(index_dir, emb_dir, rebuild=False, **kwargs):
+    """
+    이미 업로드된 clip들의 audio embedding 저장소(emb_dir, vp/extractor/audio_embs.py)로 index를 채움.
+    mean도 emb_dir의 평균으로 정한다. rebuild면 기존 index(mean 포함)를 지우고 지금의 emb_dir로 다시 만든다.
+    """
+    clip_ids, embeddings = EmbeddingStore(emb_dir).load().to_array()
+    if not len(embeddings):
+        raise ValueError(f"{emb_dir}에 embedding이 없음")
+    if rebuild:
+        shutil.rmtree(index_dir, ignore_errors=True)
+    index = DuplicateIndex(index_dir, mean=embeddings.mean(axis=0), **kwargs)
+    indexed = set(index.keys)
+    new = [i for i, clip_id in enumerate(clip_ids) if clip_id not in indexed]
+    for start in range(0, len(new), 65536):
+        rows = new[start:start + 65536]
+        index.add([clip_ids[i] for i in rows], embeddings[rows])
+    index.store.compact()
+    print(f"✅ dedup index: {len(new)}개 추가, 총 {len(index)}개")
+    return index
+
+
+def simulate(index_dir, num_entries=1_000_000, num_queries=1000, noise=0.15, input_dim=AUDIO_EMB_DIM, seed=0):
+    """
+    합성 embedding으로 index 크기별 추가/검색 속도와 recall을 측정.
+    query의 절반은 이미 넣은 항목에 noise를 더한 것(중복)이고 절반은 새 항목이다.
+    """
+    rng = np.random.RandomState(seed)
+    base = rng.randn(64, input_dim).astype(np.float32)  # 음악끼리 비슷한 분포 흉내
+    index = DuplicateIndex(index_dir, mean=base.mean(axis=0), input_dim=input_dim, refresh_sec=None)
+    batch_size = 65536
+    start_time = time.time()
+    for start in range(0, num_entries, batch_size):
+        n = min(batch_size, num_entries - start)
+        embeddings = base[rng.randint(len(base), size=n)] + rng.randn(n, input_dim).astype(np.float32)
+        index.add([f"synth{start + i:09d}_0000000" for i in range(n)], embeddings)
+        if start == 0:
+            planted = embeddings[:num_queries // 2]
+    add_sec = time.time() - start_time
+
+    duplicates = planted + noise * rng.randn(*planted.shape).astype(np.float32)
+    fresh = base[rng.randint(len(base), size=num_queries - len(planted))] + rng.randn(num_queries - len(planted), input_dim).astype(np.float32)
+    start_time = time.time()
+    results = index.query(np.concatenate([duplicates, fresh]))
+    query_sec = time.time() - start_time
+
+    recall = np.mean([key == f"synth{i:09d}_0000000" and sim >= index.threshold
+                      for i, (key, sim) in enumerate(results[:len(planted)])])
+    false_positive = np.mean([sim >= index.threshold for _, sim in results[len(planted):]])
+    print(f"📊 {len(index)}개 항목: 추가 {add_sec:.1f}초, 검색 {query_sec / num_queries * 1000:.2f}ms/query, "
+          f"recall {recall:.3f}, false positive {false_positive:.3f}")
+    return {"add_sec": add_sec, "query_ms": query_sec / num_queries * 1000, "recall": recall,
+            "false_positive": false_positive}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate clip index over audio embeddings")
+    parser.add_argument("--index_dir", type=str, required=True)
+    parser.add_argument("--build_from", type=str, default=None, help="audio EmbeddingStore directory to index (vp/extractor/audio_embs.py)")
+    parser.add_argument("--rebuild", action="store_true", help="with --build_from: delete the index and recompute its mean")
+    parser.add_argument("--simulate", type=int, default=None, help="benchmark with this many synthetic entries in --index_dir")
+    args = parser.parse_args()
+
+    if args.simulate is not None:
+        simulate(args.index_dir, args.simulate)
+    elif args.build_from is not None:
+        build_from_embeddings(args.index_dir, args.build_from, rebuild=args.rebuild)
+    else:
+        DuplicateIndex(args.index_dir).store.compact()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import os
+import json
+import glob
+import time
+import fcntl
+import socket
+import numpy as np
+
+from vp.configs.constants import EMB_ROWS_PER_SHARD
+
+_DTYPE = np.dtype(np.float16)
+
+
+class EmbeddingStore:
+    """
+    clip_id → 고정 길이 float16 embedding 저장소 (clip마다 pickle 파일을 만들지 않음).
+
+    쓰기: 각 worker 프로세스는 자기 shard(shard-<host>-<pid>-<ts>.f16, 행 순서대로의 clip_id는 .ids)에
+    배치 단위로 append한다. embedding을 먼저 쓰고 clip_id를 나중에 쓰므로, 중간에 죽은 프로세스의
+    shard는 두 파일 중 짧은 쪽까지만 읽는다.
+    compact(): shard들을 rows_per_shard 행씩 part-<gen>-<k>.npy로 합치고(같은 clip_id는 마지막 값),
+    clip_id 목록은 행 순서대로 ids-<gen>.txt 한 파일에 기록한다.
+    읽기: npy/f16 파일은 memmap으로 열고 clip_id 목록만 읽어 clip_id → (part, row) index를 만든다.
+
+    Parameters:
+    - store_dir (str): 저장 디렉토리
+    - dim (int, optional): embedding 차원 (처음 만들 때 필요, 이후에는 meta.json에서 읽음)
+    - tag (str, optional): embedding을 만든 모델/설정 (meta.json에 기록, 다른 tag로 쓰면 에러)
+    - rows_per_shard (int): compact 후 part 파일 하나의 행 수
+    """
+
+    def __init__(self, store_dir, dim=None, tag=None, rows_per_shard=EMB_ROWS_PER_SHARD):
+        self.store_dir = store_dir
+        self.rows_per_shard = rows_per_shard
+        self.meta_path = os.path.join(store_dir, "meta.json")
+        self.current_path = os.path.join(store_dir, "current.json")
+        os.makedirs(store_dir, exist_ok=True)
+
+        meta = self._read_json(self.meta_path)
+        if meta is None:
+            if dim is None:
+                raise ValueError(f"{store_dir}에 meta.json이 없어 dim이 필요함")
+            meta = {"dim": int(dim), "dtype": _DTYPE.name, "tag": tag}
+            self._write_json(self.meta_path, meta)
+        elif dim is not None and meta["dim"] != dim or tag is not None and meta["tag"] not in (None, tag):
+            raise ValueError(f"{store_dir}는 dim={meta['dim']}, tag={meta['tag']}로 만들어진 저장소임 "
+                             f"(요청: dim={dim}, tag={tag})")
+        self.dim = meta["dim"]
+        self.tag = meta["tag"]
+        self.row_bytes = self.dim * _DTYPE.itemsize
+        self._shard = None  # (pid, shard path 접두어)
+        self._loaded = None
+
+    @staticmethod
+    def _read_json(path):
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_json(path, obj):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(obj, f)
+        os.replace(tmp_path, path)
+
+    def _lock(self):
+        lock_file = open(os.path.join(self.store_dir, ".lock"), "w")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def shard_prefix(self):
+        # fork된 worker도 자기 shard를 새로 만든다 (pid가 재사용돼도 ts로 구분)
+        if self._shard is None or self._shard[0] != os.getpid():
+            name = f"shard-{socket.gethostname()}-{os.getpid()}-{int(time.time() * 1000)}"
+            self._shard = (os.getpid(), os.path.join(self.store_dir, name))
+        return self._shard[1]
+
+    def shard_prefixes(self):
+        return sorted(path[:-len(".f16")] for path in glob.glob(os.path.join(self.store_dir, "shard-*.f16")))
+
+    def append(self, clip_ids, embeddings):
+        """
+        clip_ids 행들의 embedding (len(clip_ids), dim)을 이 프로세스의 shard에 추가.
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype=_DTYPE)
+        if embeddings.shape != (len(clip_ids), self.dim):
+            raise ValueError(f"embeddings shape {embeddings.shape} != ({len(clip_ids)}, {self.dim})")
+        if not len(clip_ids):
+            return
+        prefix = self.shard_prefix()
+        for path, data in ((f"{prefix}.f16", embeddings.tobytes()),
+                           (f"{prefix}.ids", "".join(f"{clip_id}\n" for clip_id in clip_ids).encode("utf-8"))):
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        self._loaded = None
+
+    def _read_ids(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return [line.rstrip("\n") for line in f if line.endswith("\n")]
+
+    def generation(self):
+        """마지막 compact()의 세대 번호 (compact한 적이 없으면 None)."""
+        current = self._read_json(self.current_path)
+        return None if current is None else current["generation"]
+
+    def compacted_parts(self):
+        """compact된 part들의 (clip_id 리스트, (rows, dim) memmap) 쌍들."""
+        parts = []
+        current = self._read_json(self.current_path)
+        if current is not None:
+            ids = self._read_ids(os.path.join(self.store_dir, current["ids"]))
+            start = 0
+            for name in current["parts"]:
+                array = np.load(os.path.join(self.store_dir, name), mmap_mode="r")
+                parts.append((ids[start:start + len(array)], array))
+                start += len(array)
+        return parts
+
+    def read_shard_tail(self, prefix, ids_offset=0, row=0):
+        """
+        shard(prefix)에서 .ids의 ids_offset byte, .f16의 row 행 이후에 append된 부분만 읽음.
+        clip_id 줄이 아직 끝나지 않았거나 embedding이 아직 다 쓰이지 않은 행은 다음 호출로 미룬다.
+
+        Returns:
+        - (clip_id 리스트, (n, dim) float16 배열, 다음 호출에 넘길 ids_offset)
+        """
+        try:
+            with open(f"{prefix}.ids", "rb") as f:
+                f.seek(ids_offset)
+                lines = f.read().split(b"\n")[:-1]
+            lines = lines[:max(0, os.path.getsize(f"{prefix}.f16") // self.row_bytes - row)]
+            vectors = np.fromfile(f"{prefix}.f16", dtype=_DTYPE, count=len(lines) * self.dim,
+                                  offset=row * self.row_bytes).reshape(len(lines), self.dim)
+        except FileNotFoundError:
+            # compact()가 shard를 지운 경우 (다음 세대의 part에 들어 있음)
+            return [], np.empty((0, self.dim), dtype=_DTYPE), ids_offset
+        ids_offset += sum(len(line) + 1 for line in lines)
+        return [line.decode("utf-8") for line in lines], vectors, ids_offset
+
+    def _parts(self):
+        """(clip_id 리스트, (rows, dim) memmap) 쌍들. compact된 part 먼저, 그다음 shard 순서."""
+        parts = self.compacted_parts()
+        for prefix in self.shard_prefixes():
+            ids = self._read_ids(f"{prefix}.ids") if os.path.exists(f"{prefix}.ids") else []
+            rows = min(len(ids), os.path.getsize(f"{prefix}.f16") // self.row_bytes)
+            if rows == 0:
+                continue
+            array = np.memmap(f"{prefix}.f16", dtype=_DTYPE, mode="r", shape=(rows, self.dim))
+            parts.append((ids[:rows], array))
+        return parts
+
+    def load(self):
+        """
+        저장된 part/shard를 memmap으로 열고 clip_id → (part 번호, row) index를 만듦. 다시 호출하면 새로 읽는다.
+        """
+        parts = self._parts()
+        index = {}
+        for part_idx, (ids, _) in enumerate(parts):
+            for row, clip_id in enumerate(ids):
+                index[clip_id] = (part_idx, row)  # 같은 clip_id는 나중 값
+        self._loaded = ([array for _, array in parts], index)
+        return self
+
+    @property
+    def index(self):
+        if self._loaded is None:
+            self.load()
+        return self._loaded[1]
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, clip_id):
+        return clip_id in self.index
+
+    def clip_ids(self):
+        return list(self.index)
+
+    def get(self, clip_id):
+        arrays, index = self._loaded if self._loaded is not None else self.load()._loaded
+        part_idx, row = index[clip_id]
+        return np.asarray(arrays[part_idx][row])
+
+    def get_many(self, clip_ids, dtype=np.float32):
+        """clip_ids 순서대로 (len(clip_ids), dim) 배열 (part별로 한 번에 fancy indexing)."""
+        arrays, index = self._loaded if self._loaded is not None else self.load()._loaded
+        out = np.empty((len(clip_ids), self.dim), dtype=dtype)
+        rows_by_part = {}
+        for i, clip_id in enumerate(clip_ids):
+            part_idx, row = index[clip_id]
+            rows_by_part.setdefault(part_idx, ([], []))
+            rows_by_part[part_idx][0].append(i)
+            rows_by_part[part_idx][1].append(row)
+        for part_idx, (out_rows, rows) in rows_by_part.items():
+            out[out_rows] = arrays[part_idx][np.asarray(rows)]
+        return out
+
+    def to_array(self, dtype=np.float32):
+        """모든 clip의 (clip_id 리스트, (N, dim) 배열)."""
+        clip_ids = self.clip_ids()
+        return clip_ids, self.get_many(clip_ids, dtype)
+
+    def compact(self):
+        """
+        shard들과 이전 part들을 새 세대의 part-<gen>-<k>.npy로 합치고 이전 파일을 삭제.
+        append 중인 worker가 없을 때(추출 시작 전/종료 후) 호출한다.
+
+        Returns:
+        - num_rows (int): 합친 뒤 clip 수 (합칠 shard가 없으면 None)
+        """
+        with self._lock():
+            shard_prefixes = self.shard_prefixes()
+            if not shard_prefixes:
+                return None
+            self.load()
+            arrays, index = self._loaded
+            clip_ids = list(index)
+            current = self._read_json(self.current_path)
+            gen = 0 if current is None else current["generation"] + 1
+
+            part_names = []
+            for start in range(0, len(clip_ids), self.rows_per_shard):
+                name = f"part-{gen:04d}-{len(part_names):05d}.npy"
+                chunk_ids = clip_ids[start:start + self.rows_per_shard]
+                part = np.lib.format.open_memmap(os.path.join(self.store_dir, name), mode="w+", dtype=_DTYPE,
+                                                 shape=(len(chunk_ids), self.dim))
+                part[:] = self.get_many(chunk_ids, dtype=_DTYPE)
+                part.flush()
+                del part
+                part_names.append(name)
+            ids_name = f"ids-{gen:04d}.txt"
+            with open(os.path.join(self.store_dir, ids_name), "w", encoding="utf-8") as f:
+                f.writelines(f"{clip_id}\n" for clip_id in clip_ids)
+
+            self._loaded = None
+            del arrays
+            self._write_json(self.current_path, {"generation": gen, "parts": part_names, "ids": ids_name,
+                                                 "rows": len(clip_ids)})
+            if current is not None:
+                for name in current["parts"] + [current["ids"]]:
+                    os.remove(os.path.join(self.store_dir, name))
+            for prefix in shard_prefixes:
+                for ext in (".f16", ".ids"):
+                    if os.path.exists(prefix + ext):
+                        os.remove(prefix + ext)
+        print(f"📦 embedding 병합: {len(shard_prefixes)}개 shard → {len(part_names)}개 part ({len(clip_ids)}개 clip)")
+        return len(clip_ids)
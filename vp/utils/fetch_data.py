@@ -1,34 +1,249 @@
 import os
+import json
+import time
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from tqdm import tqdm
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 
 from vp.configs.constants import *
+from vp.utils.s3_inventory import S3Inventory, REQUIRED_CLIP_EXTS
+from vp.utils.state_store import CrawlStateStore, COMPLETED, FAILED, UPLOAD_FAILED
 
-s3 = boto3.client("s3")
+_s3_clients = {}
 
-# FAILED_LOG txt file에 있는 이미 실패한 clip_id를 가져와서 다시 실행하지 않도록 함.
+
+def get_s3_client():
+    """
+    프로세스마다 하나만 만들어 재사용하는 S3 클라이언트 (connection pool 공유).
+    boto3 클라이언트는 thread-safe 하지만 fork 이후에는 새로 만들어야 하므로 pid별로 캐시한다.
+    재시도는 S3Uploader가 파일 단위로 하므로 클라이언트 자체 재시도는 끈다 (max_attempts=1).
+    """
+    pid = os.getpid()
+    if pid not in _s3_clients:
+        _s3_clients.clear()
+        _s3_clients[pid] = boto3.client(
+            "s3",
+            endpoint_url=S3_ENDPOINT_URL,
+            config=Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                          retries={"max_attempts": 1, "mode": "standard"}),
+        )
+    return _s3_clients[pid]
+
+
+def get_transfer_config():
+    return TransferConfig(
+        multipart_threshold=S3_MULTIPART_THRESHOLD,
+        multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+        max_concurrency=S3_PART_CONCURRENCY,
+        use_threads=True,
+    )
+
+
+class S3Uploader:
+    """
+    여러 파일(여러 clip)을 동시에 업로드하는 업로더.
+    하나의 S3 클라이언트(connection pool)와 multipart 설정(TransferConfig)을 공유하고,
+    실패한 업로드는 jitter가 있는 지수 backoff로 재시도하며, 전체 업로드 속도(bytes/sec)를 집계한다.
+
+    Parameters:
+    - s3_client (boto3.client, optional): 사용할 S3 클라이언트 (기본값: get_s3_client())
+    - s3_bucket (str): 업로드 대상 S3 버킷 이름
+    - max_workers (int): 동시에 업로드할 파일 수
+    - transfer_config (TransferConfig, optional): multipart threshold/part 크기 설정
+    - max_retries (int): 파일 하나당 최대 재시도 횟수
+    - backoff_base_sec (float): 재시도 대기 시간의 기준값 (시도마다 2배, 0~기준값 사이 랜덤)
+    - inventory (S3Inventory, optional): 업로드한 객체를 바로 반영할 인벤토리 인덱스
+    """
+
+    def __init__(self, s3_client=None, s3_bucket=S3_BUCKET, max_workers=S3_UPLOAD_WORKERS,
+                 transfer_config=None, max_retries=S3_UPLOAD_RETRIES, backoff_base_sec=0.5, inventory=None):
+        self.s3_client = s3_client if s3_client is not None else get_s3_client()
+        self.s3_bucket = s3_bucket
+        self.inventory = inventory
+        self.transfer_config = transfer_config or get_transfer_config()
+        self.max_retries = max_retries
+        self.backoff_base_sec = backoff_base_sec
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.lock = threading.Lock()
+        self.bytes_uploaded = 0
+        self.files_uploaded = 0
+        self.files_failed = 0
+        self.busy_since = None
+        self.busy_sec = 0.0
+        self.in_flight = 0
+
+    def _start(self):
+        with self.lock:
+            if self.in_flight == 0:
+                self.busy_since = time.time()
+            self.in_flight += 1
+
+    def _finish(self, n_bytes, success):
+        with self.lock:
+            self.in_flight -= 1
+            if self.in_flight == 0:
+                self.busy_sec += time.time() - self.busy_since
+            if success:
+                self.bytes_uploaded += n_bytes
+                self.files_uploaded += 1
+            else:
+                self.files_failed += 1
+
+    def upload_file(self, local_path, s3_key):
+        n_bytes = os.path.getsize(local_path)
+        self._start()
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.s3_client.upload_file(local_path, self.s3_bucket, s3_key, Config=self.transfer_config)
+                break
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"❌ S3 업로드 실패: {s3_key}, 사유: {e}")
+                    self._finish(n_bytes, False)
+                    return False
+                time.sleep(random.uniform(0, self.backoff_base_sec * 2 ** attempt))
+        if self.inventory is not None:
+            self.inventory.record_upload(s3_key, n_bytes)
+        self._finish(n_bytes, True)
+        return True
+
+    def upload_files(self, path_key_pairs):
+        """
+        (local_path, s3_key) 리스트를 동시에 업로드하고 각 s3_key의 성공 여부를 dict로 반환.
+        """
+        futures = {s3_key: self.executor.submit(self.upload_file, local_path, s3_key)
+                   for local_path, s3_key in path_key_pairs}
+        return {s3_key: future.result() for s3_key, future in futures.items()}
+
+    def clip_folder_files(self, local_clip_dir, clip_id, s3_prefix):
+        local_dir = os.path.join(local_clip_dir, clip_id)
+        return [(os.path.join(local_dir, fname), f"{s3_prefix}/{clip_id}/{fname}") for fname in os.listdir(local_dir)]
+
+    def upload_clip_folders(self, local_clip_dir, clip_ids, s3_prefix):
+        """
+        여러 clip 폴더의 파일을 한꺼번에 동시 업로드하고 clip_id별 성공 여부를 dict로 반환.
+        """
+        files = {clip_id: self.clip_folder_files(local_clip_dir, clip_id, s3_prefix) for clip_id in clip_ids}
+        results = self.upload_files([pair for pairs in files.values() for pair in pairs])
+        return {clip_id: all(results[s3_key] for _, s3_key in pairs) for clip_id, pairs in files.items()}
+
+    def stats(self):
+        with self.lock:
+            busy_sec = self.busy_sec + (time.time() - self.busy_since if self.in_flight else 0.0)
+            return {
+                "files_uploaded": self.files_uploaded,
+                "files_failed": self.files_failed,
+                "bytes_uploaded": self.bytes_uploaded,
+                "bytes_per_sec": self.bytes_uploaded / max(busy_sec, 1e-9),
+            }
+
+    def print_stats(self):
+        stats = self.stats()
+        print(f"📤 업로드 {stats['files_uploaded']}개 파일 ({stats['files_failed']}개 실패), "
+              f"{stats['bytes_uploaded'] / 1024 ** 2:.1f}MB, {stats['bytes_per_sec'] / 1024 ** 2:.2f}MB/s")
+
+
+_s3_uploaders = {}
+
+
+def get_s3_uploader():
+    """
+    프로세스마다 하나만 만들어 재사용하는 S3Uploader (S3_BUCKET 대상).
+    """
+    pid = os.getpid()
+    if pid not in _s3_uploaders:
+        _s3_uploaders.clear()
+        _s3_uploaders[pid] = S3Uploader(inventory=get_s3_inventory())
+    return _s3_uploaders[pid]
+
+
+_s3_inventories = {}
+
+
+def get_s3_inventory():
+    """
+    프로세스마다 하나만 만들어 재사용하는 S3_BUCKET/S3_PREFIX 인벤토리 인덱스 (S3_INVENTORY_PATH가 None이면 None).
+    """
+    if S3_INVENTORY_PATH is None or S3_PREFIX is None:
+        return None
+    pid = os.getpid()
+    if pid not in _s3_inventories:
+        _s3_inventories.clear()
+        _s3_inventories[pid] = S3Inventory(S3_BUCKET, S3_PREFIX, db_path=S3_INVENTORY_PATH)
+    return _s3_inventories[pid]
+
+
+def refresh_s3_inventory(max_age_sec=S3_INVENTORY_MAX_AGE_SEC):
+    # 크롤링 시작 전(Pool 생성 전) 부모 프로세스에서 한 번만 호출
+    inventory = get_s3_inventory()
+    if inventory is not None:
+        inventory.refresh(max_age_sec)
+    return inventory
+
+# 기존 txt 로그 경로 → 상태 저장소의 status
+LOG_STATUS = {
+    COMPLETED_LOG: COMPLETED,
+    FAILED_LOG: FAILED,
+    UPLOAD_FAILED_LOG: UPLOAD_FAILED,
+}
+
+_crawl_states = {}
+
+
+def get_crawl_state():
+    """
+    프로세스마다 하나만 만들어 재사용하는 크롤링 상태 저장소.
+    처음 열 때 기존 txt 로그를 가져온다 (completed를 먼저 가져와서 우선).
+    """
+    pid = os.getpid()
+    if pid not in _crawl_states:
+        _crawl_states.clear()
+        state = CrawlStateStore(CRAWL_STATE_DB_PATH)
+        for log_file_path, status in LOG_STATUS.items():
+            state.import_legacy_log(log_file_path, status)
+        _crawl_states[pid] = state
+    return _crawl_states[pid]
+
+
+# FAILED_LOG에 해당하는 이미 실패한 clip_id를 가져와서 다시 실행하지 않도록 함.
 def load_ids(log_file_path):
+    if log_file_path in LOG_STATUS:
+        return get_crawl_state().ids_with_status(LOG_STATUS[log_file_path])
     if os.path.exists(log_file_path):
         with open(log_file_path, "r", encoding="utf-8") as f:
             return set(line.strip() for line in f)
     return set()
 
 def log_result(clip_id, logging_file_path, error_msg=None):
-    os.makedirs(os.path.dirname(logging_file_path), exist_ok=True)
-    with open(logging_file_path, "a", encoding="utf-8") as f:
-        f.write(f"{clip_id}\n")
+    if logging_file_path in LOG_STATUS:
+        get_crawl_state().record(clip_id, LOG_STATUS[logging_file_path], error_msg)
+    else:
+        os.makedirs(os.path.dirname(logging_file_path), exist_ok=True)
+        with open(logging_file_path, "a", encoding="utf-8") as f:
+            f.write(f"{clip_id}\n")
     if error_msg is not None:
         print(f"[ERROR] {clip_id} 실패 기록됨. 사유: {error_msg}")
 
-def s3_complete_clip_exists(clip_id):
+def s3_complete_clip_exists(clip_id, inventory=None):
     """
     S3에 clip_id 폴더가 존재하고, mp4, mp3, json 파일이 모두 있을 경우 True
     그렇지 않으면 False (즉, 덮어쓰기 대상)
+    인벤토리 인덱스가 한 번이라도 동기화되어 있으면 S3 LIST 없이 인덱스에서 확인한다.
     """
+    if inventory is None:
+        inventory = get_s3_inventory()
+    if inventory is not None and inventory.last_synced_at() is not None:
+        return inventory.has_complete_clip(clip_id)
+
     prefix = f"{S3_PREFIX}/{clip_id}/"
-    required_exts = {".mp4", ".mp3", ".json"}
+    required_exts = set(REQUIRED_CLIP_EXTS)
 
-    paginator = s3.get_paginator('list_objects_v2')
+    paginator = get_s3_client().get_paginator('list_objects_v2')
     pages = paginator.paginate(Bucket=S3_BUCKET, Prefix=prefix)
 
     existing_exts = set()
@@ -43,12 +258,7 @@ def s3_complete_clip_exists(clip_id):
 
 # S3 저장소에 로컬에 저장된 파일을 업로드(내부 함수)
 def upload_to_s3(local_path, s3_key):
-    try:
-        s3.upload_file(local_path, S3_BUCKET, s3_key)
-        return True
-    except Exception as e:
-        print(f"❌ S3 업로드 실패: {s3_key}, 사유: {e}")
-        return False
+    return get_s3_uploader().upload_file(local_path, s3_key)
 
 # S3 저장소에 로컬에 저장된 파일을 업로드
 def upload_clip_folder(clip_id):
@@ -58,17 +268,14 @@ def upload_clip_folder(clip_id):
 
     # ✅ S3에 완전한 클립이 존재하면 스킵
     if s3_complete_clip_exists(clip_id):
+        # completed 기록은 호출한 쪽(Crawler.s3_upload)에서 한 번만 한다
         print(f"🚫 S3에 완전한 클립이 이미 존재함 → 스킵: {clip_id}")
-        log_result(clip_id, COMPLETED_LOG)
         return True
 
     print(f"⏫ 업로드 시작: {clip_id}")
-    success = True
-    for fname in os.listdir(local_dir):
-        local_path = os.path.join(local_dir, fname)
-        s3_key = f"{S3_PREFIX}/{clip_id}/{fname}"
-        if not upload_to_s3(local_path, s3_key):
-            success = False
+    uploader = get_s3_uploader()
+    results = uploader.upload_files(uploader.clip_folder_files(DOWNLOAD_DIR, clip_id, S3_PREFIX))
+    success = all(results.values())
 
     if not success:
         log_result(clip_id, UPLOAD_FAILED_LOG)
@@ -77,7 +284,7 @@ def upload_clip_folder(clip_id):
 
 
 def local_to_s3(local_clip_dir, clip_id, s3_bucket, s3_prefix, s3_client, 
-                check_clip_exists_fn=None, log_completed_fn=None, log_failed_fn=None):
+                check_clip_exists_fn=None, log_completed_fn=None, log_failed_fn=None, uploader=None):
     """
     로컬에 저장된 클립 폴더를 S3 버킷에 업로드하는 함수.
 
@@ -90,6 +297,7 @@ def local_to_s3(local_clip_dir, clip_id, s3_bucket, s3_prefix, s3_client,
     - check_clip_exists_fn (callable, optional): S3에 클립 존재 여부를 확인하는 함수
     - log_completed_fn (callable, optional): 업로드 완료 로깅 함수
     - log_failed_fn (callable, optional): 업로드 실패 로깅 함수
+    - uploader (S3Uploader, optional): 여러 호출에서 공유할 업로더 (없으면 s3_client로 새로 생성)
     """
 
     local_dir = os.path.join(local_clip_dir, clip_id)
@@ -105,17 +313,10 @@ def local_to_s3(local_clip_dir, clip_id, s3_bucket, s3_prefix, s3_client,
         return True
 
     print(f"⏫ 업로드 시작: {clip_id}")
-    success = True
-
-    for fname in os.listdir(local_dir):
-        local_path = os.path.join(local_dir, fname)
-        s3_key = f"{s3_prefix}/{clip_id}/{fname}"
-
-        try:
-            s3_client.upload_file(local_path, s3_bucket, s3_key)
-        except Exception as e:
-            print(f"❌ S3 업로드 실패: {s3_key}, 사유: {e}")
-            success = False
+    if uploader is None:
+        uploader = S3Uploader(s3_client=s3_client, s3_bucket=s3_bucket)
+    results = uploader.upload_files(uploader.clip_folder_files(local_clip_dir, clip_id, s3_prefix))
+    success = all(results.values())
 
     if not success:
         if log_failed_fn:
@@ -198,7 +399,7 @@ def download_specific_filetype_from_s3(clip_id, local_clip_dir, s3_bucket, s3_pr
     return download_clip_from_s3(clip_id, local_clip_dir, s3_bucket, s3_prefix, s3_client, specific_ext)
 
 
-def list_s3_clip_ids(s3_bucket, s3_prefix, s3_client, save_path=None):
+def list_s3_clip_ids(s3_bucket, s3_prefix, s3_client, save_path=None, inventory=None):
     # 사용 예시:
     # clip_ids = list_s3_clip_ids(
     #     s3_bucket="maclab-youtube-crawl",
@@ -214,26 +415,31 @@ def list_s3_clip_ids(s3_bucket, s3_prefix, s3_client, save_path=None):
     - s3_prefix (str): 검색할 S3 prefix (ex: 'chopin16')
     - s3_client (boto3.client): boto3의 S3 클라이언트 객체
     - save_path (str, optional): 결과를 저장할 로컬 파일 경로 (ex: 'clip_id_list.txt')
+    - inventory (S3Inventory, optional): 전체 listing 대신 바뀐 key만 반영해 조회할 인벤토리 인덱스
 
     Returns:
     - clip_ids (list of str): clip_id 리스트
     """
 
-    paginator = s3_client.get_paginator('list_objects_v2')
-    pages = paginator.paginate(Bucket=s3_bucket, Prefix=s3_prefix)
+    if inventory is not None:
+        inventory.refresh(S3_INVENTORY_MAX_AGE_SEC)
+        clip_ids = inventory.clip_ids()
+    else:
+        paginator = s3_client.get_paginator('list_objects_v2')
+        pages = paginator.paginate(Bucket=s3_bucket, Prefix=s3_prefix)
 
-    clip_ids = set()
+        clip_ids = set()
 
-    for page in pages:
-        for obj in page.get('Contents', []):
-            key = obj['Key']
-            parts = key.split('/')
-            if len(parts) >= 2 and parts[0] == s3_prefix:
-                clip_id = parts[1]
-                if clip_id:  # 빈 값이 아니면
-                    clip_ids.add(clip_id)
+        for page in pages:
+            for obj in page.get('Contents', []):
+                key = obj['Key']
+                parts = key.split('/')
+                if len(parts) >= 2 and parts[0] == s3_prefix:
+                    clip_id = parts[1]
+                    if clip_id:  # 빈 값이 아니면
+                        clip_ids.add(clip_id)
 
-    clip_ids = sorted(list(clip_ids))  # 정렬
+        clip_ids = sorted(list(clip_ids))  # 정렬
 
     # 저장 옵션
     if save_path:
@@ -246,7 +452,157 @@ def list_s3_clip_ids(s3_bucket, s3_prefix, s3_client, save_path=None):
     return clip_ids
 
 
-def crawl_s3_clips_from_file(clip_list_path, s3_bucket, s3_prefix, s3_client, local_clip_dir, mode="all"):
+def list_s3_clip_objects(s3_bucket, s3_prefix, s3_client, clip_ids=None):
+    """
+    S3 prefix 전체를 한 번만 listing 해서 clip_id별 파일 목록을 만드는 함수.
+
+    Parameters:
+    - s3_bucket (str): S3 버킷 이름
+    - s3_prefix (str): 검색할 S3 prefix (ex: 'chopin16')
+    - s3_client (boto3.client): boto3의 S3 클라이언트 객체
+    - clip_ids (set of str, optional): 이 clip_id들의 파일만 모음 (None이면 전체)
+
+    Returns:
+    - clip_objects (dict): clip_id → [(key, size, etag), ...]
+    """
+    paginator = s3_client.get_paginator('list_objects_v2')
+    pages = paginator.paginate(Bucket=s3_bucket, Prefix=f"{s3_prefix}/")
+
+    clip_objects = {}
+    for page in pages:
+        for obj in page.get('Contents', []):
+            key = obj['Key']
+            parts = key.split('/')
+            if len(parts) < 3 or parts[0] != s3_prefix or key.endswith('/'):
+                continue
+            clip_id = parts[1]
+            if clip_ids is not None and clip_id not in clip_ids:
+                continue
+            clip_objects.setdefault(clip_id, []).append((key, obj['Size'], obj['ETag'].strip('"')))
+    return clip_objects
+
+
+def load_download_manifest(manifest_path):
+    # 완료된 다운로드 기록 (JSONL, 한 줄에 {"key", "size", "etag"})
+    manifest = {}
+    if manifest_path and os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 중단되면서 잘린 마지막 줄
+                manifest[entry['key']] = entry
+    return manifest
+
+
+def file_md5(path, block_size=1024 * 1024):
+    h = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def local_file_matches(local_path, size, etag, manifest_entry=None):
+    """
+    로컬 파일이 S3 객체와 같은지 확인 (크기 + ETag).
+    multipart 업로드 객체의 ETag는 md5가 아니므로 manifest에 기록된 ETag로만 비교한다.
+    """
+    if not os.path.exists(local_path) or os.path.getsize(local_path) != size:
+        return False
+    if manifest_entry is not None:
+        return manifest_entry['etag'] == etag and manifest_entry['size'] == size
+    if '-' in etag:
+        return False
+    return file_md5(local_path) == etag
+
+
+def bulk_download_from_s3(clip_ids, local_clip_dir, s3_bucket, s3_prefix, s3_client, specific_ext=None,
+                          max_in_flight=S3_DOWNLOAD_WORKERS, manifest_path=None):
+    """
+    여러 clip_id 폴더를 한 번의 prefix listing과 thread pool 동시 다운로드로 받아오는 함수.
+    이미 로컬에 같은 크기/ETag로 존재하는 파일은 건너뛰고, 완료된 파일은 manifest에 기록해
+    중단된 실행을 이어서 할 수 있다.
+
+    Parameters:
+    - clip_ids (list of str): 다운로드할 클립 ID 리스트
+    - local_clip_dir (str): 로컬 상위 디렉토리 경로 (ex: '/downloads')
+    - s3_bucket (str): 다운로드 대상 S3 버킷 이름
+    - s3_prefix (str): S3 내 저장된 경로 prefix (ex: 'clips')
+    - s3_client (boto3.client): boto3의 S3 클라이언트 객체
+    - specific_ext (str, optional): 이 확장자 파일만 다운로드 (ex: '.mp4')
+    - max_in_flight (int): 동시에 다운로드할 최대 파일 수
+    - manifest_path (str, optional): 완료 기록 파일 경로 (기본값: local_clip_dir/.s3_download_manifest.jsonl)
+
+    Returns:
+    - stats (dict): downloaded / skipped / failed 파일 수와 missing clip_id 수
+    """
+    manifest_path = manifest_path or os.path.join(local_clip_dir, ".s3_download_manifest.jsonl")
+    os.makedirs(local_clip_dir, exist_ok=True)
+    manifest = load_download_manifest(manifest_path)
+
+    print(f"🔍 S3 prefix listing: s3://{s3_bucket}/{s3_prefix}/")
+    clip_objects = list_s3_clip_objects(s3_bucket, s3_prefix, s3_client, set(clip_ids))
+    missing = [clip_id for clip_id in clip_ids if clip_id not in clip_objects]
+    if missing:
+        print(f"⚠️ S3에 파일이 없는 clip_id {len(missing)}개")
+
+    jobs = []
+    skipped = 0
+    for clip_id in clip_ids:
+        for key, size, etag in clip_objects.get(clip_id, []):
+            filename = key.rsplit('/', 1)[1]
+            if specific_ext and os.path.splitext(filename)[1].lower() != specific_ext.lower():
+                continue
+            local_path = os.path.join(local_clip_dir, clip_id, filename)
+            if local_file_matches(local_path, size, etag, manifest.get(key)):
+                skipped += 1
+                continue
+            jobs.append((key, size, etag, local_path))
+
+    transfer_config = get_transfer_config()
+
+    def download(key, local_path):
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        tmp_path = f"{local_path}.part"
+        s3_client.download_file(s3_bucket, key, tmp_path, Config=transfer_config)
+        os.replace(tmp_path, local_path)
+
+    downloaded, failed = 0, 0
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor, \
+            open(manifest_path, 'a', encoding='utf-8') as manifest_file, \
+            tqdm(total=len(jobs), desc="Downloading files") as pbar:
+        in_flight = {}
+        jobs_iter = iter(jobs)
+        while True:
+            # 제출된 future 수를 max_in_flight로 제한
+            for key, size, etag, local_path in jobs_iter:
+                in_flight[executor.submit(download, key, local_path)] = (key, size, etag)
+                if len(in_flight) >= max_in_flight:
+                    break
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                key, size, etag = in_flight.pop(future)
+                try:
+                    future.result()
+                    manifest_file.write(json.dumps({"key": key, "size": size, "etag": etag}) + "\n")
+                    manifest_file.flush()
+                    downloaded += 1
+                except Exception as e:
+                    print(f"❌ 다운로드 실패: {key}, 사유: {e}")
+                    failed += 1
+                pbar.update(1)
+
+    stats = {"downloaded": downloaded, "skipped": skipped, "failed": failed, "missing_clips": len(missing)}
+    print(f"✅ 다운로드 {downloaded}개, 스킵 {skipped}개, 실패 {failed}개")
+    return stats
+
+
+def crawl_s3_clips_from_file(clip_list_path, s3_bucket, s3_prefix, s3_client, local_clip_dir, mode="all",
+                             bulk=True, max_in_flight=S3_DOWNLOAD_WORKERS, manifest_path=None):
     # 사용 예시:
     # crawl_s3_clips_from_file(
     #     clip_list_path="clip_ids.txt",
@@ -267,8 +623,11 @@ def crawl_s3_clips_from_file(clip_list_path, s3_bucket, s3_prefix, s3_client, lo
     - s3_client (boto3.client): boto3의 S3 클라이언트 객체
     - local_clip_dir (str): 다운로드할 로컬 상위 폴더 경로
     - mode (str): "mp4", "mp3", "json", "all" 중 선택
+    - bulk (bool): prefix 전체를 한 번만 listing 하고 동시 다운로드 (False면 clip_id별로 순차 다운로드)
+    - max_in_flight (int): bulk 모드에서 동시에 다운로드할 최대 파일 수
+    - manifest_path (str, optional): bulk 모드의 이어받기용 완료 기록 파일 경로
     """
-    if isinstance(mode, str) and not mode[0] == '.':
+    if isinstance(mode, str) and mode != "all" and not mode[0] == '.':
         mode = f'.{mode}'
     
     supported_modes = [".mp4", ".mp3", ".json", "all"]
@@ -285,6 +644,13 @@ def crawl_s3_clips_from_file(clip_list_path, s3_bucket, s3_prefix, s3_client, lo
         clip_ids = [line.strip() for line in f if line.strip()]
 
     print(f"🎯 총 {len(clip_ids)}개의 clip_id 대상 다운로드 시작합니다. (mode: {mode})")
+    if bulk:
+        bulk_download_from_s3(clip_ids, local_clip_dir, s3_bucket, s3_prefix, s3_client,
+                              specific_ext=None if mode == "all" else mode,
+                              max_in_flight=max_in_flight, manifest_path=manifest_path)
+        print(f"✅ 다운로드 완료! (mode: {mode})")
+        return
+
     # 2. 각 clip_id마다 다운로드 수행
     for clip_id in tqdm(clip_ids, desc="Downloading clips"):
         try:
@@ -297,7 +663,8 @@ def crawl_s3_clips_from_file(clip_list_path, s3_bucket, s3_prefix, s3_client, lo
     print(f"✅ 다운로드 완료! (mode: {mode})")
     
     
-def list_s3_folders_that_do_not_have_specific_file_type(s3_bucket, s3_prefix, s3_client, file_ext, save_path=None):
+def list_s3_folders_that_do_not_have_specific_file_type(s3_bucket, s3_prefix, s3_client, file_ext, save_path=None,
+                                                         inventory=None):
     """
     S3 버킷에서 특정 파일 확장자가 없는 폴더 리스트를 가져오는 함수.
 
@@ -307,37 +674,45 @@ def list_s3_folders_that_do_not_have_specific_file_type(s3_bucket, s3_prefix, s3
     - s3_client (boto3.client): boto3의 S3 클라이언트 객체
     - file_ext (str): 확인할 파일 확장자 (ex: '.json')
     - save_path (str, optional): 결과를 저장할 로컬 파일 경로 (ex: 'folders_without_json.txt')
+    - inventory (S3Inventory, optional): 전체 listing 대신 바뀐 key만 반영해 조회할 인벤토리 인덱스
 
     Returns:
     - folders_without_file_type (list of str): 해당 파일이 없는 폴더 리스트
     """
     
-    file_type_existance_per_folder = {}
-    
-    paginator = s3_client.get_paginator('list_objects_v2')
-    pages = paginator.paginate(Bucket=s3_bucket, Prefix=s3_prefix)
-    
-    for page in pages:
-        for obj in page.get('Contents', []):
-            key = obj['Key']
-            parts = key.split('/')
-            if len(parts) >= 2 and parts[0] == s3_prefix:
-                clip_id = parts[1]
-                if clip_id not in file_type_existance_per_folder.keys():
-                    file_type_existance_per_folder[clip_id] = True
-                
-                file_name = parts[-1]
-                if file_name.endswith(file_ext):
-                    file_type_existance_per_folder[clip_id] = False
-            
+    if inventory is not None:
+        inventory.refresh(S3_INVENTORY_MAX_AGE_SEC)
+        folders_without_file_type = inventory.clip_ids_missing_ext(file_ext)
+        num_folders = inventory.clip_count()
+    else:
+        file_type_existance_per_folder = {}
+
+        paginator = s3_client.get_paginator('list_objects_v2')
+        pages = paginator.paginate(Bucket=s3_bucket, Prefix=s3_prefix)
+
+        for page in pages:
+            for obj in page.get('Contents', []):
+                key = obj['Key']
+                parts = key.split('/')
+                if len(parts) >= 2 and parts[0] == s3_prefix:
+                    clip_id = parts[1]
+                    if clip_id not in file_type_existance_per_folder.keys():
+                        file_type_existance_per_folder[clip_id] = True
+
+                    file_name = parts[-1]
+                    if file_name.endswith(file_ext):
+                        file_type_existance_per_folder[clip_id] = False
+
+        folders_without_file_type = [folder for folder, exists in file_type_existance_per_folder.items() if exists]
+        num_folders = len(file_type_existance_per_folder)
+
     # 저장 옵션
-    folders_without_file_type = [folder for folder, exists in file_type_existance_per_folder.items() if exists]
     if save_path:
         with open(save_path, 'w', encoding='utf-8') as f:
             for folder in folders_without_file_type:
                 f.write(f"{folder}\n")
         print(f"✅ 폴더 리스트 저장 완료: {save_path}")
 
-    print(f"총 {len(file_type_existance_per_folder)}개 중 {len(folders_without_file_type)}개 폴더가 '{file_ext}' 파일이 없습니다.")
+    print(f"총 {num_folders}개 중 {len(folders_without_file_type)}개 폴더가 '{file_ext}' 파일이 없습니다.")
     
     return folders_without_file_type
\ No newline at end of file
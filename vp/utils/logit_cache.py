@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+
+from vp.configs.constants import PANN_CACHE_DIR, PANN_CACHE_MAX_BYTES
+from vp.utils.sqlite_db import SqliteConnection
+
+# 압축(compaction)은 죽은 영역이 살아있는 영역보다 크고, 이 크기 이상일 때만 수행
+_MIN_COMPACT_BYTES = 64 * 1024 * 1024
+_ITEM_BYTES = np.dtype(np.float16).itemsize
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS entries (
+        key TEXT PRIMARY KEY, gen INTEGER, offset INTEGER, length INTEGER,
+        shape TEXT, meta TEXT, last_access REAL)""",
+    "CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)",
+    "CREATE TABLE IF NOT EXISTS aliases (alias TEXT PRIMARY KEY, key TEXT)",
+    "CREATE TABLE IF NOT EXISTS state (name TEXT PRIMARY KEY, value INTEGER)",
+    "INSERT OR IGNORE INTO state VALUES ('gen', 0)",
+]
+
+
+def file_content_hash(path, block_size=1024 * 1024):
+    """
+    파일 내용 전체의 blake2b 해시 (캐시 키 생성용).
+    """
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class LogitCache:
+    """
+    내용 주소 기반(content-addressed) float16 배열 캐시.
+
+    모든 배열은 하나의 append-only float16 파일(data-<gen>.f16)에 이어 붙여 저장하고,
+    key → (offset, length, shape, meta) 인덱스는 SQLite(WAL)에 저장한다.
+    읽기는 memmap으로 필요한 구간만 가져오며, 전체 크기가 max_bytes를 넘으면
+    가장 오래 사용되지 않은 항목부터 삭제(LRU)한다. 삭제로 생긴 빈 공간은
+    새 세대(gen) 파일로 옮겨 쓰면서 정리한다.
+    여러 프로세스(Pool worker)가 동시에 써도 되도록 쓰기는 SQLite 쓰기 잠금 안에서 수행한다.
+
+    Parameters:
+    - cache_dir (str): 캐시 디렉토리
+    - max_bytes (int): 저장할 배열의 최대 총 크기 (bytes)
+    """
+
+    def __init__(self, cache_dir=PANN_CACHE_DIR, max_bytes=PANN_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.db = SqliteConnection(os.path.join(cache_dir, "index.sqlite"), _SCHEMA)
+        self._mmaps = {}
+
+    def __getstate__(self):
+        # memmap은 프로세스마다 새로 연다
+        state = self.__dict__.copy()
+        state.update(_mmaps={})
+        return state
+
+    @property
+    def conn(self):
+        return self.db.get()
+
+    def _data_path(self, gen):
+        return os.path.join(self.cache_dir, f"data-{gen}.f16")
+
+    def _current_gen(self):
+        return self.conn.execute("SELECT value FROM state WHERE name = 'gen'").fetchone()[0]
+
+    def _read(self, gen, offset, length):
+        mm = self._mmaps.get(gen)
+        if mm is None or len(mm) < offset + length:
+            mm = np.memmap(self._data_path(gen), dtype=np.float16, mode="r")
+            self._mmaps = {gen: mm}
+        return np.asarray(mm[offset:offset + length], dtype=np.float32)
+
+    def get(self, key):
+        """
+        key에 해당하는 (배열(float32), meta dict)를 반환. 없으면 None.
+        """
+        row = self.conn.execute(
+            "SELECT gen, offset, length, shape, meta FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        gen, offset, length, shape, meta = row
+        try:
+            values = self._read(gen, offset, length).reshape(json.loads(shape))
+        except (OSError, ValueError):
+            # 다른 프로세스가 압축하면서 이전 세대 파일을 지운 경우
+            return None
+        self.conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        return values, json.loads(meta)
+
+    def get_alias(self, alias):
+        """
+        alias(예: video_id)로 등록된 항목을 반환. 없으면 None.
+        """
+        row = self.conn.execute("SELECT key FROM aliases WHERE alias = ?", (alias,)).fetchone()
+        return None if row is None else self.get(row[0])
+
+    def put(self, key, values, meta=None, alias=None):
+        """
+        배열을 float16으로 저장하고 필요하면 LRU 삭제와 압축을 수행.
+
+        Parameters:
+        - key (str): 캐시 키
+        - values (array-like): 저장할 배열
+        - meta (dict, optional): 배열과 함께 저장할 JSON 직렬화 가능한 정보
+        - alias (str, optional): 내용 해시 없이 조회할 때 쓸 별칭
+        """
+        values = np.ascontiguousarray(values, dtype=np.float16)
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            gen = self._current_gen()
+            with open(self._data_path(gen), "ab") as f:
+                offset = f.tell() // _ITEM_BYTES
+                f.write(values.tobytes())
+            conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (key, gen, offset, values.size, json.dumps(list(values.shape)),
+                          json.dumps(meta or {}), time.time()))
+            if alias is not None:
+                conn.execute("INSERT OR REPLACE INTO aliases VALUES (?, ?)", (alias, key))
+            self._evict()
+            stale_gen = self._maybe_compact(gen)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if stale_gen is not None:
+            os.remove(self._data_path(stale_gen))
+
+    def _live_bytes(self):
+        return (self.conn.execute("SELECT COALESCE(SUM(length), 0) FROM entries").fetchone()[0]) * _ITEM_BYTES
+
+    def _evict(self):
+        live_bytes = self._live_bytes()
+        if live_bytes <= self.max_bytes:
+            return
+        for key, length in self.conn.execute(
+                "SELECT key, length FROM entries ORDER BY last_access").fetchall():
+            if live_bytes <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.conn.execute("DELETE FROM aliases WHERE key = ?", (key,))
+            live_bytes -= length * _ITEM_BYTES
+
+    def _maybe_compact(self, gen):
+        file_bytes = os.path.getsize(self._data_path(gen))
+        dead_bytes = file_bytes - self._live_bytes()
+        if dead_bytes < _MIN_COMPACT_BYTES or dead_bytes < file_bytes // 2:
+            return None
+        new_gen = gen + 1
+        rows = self.conn.execute("SELECT key, offset, length FROM entries ORDER BY offset").fetchall()
+        with open(self._data_path(new_gen), "wb") as f:
+            for key, offset, length in rows:
+                new_offset = f.tell() // _ITEM_BYTES
+                f.write(self._read(gen, offset, length).astype(np.float16).tobytes())
+                self.conn.execute("UPDATE entries SET gen = ?, offset = ? WHERE key = ?", (new_gen, new_offset, key))
+        self.conn.execute("UPDATE state SET value = ? WHERE name = 'gen'", (new_gen,))
+        self._mmaps = {}
+        return gen
@@ -1,6 +1,120 @@
-### TODO:
-# - [ ] Fetch data from S3
-# - [ ] Save to local
-# - [ ] Return local path
+import os
+import json
+import glob
+import fcntl
+import socket
 
 
+class ClipManifest:
+    """
+    clip 메타데이터(video_id, clip_id, clip_start_end_sec ...)를 JSONL로 쌓는 manifest.
+
+    각 worker 프로세스는 자기 shard 파일(shard-<host>-<pid>.jsonl)에 레코드 한 줄을
+    O_APPEND write 한 번으로 추가하므로 전체 파일을 다시 쓰지 않고, worker끼리 덮어쓰지도 않는다.
+    compact()는 shard들을 manifest.jsonl 하나로 합치고(같은 clip_id는 마지막 레코드),
+    읽기는 파일을 한 줄씩 읽는 generator로 한다.
+
+    Parameters:
+    - manifest_dir (str): manifest.jsonl과 shard 파일을 저장할 디렉토리
+    - key (str): 중복 제거에 쓸 레코드 key
+    """
+
+    def __init__(self, manifest_dir, key="clip_id"):
+        self.manifest_dir = manifest_dir
+        self.key = key
+        self.compacted_path = os.path.join(manifest_dir, "manifest.jsonl")
+        os.makedirs(manifest_dir, exist_ok=True)
+
+    def shard_path(self):
+        return os.path.join(self.manifest_dir, f"shard-{socket.gethostname()}-{os.getpid()}.jsonl")
+
+    def shard_paths(self):
+        return sorted(glob.glob(os.path.join(self.manifest_dir, "shard-*.jsonl")))
+
+    def append(self, record):
+        """
+        레코드 하나를 이 프로세스의 shard에 추가 (한 줄을 한 번의 write로 기록).
+        """
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        fd = os.open(self.shard_path(), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def _iter_file(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 프로세스가 죽으면서 잘린 줄
+
+    def iter_records(self):
+        """
+        manifest.jsonl과 모든 shard의 레코드를 차례로 반환 (compact 전에는 같은 key가 여러 번 나올 수 있음).
+        """
+        if os.path.exists(self.compacted_path):
+            yield from self._iter_file(self.compacted_path)
+        for path in self.shard_paths():
+            yield from self._iter_file(path)
+
+    def values(self, field):
+        return set(record[field] for record in self.iter_records())
+
+    def _lock(self):
+        lock_file = open(os.path.join(self.manifest_dir, ".lock"), "w")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def compact(self):
+        """
+        shard들을 manifest.jsonl로 합치고 shard 파일을 삭제.
+        append 중인 worker가 없을 때(크롤링 시작 전/종료 후) 호출한다.
+
+        Returns:
+        - num_records (int): 합친 뒤 레코드 수 (합칠 shard가 없으면 None)
+        """
+        with self._lock():
+            shard_paths = self.shard_paths()
+            if not shard_paths:
+                return None
+            records = {}
+            for record in self.iter_records():
+                records.pop(record[self.key], None)  # 마지막 레코드의 순서로
+                records[record[self.key]] = record
+            tmp_path = f"{self.compacted_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record in records.values():
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.compacted_path)
+            for path in shard_paths:
+                os.remove(path)
+        print(f"📦 manifest 병합: {len(shard_paths)}개 shard → {self.compacted_path} ({len(records)}개 레코드)")
+        return len(records)
+
+    def migrate_json(self, json_path):
+        """
+        기존 JSON 리스트 파일(ex: yt_dataset.json)을 manifest로 가져옴. manifest가 비어 있을 때만 수행.
+        """
+        if not os.path.exists(json_path) or os.path.exists(self.compacted_path) or self.shard_paths():
+            return 0
+        with open(json_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        tmp_path = f"{self.compacted_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.compacted_path)
+        print(f"📥 {json_path}에서 {len(records)}개 레코드를 manifest로 가져옴")
+        return len(records)
+
+    def export_json(self, json_path):
+        """
+        manifest를 기존 형식의 JSON 리스트 파일로 내보냄.
+        """
+        self.compact()
+        tmp_path = f"{json_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(list(self.iter_records()), f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, json_path)
@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import fcntl
+import functools
+import threading
+from collections import defaultdict
+
+from vp.configs.constants import METRICS_DIR
+
+_metrics_path = None
+
+
+def start_metrics_run(metrics_dir=METRICS_DIR, run_name="crawl"):
+    """
+    이번 실행의 metrics JSONL 파일을 정함. Pool을 만들기 전에 부모 프로세스에서 호출하면
+    fork된 worker들도 같은 파일에 기록한다. 호출하지 않으면 timed()는 아무것도 기록하지 않는다.
+    """
+    global _metrics_path
+    os.makedirs(metrics_dir, exist_ok=True)
+    _metrics_path = os.path.join(metrics_dir, f"{run_name}_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}.jsonl")
+    return _metrics_path
+
+
+def record_event(stage, sec, nbytes=0, ok=True, key=None):
+    """stage 한 번의 실행 시간/처리 byte 수를 JSONL 한 줄로 기록 (여러 프로세스가 동시에 써도 flock으로 보호)."""
+    if _metrics_path is None:
+        return
+    line = json.dumps({
+        "ts": round(time.time(), 3),
+        "pid": os.getpid(),
+        "thread": threading.current_thread().name,
+        "stage": stage,
+        "sec": round(sec, 4),
+        "bytes": int(nbytes or 0),
+        "ok": ok,
+        "key": key,
+    }, ensure_ascii=False)
+    with open(_metrics_path, "a", encoding="utf-8") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.write(line + "\n")
+
+
+class timed:
+    """
+    stage 실행 시간을 재는 context manager 겸 decorator.
+
+        with timed("upload", key=clip_id) as t:
+            ...
+            t.nbytes = uploaded_bytes
+
+        @timed("extract_audio")
+        def extract_audio(...): ...
+
+    예외가 나면 ok=False로 기록하고 예외는 그대로 전달한다.
+    """
+
+    def __init__(self, stage, key=None, nbytes=0):
+        self.stage = stage
+        self.key = key
+        self.nbytes = nbytes
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record_event(self.stage, time.perf_counter() - self.start, self.nbytes, exc_type is None, self.key)
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(self.stage, self.key, self.nbytes):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+class MetricsSummary:
+    """
+    metrics JSONL을 이어 읽으며 stage별/worker(pid)별로 집계.
+
+    Parameters:
+    - path (str): start_metrics_run()이 만든 JSONL 경로
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.start_time = time.time()
+        self.stages = defaultdict(lambda: {"count": 0, "failed": 0, "sec": 0.0, "max_sec": 0.0, "bytes": 0})
+        self.workers = defaultdict(lambda: defaultdict(float))  # pid -> stage -> sec
+
+    def update(self):
+        if self.path is None or not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # 아직 쓰는 중인 줄
+                self.offset += len(line.encode("utf-8"))
+                event = json.loads(line)
+                stage = self.stages[event["stage"]]
+                stage["count"] += 1
+                stage["failed"] += not event["ok"]
+                stage["sec"] += event["sec"]
+                stage["max_sec"] = max(stage["max_sec"], event["sec"])
+                stage["bytes"] += event["bytes"]
+                self.workers[event["pid"]][event["stage"]] += event["sec"]
+
+    def summary(self):
+        self.update()
+        total_sec = sum(stage["sec"] for stage in self.stages.values())
+        return {
+            "elapsed_sec": time.time() - self.start_time,
+            "stages": {name: {**stage,
+                              "avg_sec": stage["sec"] / max(stage["count"], 1),
+                              "bytes_per_sec": stage["bytes"] / max(stage["sec"], 1e-9),
+                              "share": stage["sec"] / max(total_sec, 1e-9)}
+                       for name, stage in self.stages.items()},
+            "workers": {pid: dict(stages) for pid, stages in self.workers.items()},
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        stages = sorted(summary["stages"].items(), key=lambda item: -item[1]["sec"])
+        lines = [f"{name:>14}: {s['count']}회 ({s['failed']} 실패), 합계 {s['sec'] / 3600:.2f}h ({s['share'] * 100:.0f}%), "
+                 f"평균 {s['avg_sec']:.1f}s, 최대 {s['max_sec']:.1f}s"
+                 + (f", {s['bytes'] / 1024 ** 2:.0f}MB ({s['bytes_per_sec'] / 1024 ** 2:.2f}MB/s)" if s['bytes'] else "")
+                 for name, s in stages]
+        busy = [sum(worker.values()) for worker in summary["workers"].values()]
+        if busy:
+            lines.append(f"{'workers':>14}: {len(busy)}개, 작업 시간 최소 {min(busy) / 60:.1f}분 / 최대 {max(busy) / 60:.1f}분 "
+                         f"(경과 {summary['elapsed_sec'] / 60:.1f}분)")
+        print("⏱️ 단계별 소요 시간\n" + "\n".join(lines))
+
+
+class MetricsReporter:
+    """이번 실행의 MetricsSummary를 interval_sec마다 출력하는 background thread (with 블록이 끝나면 마지막으로 한 번 더 출력)."""
+
+    def __init__(self, interval_sec=60):
+        self.interval_sec = interval_sec
+        self.summary = MetricsSummary(_metrics_path)
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._done.wait(self.interval_sec):
+            self.summary.print_summary()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._done.set()
+        self._thread.join()
+        self.summary.print_summary()
+        return False
@@ -0,0 +1,167 @@
+import os
+import time
+
+from vp.configs.constants import S3_INVENTORY_PATH
+from vp.utils.sqlite_db import SqliteConnection
+
+# 완전한 clip 폴더에 있어야 하는 파일 확장자
+REQUIRED_CLIP_EXTS = (".mp4", ".mp3", ".json")
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS objects (
+        bucket TEXT, prefix TEXT, clip_id TEXT, key TEXT, ext TEXT,
+        size INTEGER, etag TEXT, mtime REAL, PRIMARY KEY (bucket, key))""",
+    "CREATE INDEX IF NOT EXISTS objects_clip ON objects (bucket, prefix, clip_id, ext)",
+    """CREATE TABLE IF NOT EXISTS syncs (
+        bucket TEXT, prefix TEXT, synced_at REAL, PRIMARY KEY (bucket, prefix))""",
+]
+
+
+def split_clip_key(key, s3_prefix):
+    """
+    '<s3_prefix>/<clip_id>/<filename>' 형태의 key를 (clip_id, ext)로 분리. 형식이 다르면 None.
+    """
+    parts = key.split('/')
+    if len(parts) < 3 or parts[0] != s3_prefix or not parts[1] or key.endswith('/'):
+        return None
+    return parts[1], os.path.splitext(parts[-1])[1].lower()
+
+
+class S3Inventory:
+    """
+    bucket/prefix 아래 객체 목록을 로컬 SQLite(WAL)에 저장해 두는 인벤토리 인덱스.
+
+    bucket/prefix → clip_id → {ext, size, etag, mtime} 를 저장하고, clip 존재 여부와
+    특정 확장자가 없는 clip 조회를 S3 LIST 없이 인덱스에서 바로 답한다.
+    S3 LIST는 수정 시각으로 거를 수 없으므로 refresh()는 prefix를 한 번 listing 한 뒤
+    바뀐(새로 생긴/ETag·크기가 달라진/삭제된) key만 인덱스에 반영하고,
+    이 프로세스가 업로드한 파일은 record_upload()로 listing 없이 바로 반영한다.
+    여러 프로세스(Pool worker)와 thread(업로드 thread, 파이프라인 stage)가 같은 인덱스 파일을 동시에 읽고 써도 된다.
+
+    Parameters:
+    - s3_bucket (str): S3 버킷 이름
+    - s3_prefix (str): 인덱싱할 S3 prefix (ex: 'chopin16')
+    - s3_client (boto3.client, optional): refresh에 사용할 S3 클라이언트 (기본값: get_s3_client())
+    - db_path (str): 인덱스 SQLite 파일 경로
+    """
+
+    def __init__(self, s3_bucket, s3_prefix, s3_client=None, db_path=S3_INVENTORY_PATH):
+        self.s3_bucket = s3_bucket
+        self.s3_prefix = s3_prefix
+        self._s3_client = s3_client
+        self.db_path = db_path
+        self.db = SqliteConnection(db_path, _SCHEMA)
+
+    def __getstate__(self):
+        # S3 클라이언트는 프로세스마다 새로 만든다
+        state = self.__dict__.copy()
+        state.update(_s3_client=None)
+        return state
+
+    @property
+    def s3_client(self):
+        if self._s3_client is None:
+            from vp.utils.fetch_data import get_s3_client
+            self._s3_client = get_s3_client()
+        return self._s3_client
+
+    @property
+    def conn(self):
+        return self.db.get()
+
+    def last_synced_at(self):
+        row = self.conn.execute("SELECT synced_at FROM syncs WHERE bucket = ? AND prefix = ?",
+                                (self.s3_bucket, self.s3_prefix)).fetchone()
+        return None if row is None else row[0]
+
+    def refresh(self, max_age_sec=None):
+        """
+        prefix를 listing 해서 바뀐 key만 인덱스에 반영.
+
+        Parameters:
+        - max_age_sec (float, optional): 마지막 동기화가 이 시간보다 최근이면 listing 하지 않음
+
+        Returns:
+        - changes (dict): added / updated / removed key 수 (listing 하지 않았으면 None)
+        """
+        synced_at = self.last_synced_at()
+        if max_age_sec is not None and synced_at is not None and time.time() - synced_at < max_age_sec:
+            return None
+
+        print(f"🔄 S3 인벤토리 갱신: s3://{self.s3_bucket}/{self.s3_prefix}/")
+        known = {key: (size, etag) for key, size, etag in self.conn.execute(
+            "SELECT key, size, etag FROM objects WHERE bucket = ? AND prefix = ?",
+            (self.s3_bucket, self.s3_prefix))}
+
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        pages = paginator.paginate(Bucket=self.s3_bucket, Prefix=f"{self.s3_prefix}/")
+        upserts = []
+        seen = set()
+        for page in pages:
+            for obj in page.get('Contents', []):
+                key = obj['Key']
+                parsed = split_clip_key(key, self.s3_prefix)
+                if parsed is None:
+                    continue
+                seen.add(key)
+                size, etag = obj['Size'], obj['ETag'].strip('"')
+                if known.get(key) != (size, etag):
+                    clip_id, ext = parsed
+                    upserts.append((self.s3_bucket, self.s3_prefix, clip_id, key, ext, size, etag,
+                                    obj['LastModified'].timestamp()))
+        removed = [(self.s3_bucket, key) for key in known.keys() - seen]
+
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?, ?, ?)", upserts)
+            conn.executemany("DELETE FROM objects WHERE bucket = ? AND key = ?", removed)
+            conn.execute("INSERT OR REPLACE INTO syncs VALUES (?, ?, ?)", (self.s3_bucket, self.s3_prefix, time.time()))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        changes = {"added": sum(key not in known for _, _, _, key, *_ in upserts),
+                   "updated": sum(key in known for _, _, _, key, *_ in upserts),
+                   "removed": len(removed)}
+        print(f"✅ S3 인벤토리: {changes['added']}개 추가, {changes['updated']}개 변경, {changes['removed']}개 삭제")
+        return changes
+
+    def record_upload(self, key, size, etag=None):
+        """
+        이 프로세스가 업로드한 객체를 listing 없이 인덱스에 반영 (ETag를 모르면 다음 refresh에서 채워짐).
+        """
+        parsed = split_clip_key(key, self.s3_prefix)
+        if parsed is None:
+            return
+        clip_id, ext = parsed
+        self.conn.execute("INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                          (self.s3_bucket, self.s3_prefix, clip_id, key, ext, size, etag, time.time()))
+
+    def clip_exts(self, clip_id):
+        return {ext for (ext,) in self.conn.execute(
+            "SELECT ext FROM objects WHERE bucket = ? AND prefix = ? AND clip_id = ?",
+            (self.s3_bucket, self.s3_prefix, clip_id))}
+
+    def has_complete_clip(self, clip_id, required_exts=REQUIRED_CLIP_EXTS):
+        return set(required_exts).issubset(self.clip_exts(clip_id))
+
+    def clip_ids(self):
+        return [clip_id for (clip_id,) in self.conn.execute(
+            "SELECT DISTINCT clip_id FROM objects WHERE bucket = ? AND prefix = ? ORDER BY clip_id",
+            (self.s3_bucket, self.s3_prefix))]
+
+    def clip_ids_missing_ext(self, ext):
+        """
+        ext 확장자 파일이 없는 clip_id 리스트.
+        """
+        return [clip_id for (clip_id,) in self.conn.execute(
+            """SELECT clip_id FROM objects WHERE bucket = ? AND prefix = ?
+               GROUP BY clip_id HAVING SUM(ext = ?) = 0 ORDER BY clip_id""",
+            (self.s3_bucket, self.s3_prefix, ext.lower()))]
+
+    def clip_count(self):
+        return self.conn.execute(
+            "SELECT COUNT(DISTINCT clip_id) FROM objects WHERE bucket = ? AND prefix = ?",
+            (self.s3_bucket, self.s3_prefix)).fetchone()[0]
@@ -0,0 +1,179 @@
+import os
+import time
+import fcntl
+import shutil
+import threading
+import multiprocessing
+
+_LOCK_FILE_NAME = ".scratch.lock"
+
+
+def estimate_download_bytes(info, ranges=None, default_bytes=0):
+    """
+    yt-dlp가 고른 format의 파일 크기로 다운로드될 byte 수를 추정.
+    filesize가 없으면 filesize_approx, 그것도 없으면 tbr(kbps) x duration으로 계산하고,
+    ranges(초 단위 (start, end) 리스트)가 있으면 영상 길이 대비 비율만큼만 센다.
+    """
+    formats = info.get("requested_formats") or [info]
+    duration = info.get("duration")
+    total = 0
+    for fmt in formats:
+        size = fmt.get("filesize") or fmt.get("filesize_approx")
+        if not size and fmt.get("tbr") and duration:
+            size = fmt["tbr"] * 1000 / 8 * duration
+        if not size:
+            return default_bytes
+        total += size
+    if ranges and duration:
+        covered = sum(min(end, duration) - max(start, 0) for start, end in ranges)
+        total *= max(0.0, min(1.0, covered / duration))
+    return int(total)
+
+
+class ScratchSpace:
+    """
+    DOWNLOAD_DIR 사용량을 job(clip 디렉토리) 단위 예약으로 관리하는 scratch 공간 관리자.
+
+    다운로드 전에 추정 크기만큼 reserve()하고, 예약 합계가 budget을 넘으면 다른 job이
+    release()할 때까지 새 다운로드를 막는다. 예약 합계는 shared memory에 두므로 Pool을 만들기 전에
+    생성하면 fork된 worker들과 thread들이 같은 budget을 공유한다 (job별 예약은 프로세스마다 따로 기록).
+    작은 중간 파일(audio-only 스트림, PANN 결과 등)은 tmpfs_dir에 여유가 있으면 그곳에 둔다.
+
+    Parameters:
+    - root_dir (str): clip 디렉토리들이 생기는 디렉토리 (ex: DOWNLOAD_DIR)
+    - max_bytes (int): root_dir 예약 한도 (시작 시 디스크 여유 공간 - min_free_bytes보다 크면 그 값으로 줄임)
+    - min_free_bytes (int): 디스크에 항상 남겨둘 여유 공간
+    - tmpfs_dir (str, optional): 작은 중간 파일용 tmpfs 디렉토리 (None이면 사용 안 함)
+    - tmpfs_max_bytes (int): tmpfs_dir 예약 한도
+    - wait_timeout_sec (float): budget이 빌 때까지 기다리는 최대 시간 (넘으면 경고 후 진행, 교착 방지)
+    """
+
+    def __init__(self, root_dir, max_bytes, min_free_bytes=0, tmpfs_dir=None, tmpfs_max_bytes=0,
+                 wait_timeout_sec=600):
+        self.root_dir = root_dir
+        self.max_bytes = max_bytes
+        self.min_free_bytes = min_free_bytes
+        self.tmpfs_dir = tmpfs_dir if tmpfs_dir and os.path.isdir(os.path.dirname(tmpfs_dir.rstrip("/"))) else None
+        self.tmpfs_max_bytes = tmpfs_max_bytes
+        self.wait_timeout_sec = wait_timeout_sec
+        self.cond = multiprocessing.Condition()
+        self.reserved = multiprocessing.RawValue('d', 0.0)
+        self.tmpfs_reserved = multiprocessing.RawValue('d', 0.0)
+        self._jobs = {}  # 이 프로세스가 예약한 job_id -> (root bytes, tmpfs bytes)
+        self._jobs_pid = os.getpid()
+        self._jobs_lock = threading.Lock()
+        self._lock_file = None
+        os.makedirs(root_dir, exist_ok=True)
+        self.budget = self._compute_budget()
+
+    def _compute_budget(self):
+        free = shutil.disk_usage(self.root_dir).free
+        return max(0, min(self.max_bytes, free - self.min_free_bytes))
+
+    def _local_jobs(self):
+        # fork된 worker는 부모의 job 기록을 이어받지 않는다
+        if self._jobs_pid != os.getpid():
+            self._jobs, self._jobs_pid = {}, os.getpid()
+        return self._jobs
+
+    def cleanup_orphans(self, keep=()):
+        """
+        이전 실행에서 남은 clip 디렉토리를 지우고 budget을 다시 계산.
+        keep에 있는 디렉토리 이름(ex: 업로드 재시도를 기다리는 clip_id)은 남긴다.
+        같은 root_dir을 쓰는 다른 크롤러가 실행 중이면(lock 파일) 건너뛴다.
+        """
+        if self._lock_file is None:
+            lock_file = open(os.path.join(self.root_dir, _LOCK_FILE_NAME), "w")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                print(f"⚠️ 다른 크롤러가 {self.root_dir}를 사용 중이라 남은 디렉토리를 정리하지 않음")
+                return 0
+            self._lock_file = lock_file  # 실행이 끝날 때까지 lock 유지
+
+        removed = 0
+        for base_dir in (self.root_dir, self.tmpfs_dir):
+            if base_dir is None or not os.path.isdir(base_dir):
+                continue
+            for name in os.listdir(base_dir):
+                path = os.path.join(base_dir, name)
+                if os.path.isdir(path) and name not in keep:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed += 1
+        if removed:
+            print(f"🧹 이전 실행에서 남은 디렉토리 {removed}개 정리")
+        self.budget = self._compute_budget()
+        return removed
+
+    def reserve(self, job_id, nbytes):
+        """
+        job_id에 nbytes를 추가로 예약. budget이 모자라면 다른 job이 release할 때까지 대기.
+        예약된 것이 하나도 없으면 budget보다 큰 job도 통과시킨다 (혼자서도 못 들어가는 job이 영원히 막히지 않도록).
+        """
+        nbytes = max(0, int(nbytes))
+        deadline = time.time() + self.wait_timeout_sec
+        warned = False
+        with self.cond:
+            while self.reserved.value > 0 and self.reserved.value + nbytes > self.budget:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    print(f"⚠️ scratch budget 대기 시간 초과, 그대로 진행: {job_id} ({nbytes / 1024 ** 2:.0f}MB)")
+                    break
+                if not warned:
+                    print(f"💾 scratch budget 부족, 대기 중: {job_id} ({nbytes / 1024 ** 2:.0f}MB)")
+                    warned = True
+                self.cond.wait(min(remaining, 5))
+            self.reserved.value += nbytes
+        self._add(job_id, nbytes, 0)
+
+    def account(self, job_id, nbytes):
+        """이미 디스크에 쓰인 nbytes를 기다리지 않고 job_id의 예약에 더함 (ex: 잘라낸 clip)."""
+        nbytes = max(0, int(nbytes))
+        with self.cond:
+            self.reserved.value += nbytes
+        self._add(job_id, nbytes, 0)
+
+    def tmp_dir(self, job_id, nbytes):
+        """
+        tmpfs에 nbytes를 예약할 수 있으면 job_id의 tmpfs 디렉토리를 만들어 반환, 아니면 None.
+        호출한 쪽은 None이면 root_dir 아래의 clip 디렉토리를 쓴다.
+        """
+        if self.tmpfs_dir is None:
+            return None
+        nbytes = max(0, int(nbytes))
+        with self.cond:
+            if self.tmpfs_reserved.value + nbytes > self.tmpfs_max_bytes:
+                return None
+            if shutil.disk_usage(os.path.dirname(self.tmpfs_dir.rstrip("/"))).free < nbytes:
+                return None
+            self.tmpfs_reserved.value += nbytes
+        self._add(job_id, 0, nbytes)
+        path = os.path.join(self.tmpfs_dir, job_id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _add(self, job_id, nbytes, tmpfs_nbytes):
+        with self._jobs_lock:
+            jobs = self._local_jobs()
+            root, tmpfs = jobs.get(job_id, (0, 0))
+            jobs[job_id] = (root + nbytes, tmpfs + tmpfs_nbytes)
+
+    def release(self, job_id):
+        """job_id의 예약을 모두 반납하고 tmpfs 디렉토리를 지움 (여러 번 호출해도 됨)."""
+        with self._jobs_lock:
+            root, tmpfs = self._local_jobs().pop(job_id, (0, 0))
+        if tmpfs and self.tmpfs_dir is not None:
+            shutil.rmtree(os.path.join(self.tmpfs_dir, job_id), ignore_errors=True)
+        if root or tmpfs:
+            with self.cond:
+                self.reserved.value = max(0.0, self.reserved.value - root)
+                self.tmpfs_reserved.value = max(0.0, self.tmpfs_reserved.value - tmpfs)
+                self.cond.notify_all()
+
+    def stats(self):
+        return {
+            "budget_bytes": self.budget,
+            "reserved_bytes": int(self.reserved.value),
+            "tmpfs_reserved_bytes": int(self.tmpfs_reserved.value),
+        }
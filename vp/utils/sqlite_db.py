@@ -0,0 +1,43 @@
+import os
+import sqlite3
+import threading
+
+
+class SqliteConnection:
+    """
+    프로세스와 thread마다 따로 여는 SQLite(WAL) 연결.
+
+    처음 열 때 schema의 문장(CREATE TABLE IF NOT EXISTS ... 등)을 실행한다.
+    fork된 worker나 pickle로 전달받은 프로세스에서는 부모의 연결을 쓰지 않고 새로 연다.
+
+    Parameters:
+    - db_path (str): SQLite 파일 경로
+    - schema (list of str): 연결을 열 때 실행할 SQL 문
+    """
+
+    def __init__(self, db_path, schema=()):
+        self.db_path = db_path
+        self.schema = list(schema)
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+    def __getstate__(self):
+        # 연결은 프로세스마다 새로 연다
+        state = self.__dict__.copy()
+        state.update(_local=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def get(self):
+        local = self._local
+        if getattr(local, "conn", None) is None or local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in self.schema:
+                conn.execute(statement)
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
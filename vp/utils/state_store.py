@@ -0,0 +1,115 @@
+import os
+import time
+
+from vp.configs.constants import CRAWL_STATE_DB_PATH
+from vp.utils.sqlite_db import SqliteConnection
+
+COMPLETED = "completed"
+FAILED = "failed"
+UPLOAD_FAILED = "upload_failed"
+
+# SQLite 한 쿼리에 넣을 수 있는 변수 수 제한보다 작게
+_QUERY_CHUNK = 900
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS clips (
+        clip_id TEXT PRIMARY KEY, status TEXT, error TEXT, attempts INTEGER,
+        created_at REAL, updated_at REAL)""",
+    "CREATE INDEX IF NOT EXISTS clips_status ON clips (status)",
+    "CREATE TABLE IF NOT EXISTS legacy_logs (path TEXT PRIMARY KEY, offset INTEGER)",
+]
+
+
+class CrawlStateStore:
+    """
+    clip_id별 크롤링 상태를 저장하는 SQLite(WAL) 상태 저장소.
+
+    clip마다 status(completed/failed/upload_failed), 마지막 에러 사유, 시도 횟수,
+    처음/마지막 기록 시각을 저장한다. 여러 프로세스(Pool worker)와 thread가 동시에 기록해도 되며,
+    재시작 시 전체 로그를 읽는 대신 처리할 후보 clip_id만 인덱스로 조회한다.
+
+    Parameters:
+    - db_path (str): 상태 저장소 SQLite 파일 경로
+    """
+
+    def __init__(self, db_path=CRAWL_STATE_DB_PATH):
+        self.db_path = db_path
+        self.db = SqliteConnection(db_path, _SCHEMA)
+
+    @property
+    def conn(self):
+        return self.db.get()
+
+    def record(self, clip_id, status, error=None):
+        """
+        clip_id의 상태를 기록하고 시도 횟수를 1 증가.
+        """
+        now = time.time()
+        self.conn.execute("""INSERT INTO clips VALUES (?, ?, ?, 1, ?, ?)
+            ON CONFLICT (clip_id) DO UPDATE SET
+                status = excluded.status, error = excluded.error,
+                attempts = attempts + 1, updated_at = excluded.updated_at""",
+                          (clip_id, status, error, now, now))
+
+    def get(self, clip_id):
+        """
+        clip_id의 상태 dict를 반환. 기록이 없으면 None.
+        """
+        row = self.conn.execute(
+            "SELECT status, error, attempts, created_at, updated_at FROM clips WHERE clip_id = ?", (clip_id,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("status", "error", "attempts", "created_at", "updated_at"), row))
+
+    def ids_with_status(self, status):
+        return set(clip_id for (clip_id,) in self.conn.execute("SELECT clip_id FROM clips WHERE status = ?", (status,)))
+
+    def filter_todo(self, clip_ids, done_statuses=(COMPLETED, FAILED)):
+        """
+        clip_ids 중 done_statuses 상태로 기록되지 않은(아직 처리할) clip_id만 순서대로 반환.
+        """
+        clip_ids = list(clip_ids)
+        status_marks = ",".join("?" * len(done_statuses))
+        done = set()
+        for i in range(0, len(clip_ids), _QUERY_CHUNK):
+            chunk = clip_ids[i:i + _QUERY_CHUNK]
+            done.update(clip_id for (clip_id,) in self.conn.execute(
+                f"SELECT clip_id FROM clips WHERE clip_id IN ({','.join('?' * len(chunk))}) AND status IN ({status_marks})",
+                (*chunk, *done_statuses)))
+        return [clip_id for clip_id in clip_ids if clip_id not in done]
+
+    def counts(self):
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM clips GROUP BY status").fetchall())
+
+    def import_legacy_log(self, log_file_path, status):
+        """
+        기존 txt 로그(한 줄에 clip_id 하나)를 가져옴. 지난번에 읽은 위치 이후에 추가된 줄만 읽는다.
+        이미 기록된 clip_id는 덮어쓰지 않는다.
+        """
+        if not os.path.exists(log_file_path):
+            return 0
+        conn = self.conn
+        row = conn.execute("SELECT offset FROM legacy_logs WHERE path = ?", (log_file_path,)).fetchone()
+        offset = row[0] if row is not None else 0
+        if os.path.getsize(log_file_path) <= offset:
+            return 0
+
+        with open(log_file_path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        # 마지막 줄이 쓰는 중이면 다음에 읽음
+        data = data[:data.rfind(b"\n") + 1]
+        mtime = os.path.getmtime(log_file_path)
+        rows = [(line.strip(), status, mtime, mtime) for line in data.decode("utf-8").splitlines() if line.strip()]
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT OR IGNORE INTO clips VALUES (?, ?, NULL, 1, ?, ?)", rows)
+            conn.execute("INSERT OR REPLACE INTO legacy_logs VALUES (?, ?)", (log_file_path, offset + len(data)))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if rows:
+            print(f"📥 {log_file_path}에서 {len(rows)}개 clip_id 상태 가져옴")
+        return len(rows)
@@ -1,6 +1,305 @@
-### TODO:
-# - [ ] Fetch data from S3
-# - [ ] Save to local
-# - [ ] Return local path
+import json
+import bisect
+import tempfile
+import subprocess
+import numpy as np
 
+from vp.configs.constants import (CUT_KEYFRAME_TOLERANCE_SEC, CUT_STREAM_COPY, VIDEO_NUM_FRAMES, VIDEO_FRAME_SIZE,
+                                  VIDEO_SEEK_MIN_GAP_SEC)
+from vp.utils.audio_io import read_stderr
 
+
+def probe_keyframes(video_path):
+    """
+    비디오 스트림의 keyframe 시각(초) 리스트. 디코딩 없이 packet flag만 읽는다.
+    """
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0",
+        video_path
+    ]
+    output = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+    keyframes = []
+    for line in output.splitlines():
+        pts_time, _, flags = line.partition(",")
+        if "K" in flags and pts_time not in ("", "N/A"):
+            keyframes.append(float(pts_time))
+    return sorted(keyframes)
+
+
+def plan_cuts(segments, keyframes, tolerance_sec=CUT_KEYFRAME_TOLERANCE_SEC, stream_copy=CUT_STREAM_COPY):
+    """
+    (start, end) 구간마다 stream copy 가능 여부를 정함.
+    stream copy는 keyframe에서만 시작할 수 있으므로, start 직전 keyframe이 tolerance_sec 이내면
+    그 keyframe으로 start를 당겨서 copy 하고, 아니면 정확한 구간을 re-encode 한다.
+
+    Returns:
+    - cuts (list of dict): {"start", "end", "copy"} (start는 copy일 때 keyframe 시각)
+    """
+    cuts = []
+    for start, end in segments:
+        idx = bisect.bisect_right(keyframes, start + 1e-3) - 1
+        if stream_copy and idx >= 0 and start - keyframes[idx] <= tolerance_sec:
+            cuts.append({"start": keyframes[idx], "end": end, "copy": True})
+        else:
+            cuts.append({"start": start, "end": end, "copy": False})
+    return cuts
+
+
+def cut_segments_command(video_path, cuts, mp4_paths, mp3_paths):
+    """
+    모든 구간을 한 번의 ffmpeg 실행으로 자르는 명령어.
+    구간마다 입력 쪽 seek(-ss/-t 를 -i 앞에)로 같은 파일을 한 번씩 열어 해당 구간만 읽고,
+    그 입력에서 mp4(copy 또는 libx264/aac)와 mp3(libmp3lame) 출력을 만든다.
+    """
+    cmd = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error"]
+    for cut in cuts:
+        cmd += ["-ss", f"{cut['start']:.3f}", "-t", f"{cut['end'] - cut['start']:.3f}", "-i", video_path]
+    for idx, (cut, mp4_path, mp3_path) in enumerate(zip(cuts, mp4_paths, mp3_paths)):
+        cmd += ["-map", f"{idx}:v:0", "-map", f"{idx}:a:0?"]
+        if cut["copy"]:
+            cmd += ["-c", "copy", "-avoid_negative_ts", "make_zero"]
+        else:
+            cmd += ["-c:v", "libx264", "-c:a", "aac"]
+        cmd += [mp4_path]
+        cmd += ["-map", f"{idx}:a:0", "-vn", "-c:a", "libmp3lame", "-b:a", "192k", mp3_path]
+    return cmd
+
+
+def cut_segments(video_path, segments, mp4_paths, mp3_paths, keyframes=None,
+                 tolerance_sec=CUT_KEYFRAME_TOLERANCE_SEC, stream_copy=CUT_STREAM_COPY):
+    """
+    하나의 원본 비디오에서 여러 구간의 mp4/mp3 clip을 ffmpeg 한 번으로 잘라냄.
+
+    Parameters:
+    - video_path (str): 원본 mp4 경로
+    - segments (list of (float, float)): 자를 (start, end) 구간 (초)
+    - mp4_paths (list of str): 구간별 mp4 출력 경로
+    - mp3_paths (list of str): 구간별 mp3 출력 경로
+    - keyframes (list of float, optional): keyframe 시각 (없으면 ffprobe로 조회)
+    - tolerance_sec (float): stream copy를 위해 start를 앞당길 수 있는 최대 시간
+    - stream_copy (bool): False면 모든 구간을 정확하게 re-encode
+
+    Returns:
+    - cuts (list of dict): 실제로 잘라낸 {"start", "end", "copy"} 구간
+    """
+    if stream_copy and keyframes is None:
+        keyframes = probe_keyframes(video_path)
+    cuts = plan_cuts(segments, keyframes or [], tolerance_sec, stream_copy)
+    try:
+        subprocess.run(cut_segments_command(video_path, cuts, mp4_paths, mp3_paths), check=True)
+    except subprocess.CalledProcessError:
+        if not any(cut["copy"] for cut in cuts):
+            raise
+        # 컨테이너/코덱 문제로 copy가 실패하면 전체를 re-encode로 다시 시도
+        print(f"⚠️ stream copy 실패, re-encode로 다시 자름: {video_path}")
+        cuts = plan_cuts(segments, [], stream_copy=False)
+        subprocess.run(cut_segments_command(video_path, cuts, mp4_paths, mp3_paths), check=True)
+    return cuts
+
+
+def probe_video(video_path):
+    """
+    비디오 스트림의 duration(초), width, height, fps. ffprobe로 header만 읽는다.
+    """
+    cmd = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "stream=width,height,avg_frame_rate,duration:format=duration", "-of", "json",
+        video_path
+    ]
+    info = json.loads(subprocess.run(cmd, check=True, capture_output=True, text=True).stdout)
+    stream = info["streams"][0]
+    num, _, den = stream.get("avg_frame_rate", "0/1").partition("/")
+    duration = stream.get("duration") or info.get("format", {}).get("duration") or 0
+    return {
+        "duration": float(duration),
+        "width": int(stream["width"]),
+        "height": int(stream["height"]),
+        "fps": float(num) / float(den) if float(den or 0) else 0.0,
+    }
+
+
+def sample_times(num_frames, start, end):
+    """[start, end)를 num_frames개 구간으로 나눈 각 구간의 가운데 시각."""
+    step = (end - start) / num_frames
+    return [start + (i + 0.5) * step for i in range(num_frames)]
+
+
+def _scale_filter(size):
+    # 비율을 유지해서 size 안에 맞추고 남는 곳은 검은색으로 채움 (출력 크기는 항상 size)
+    height, width = size
+    return (f"scale={width}:{height}:force_original_aspect_ratio=decrease:flags=bilinear,"
+            f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1")
+
+
+def _ffmpeg_base(threads=None):
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin"]
+    if threads is not None:
+        cmd += ["-threads", str(threads)]
+    return cmd
+
+
+def frames_fps_command(video_path, num_frames, size, start, end, threads=None):
+    """
+    [start, end)를 한 번 디코딩하면서 fps filter로 num_frames장만 골라 scale하는 명령어.
+    첫 sample 시각으로 입력 쪽 seek(keyframe부터 디코딩)하므로 구간 앞부분은 디코딩하지 않는다.
+    """
+    step = (end - start) / num_frames
+    return _ffmpeg_base(threads) + [
+        "-ss", f"{start + step / 2:.3f}", "-t", f"{end - start - step / 2:.3f}", "-i", video_path,
+        "-map", "0:v:0", "-an", "-vf", f"fps={1 / step:.6f}:round=near,{_scale_filter(size)}",
+        "-frames:v", str(num_frames), "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1"
+    ]
+
+
+def frames_seek_command(video_path, times, size, threads=None):
+    """
+    sample 시각마다 같은 파일을 입력 쪽 seek로 따로 열어 그 시각의 frame 한 장만 디코딩하는 명령어.
+    seek는 직전 keyframe으로 가서 해당 frame까지만 디코딩하므로, sample 간격이 GOP보다 훨씬 길면
+    구간 전체를 디코딩하는 것보다 빠르다.
+    """
+    cmd = _ffmpeg_base(threads)
+    for t in times:
+        cmd += ["-ss", f"{t:.3f}", "-i", video_path]
+    graph = [f"[{i}:v:0]trim=end_frame=1,setpts=PTS-STARTPTS,{_scale_filter(size)}[v{i}]" for i in range(len(times))]
+    graph.append("".join(f"[v{i}]" for i in range(len(times))) + f"concat=n={len(times)}:v=1:a=0[out]")
+    return cmd + [
+        "-filter_complex", ";".join(graph), "-map", "[out]",
+        "-frames:v", str(len(times)), "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1"
+    ]
+
+
+def frames_keyframe_command(video_path, keyframe_indices, size, start, end, threads=None):
+    """
+    keyframe만 디코딩하고(-skip_frame nokey) 그중 keyframe_indices 번째(구간 안에서의 순서)만 scale하는 명령어.
+    sample 시각 대신 가장 가까운 keyframe을 쓰는 대신 가장 빠르다.
+    """
+    select = "+".join(f"eq(n\\,{idx})" for idx in keyframe_indices)
+    return _ffmpeg_base(threads) + [
+        "-skip_frame", "nokey", "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}", "-i", video_path,
+        "-map", "0:v:0", "-an", "-vf", f"select='{select}',{_scale_filter(size)}",
+        "-fps_mode", "passthrough", "-frames:v", str(len(keyframe_indices)),
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1"
+    ]
+
+
+def _read_frames(cmd, out):
+    """ffmpeg rawvideo 출력을 out(uint8 (n, H, W, 3), C-contiguous)에 바로 읽어 넣고 읽은 frame 수를 반환."""
+    raw = memoryview(out.reshape(-1).view(np.uint8))
+    frame_bytes = out[0].nbytes
+    stderr_file = tempfile.TemporaryFile()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file, bufsize=0)
+    filled = 0
+    try:
+        while filled < len(raw):
+            n = proc.stdout.readinto(raw[filled:])
+            if not n:
+                break
+            filled += n
+        proc.stdout.close()
+        if proc.wait() != 0 and filled < frame_bytes:
+            stderr = read_stderr(stderr_file)
+            raise RuntimeError(f"ffmpeg frame decoding failed: {stderr or cmd[-1]}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        stderr_file.close()
+    return filled // frame_bytes
+
+
+def _sample_frames_opencv(video_path, times, size, out):
+    """
+    OpenCV로 sample 시각의 frame만 꺼냄. 다음 sample이 VIDEO_SEEK_MIN_GAP_SEC보다 멀면 seek하고,
+    가까우면 grab()으로 (색 변환 없이) 건너뛴다.
+    """
+    import cv2
+
+    height, width = size
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"OpenCV cannot open {video_path}")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        pos = 0
+        count = 0
+        resized = None
+        for i, t in enumerate(times):
+            target = int(round(t * fps))
+            if target < pos or target - pos > VIDEO_SEEK_MIN_GAP_SEC * fps:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                pos = target
+            while pos < target and cap.grab():
+                pos += 1
+            ok, frame = cap.read()
+            if not ok:
+                break
+            pos += 1
+            scale = min(width / frame.shape[1], height / frame.shape[0])
+            new_w, new_h = max(1, int(frame.shape[1] * scale)), max(1, int(frame.shape[0] * scale))
+            if resized is None or resized.shape[:2] != (new_h, new_w):
+                resized = np.empty((new_h, new_w, 3), dtype=np.uint8)
+            cv2.resize(frame, (new_w, new_h), dst=resized, interpolation=cv2.INTER_AREA)
+            top, left = (height - new_h) // 2, (width - new_w) // 2
+            out[i].fill(0)
+            cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=out[i, top:top + new_h, left:left + new_w])
+            count += 1
+        return count
+    finally:
+        cap.release()
+
+
+def sample_frames(video_path, num_frames=VIDEO_NUM_FRAMES, size=VIDEO_FRAME_SIZE, start=0.0, end=None,
+                  method="auto", out=None, threads=None, info=None):
+    """
+    [start, end) 구간에서 균등한 간격의 num_frames장을 size로 줄여 uint8 RGB 배열로 읽음.
+    필요한 frame만 디코딩하고, ffmpeg 출력을 out 버퍼에 바로 읽어 넣는다 (frame마다 PIL 변환/복사 없음).
+
+    Parameters:
+    - video_path (str): 비디오 파일 경로
+    - num_frames (int): 뽑을 frame 수
+    - size ((int, int)): 출력 (height, width), 비율을 유지하고 남는 곳은 검은색
+    - start, end (float): 구간 (초), end가 None이면 영상 끝
+    - method (str): "fps" (구간을 한 번 디코딩하며 fps filter로 선택), "seek" (sample마다 keyframe seek),
+      "keyframe" (가장 가까운 keyframe만 디코딩, 가장 빠르지만 시각이 부정확), "opencv",
+      "auto" (sample 간격이 VIDEO_SEEK_MIN_GAP_SEC보다 길면 seek, 아니면 fps)
+    - out (np.ndarray, optional): (num_frames, H, W, 3) uint8 C-contiguous 버퍼 (ex: memmap의 한 행)
+    - threads (int, optional): ffmpeg 디코딩 thread 수 (여러 프로세스에서 동시에 돌릴 때 1)
+    - info (dict, optional): probe_video 결과 (없고 end가 None이면 조회)
+
+    Returns:
+    - frames (np.ndarray): out (또는 새 배열). 영상이 짧아 덜 나온 frame은 마지막 frame으로 채움.
+    """
+    if end is None:
+        end = (info or probe_video(video_path))["duration"]
+    if end <= start:
+        raise ValueError(f"empty range [{start}, {end}) of {video_path}")
+    if out is None:
+        out = np.empty((num_frames, size[0], size[1], 3), dtype=np.uint8)
+    times = sample_times(num_frames, start, end)
+
+    if method == "auto":
+        method = "seek" if (end - start) / num_frames > VIDEO_SEEK_MIN_GAP_SEC else "fps"
+    if method == "fps":
+        count = _read_frames(frames_fps_command(video_path, num_frames, size, start, end, threads), out)
+    elif method == "seek":
+        count = _read_frames(frames_seek_command(video_path, times, size, threads), out)
+    elif method == "keyframe":
+        keyframes = [t for t in probe_keyframes(video_path) if start - 1e-3 <= t < end] or [start]
+        nearest = [min(range(len(keyframes)), key=lambda k: abs(keyframes[k] - t)) for t in times]
+        unique = sorted(set(nearest))
+        count = _read_frames(frames_keyframe_command(video_path, unique, size, start, end, threads), out[:len(unique)])
+        # nearest는 시각 순서라 j <= i 이므로, 뒤에서부터 채우면 아직 덮어쓰지 않은 keyframe을 읽는다
+        for i in reversed(range(num_frames)):
+            j = unique.index(nearest[i])
+            out[i] = out[min(j, max(count - 1, 0))]
+        count = num_frames if count else 0
+    elif method == "opencv":
+        count = _sample_frames_opencv(video_path, times, size, out)
+    else:
+        raise ValueError(f"unknown method: {method}")
+
+    if count == 0:
+        raise RuntimeError(f"no frame decoded: {video_path} [{start:.2f}, {end:.2f})")
+    out[count:] = out[count - 1]
+    return out